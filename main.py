@@ -1,8 +1,13 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import ValidationError
+from slowapi import _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
 
 from src.api.contacts import routerContacts
 from src.api.utils import routerUtils
@@ -10,8 +15,33 @@ from src.api.auth import routerAuth
 from src.api.users import routerUsers
 
 from src.conf.config import settings
+from src.database.db import sessionmanager
+from src.services.cache import cache
+from src.services.hashing import password_hasher
+from src.services.limiter import limiter
+from src.workers.birthday_digest import run_scheduler
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    await cache.start()
+    stop_scheduler = asyncio.Event()
+    scheduler = None
+    if settings.BIRTHDAY_DIGEST_SCHEDULER:
+        scheduler = asyncio.create_task(
+            run_scheduler(sessionmanager.session, stop_scheduler)
+        )
+    yield
+    stop_scheduler.set()
+    if scheduler is not None:
+        await scheduler
+    await cache.stop()
+    password_hasher.shutdown()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.state.limiter = limiter
+app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,6 +49,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -0,0 +1,39 @@
+"""Contacts trigram search index
+
+Revision ID: 5b1f0c2d7a4e
+Revises: e73014d956a9
+Create Date: 2026-10-17 10:12:31.204518
+
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5b1f0c2d7a4e"
+down_revision: Union[str, None] = "e73014d956a9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_contacts_search_trgm",
+        "contacts",
+        ["first_name", "last_name", "email"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={
+            "first_name": "gin_trgm_ops",
+            "last_name": "gin_trgm_ops",
+            "email": "gin_trgm_ops",
+        },
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contacts_search_trgm", table_name="contacts")
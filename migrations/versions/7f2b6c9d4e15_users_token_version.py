@@ -0,0 +1,30 @@
+"""Users token version
+
+Revision ID: 7f2b6c9d4e15
+Revises: d41a8e6f3b90
+Create Date: 2026-10-17 13:02:41.518220
+
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "7f2b6c9d4e15"
+down_revision: Union[str, None] = "d41a8e6f3b90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("token_version", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "token_version")
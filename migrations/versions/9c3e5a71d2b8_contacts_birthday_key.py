@@ -0,0 +1,40 @@
+"""Contacts birthday key
+
+Revision ID: 9c3e5a71d2b8
+Revises: 5b1f0c2d7a4e
+Create Date: 2026-10-17 11:02:54.613027
+
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c3e5a71d2b8"
+down_revision: Union[str, None] = "5b1f0c2d7a4e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("contacts", sa.Column("birthday_key", sa.Integer(), nullable=True))
+    op.execute(
+        "UPDATE contacts SET birthday_key = "
+        "EXTRACT(MONTH FROM birthday) * 100 + EXTRACT(DAY FROM birthday)"
+    )
+    op.alter_column("contacts", "birthday_key", nullable=False)
+    op.create_index(
+        "ix_contacts_user_id_birthday_key",
+        "contacts",
+        ["user_id", "birthday_key"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contacts_user_id_birthday_key", table_name="contacts")
+    op.drop_column("contacts", "birthday_key")
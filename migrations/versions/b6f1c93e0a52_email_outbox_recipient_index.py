@@ -0,0 +1,34 @@
+"""Email outbox recipient index
+
+Revision ID: b6f1c93e0a52
+Revises: 5e0a7d3c1f48
+Create Date: 2026-10-17 18:40:19.615204
+
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "b6f1c93e0a52"
+down_revision: Union[str, None] = "5e0a7d3c1f48"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_email_outbox_lower_recipient_kind_created_at",
+        "email_outbox",
+        [sa.text("lower(recipient)"), "kind", "created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_email_outbox_lower_recipient_kind_created_at", table_name="email_outbox"
+    )
@@ -0,0 +1,37 @@
+"""Job runs
+
+Revision ID: c2d7e4a8f195
+Revises: b6f1c93e0a52
+Create Date: 2026-10-17 19:05:42.118306
+
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "c2d7e4a8f195"
+down_revision: Union[str, None] = "b6f1c93e0a52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "job_runs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("run_date", sa.Date(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("items", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name", "run_date", name="uq_job_runs_name_run_date"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("job_runs")
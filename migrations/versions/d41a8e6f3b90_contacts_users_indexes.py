@@ -0,0 +1,78 @@
+"""Contacts and users lookup indexes
+
+Revision ID: d41a8e6f3b90
+Revises: 9c3e5a71d2b8
+Create Date: 2026-10-17 11:47:08.381164
+
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d41a8e6f3b90"
+down_revision: Union[str, None] = "9c3e5a71d2b8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def check_duplicates(table: str, columns: str) -> None:
+    """
+    Fail with a clear error if rows would violate a new unique index.
+
+    Emails and usernames were unique case-sensitively before, so case-variant
+    duplicates have to be merged or renamed by hand before the upgrade.
+
+    Args:
+        table (str): a table name.
+        columns (str): SQL expressions of the unique index.
+    """
+
+    duplicates = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                f"SELECT {columns}, count(*) FROM {table} "
+                f"GROUP BY {columns} HAVING count(*) > 1 LIMIT 10"
+            )
+        )
+        .all()
+    )
+    if duplicates:
+        raise RuntimeError(
+            f"Cannot create a unique index on {table} ({columns}), "
+            f"resolve case-insensitive duplicates first, e.g. {duplicates}"
+        )
+
+
+def upgrade() -> None:
+    check_duplicates("contacts", "user_id, lower(email)")
+    check_duplicates("users", "lower(username)")
+    check_duplicates("users", "lower(email)")
+
+    op.create_index(
+        "ix_contacts_user_id_id", "contacts", ["user_id", "id"], unique=False
+    )
+    op.create_index(
+        "ix_contacts_user_id_lower_email",
+        "contacts",
+        ["user_id", sa.text("lower(email)")],
+        unique=True,
+    )
+    op.create_index(
+        "ix_users_lower_username", "users", [sa.text("lower(username)")], unique=True
+    )
+    op.create_index(
+        "ix_users_lower_email", "users", [sa.text("lower(email)")], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_lower_email", table_name="users")
+    op.drop_index("ix_users_lower_username", table_name="users")
+    op.drop_index("ix_contacts_user_id_lower_email", table_name="contacts")
+    op.drop_index("ix_contacts_user_id_id", table_name="contacts")
@@ -1,26 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm
+from slowapi.util import get_remote_address
 import logging
 
 from src.schemas.users import (
+    Principal,
     UserCreate,
     User,
     ResetPasswordRequest,
     ResetPasswordConfirm,
     UserUpdate,
 )
-from src.schemas.token import Token
+from src.schemas.token import RefreshTokenRequest, Token
 from src.services.auth import (
     create_access_token,
-    Hash,
     get_email_from_token,
-    create_token,
+    get_access_token_claims,
+    get_current_user,
+    oauth2_scheme,
 )
+from src.services.hashing import password_hasher
+from src.services.limiter import limiter
+from src.services.refresh_tokens import RefreshTokenService
+from src.services.revocation import revocation_list
+from src.services.tokens import token_decode_cache
 from src.services.users import UserService
-from src.services.email import send_email, send_reset_email
+from src.services.email import EmailOutboxService
 from src.database.db import get_db
-from src.utils import HTTPConflictRequestException, HTTPBadRequestException
+from src.conf.config import settings
+from src.utils import HTTPBadRequestException
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -33,16 +42,15 @@ routerAuth = APIRouter(prefix="/auth", tags=["auth"])
 @routerAuth.post("/register", response_model=User, status_code=status.HTTP_201_CREATED)
 async def register_user(
     user: UserCreate,
-    background_tasks: BackgroundTasks,
     request: Request,
     db: AsyncSession = Depends(get_db),
 ):
     """
-    Register a new User.
+    Register a new User. A verification email is added to the outbox in the
+    same transaction.
 
     Args:
         user (UserCreate): instance of UserCreate
-        background_tasks (BackgroundTasks): An instance of BackgroundTasks.
         request (Request): An instance of Request.
         db (AsyncSession): An instance of AsyncSession.
 
@@ -51,50 +59,46 @@ async def register_user(
     """
 
     user_service = UserService(db)
-    email_user = await user_service.get_user_by_email(user.email)
-
-    if email_user:
-        raise HTTPConflictRequestException("A user already exists with the same email.")
-
-    username_user = await user_service.get_user_by_username(user.username)
-
-    if username_user:
-        raise HTTPConflictRequestException(
-            "A user already exists with the same username."
-        )
-
-    user.password = Hash().get_password_hash(user.password)
-    new_user = await user_service.create_user(user)
-
-    background_tasks.add_task(
-        send_email, str(new_user.email), str(new_user.username), str(request.base_url)
+    user.password = await password_hasher.hash(user.password)
+    EmailOutboxService(db).add_verification_email(
+        user.email, user.username, str(request.base_url)
     )
+    new_user = await user_service.create_user(user)
 
-    logger.info(f'Verification email sent for "{new_user.username}".')
+    logger.info(f'Verification email queued for "{new_user.username}".')
 
     return new_user
 
 
 @routerAuth.post("/login", response_model=Token)
+@limiter.limit(settings.RATE_LIMIT_LOGIN, key_func=get_remote_address)
 async def login_user(
+    request: Request,
     request_form: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_db),
 ):
     """
-    Log in with a OAuth2PasswordRequestForm from.
+    Log in with a OAuth2PasswordRequestForm from. Limited per client address.
 
     Args:
+        request (Request): An instance of Request.
         request_form (OAuth2PasswordRequestForm): instance of OAuth2PasswordRequestForm with email and password fields
         db (AsyncSession): An instance of AsyncSession.
 
     Returns:
-        dict(access_token and token_type)
+        dict(access_token, refresh_token and token_type)
     """
 
     user_service = UserService(db)
     user = await user_service.get_user_by_username(request_form.username)
 
-    if not user or not Hash().verify_password(request_form.password, user.password):
+    verified, new_password = (
+        await password_hasher.verify_and_update(request_form.password, user.password)
+        if user
+        else (False, None)
+    )
+
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect login or password.",
@@ -107,9 +111,76 @@ async def login_user(
             detail="Email address not confirmed.",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    payload = {"sub": user.username}
-    access_token = await create_access_token(payload)
-    return {"access_token": access_token, "token_type": "bearer"}
+
+    if new_password:
+        await user_service.update_user(user, UserUpdate(password=new_password))
+        logger.info(f'Password hash upgraded for "{user.username}".')
+    access_token = await create_access_token(get_access_token_claims(user))
+    refresh_token = await RefreshTokenService(db).issue(user)
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+    }
+
+
+@routerAuth.post("/refresh", response_model=Token)
+async def refresh_token(
+    body: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Exchange a refresh token for a new access token and a rotated refresh token
+    without checking the password.
+
+    Args:
+        body (RefreshTokenRequest): instance of RefreshTokenRequest.
+        db (AsyncSession): An instance of AsyncSession.
+
+    Returns:
+        dict(access_token, refresh_token and token_type)
+    """
+
+    user, refresh_token = await RefreshTokenService(db).rotate(body.refresh_token)
+    access_token = await create_access_token(get_access_token_claims(user))
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+    }
+
+
+@routerAuth.post("/logout")
+async def logout_user(
+    body: RefreshTokenRequest | None = None,
+    token: str = Depends(oauth2_scheme),
+    user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Revoke the access token of the request and optionally a refresh token.
+
+    Args:
+        body (RefreshTokenRequest, optional): a refresh token to revoke with its family.
+        token (str): the access token.
+        user (Principal): Injected Principal.
+        db (AsyncSession): An instance of AsyncSession.
+
+    Returns:
+        dict(message)
+    """
+
+    # Already verified by get_current_user, so the claims come from the cache
+    claims = token_decode_cache.decode(token)
+
+    if "jti" in claims:
+        await revocation_list.revoke(claims["jti"], user.id, claims.get("exp"), db)
+
+    if body is not None:
+        await RefreshTokenService(db).revoke(body.refresh_token, user.id)
+
+    logger.info(f'User "{user.username}" logged out.')
+    return {"message": "Logged out"}
 
 
 @routerAuth.get("/verify_email/{token}")
@@ -127,6 +198,11 @@ async def verify_email(token: str, db: AsyncSession = Depends(get_db)):
 
     email = await get_email_from_token(token)
     user_service = UserService(db)
+
+    if await user_service.verify_email(email):
+        logger.info(f"Email address {email} verified.")
+        return {"message": "Email verified!"}
+
     user = await user_service.get_user_by_email(email)
 
     if not user:
@@ -134,18 +210,13 @@ async def verify_email(token: str, db: AsyncSession = Depends(get_db)):
             status_code=status.HTTP_400_BAD_REQUEST, detail="Verification error"
         )
 
-    if bool(user.confirmed):
-        return {"message": "Email already verified"}
-
-    await user_service.verify_email(email)
-    logger.info(f"Email address {email} verified.")
-    return {"message": "Email verified!"}
+    return {"message": "Email already verified"}
 
 
 @routerAuth.post("/password-reset/")
+@limiter.limit(settings.RATE_LIMIT_PASSWORD_RESET, key_func=get_remote_address)
 async def password_reset(
     body: ResetPasswordRequest,
-    background_tasks: BackgroundTasks,
     request: Request,
     db: AsyncSession = Depends(get_db),
 ):
@@ -157,18 +228,18 @@ async def password_reset(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
 
-    token = create_token(payload={"sub": body.email})
-
-    background_tasks.add_task(
-        send_reset_email,
-        body.email,
-        token,
-        str(request.base_url),
+    queued = await EmailOutboxService(db).add_reset_email(
+        body.email, str(request.base_url)
     )
 
-    logger.info(
-        f'Reset password email sent for a user with email address "{body.email}".'
-    )
+    if queued:
+        logger.info(
+            f'Reset password email queued for a user with email address "{body.email}".'
+        )
+    else:
+        logger.info(
+            f'Reset password email for "{body.email}" is already in the outbox.'
+        )
     return {"message": "Reset password email sent"}
 
 
@@ -184,9 +255,9 @@ async def password_reset_confirm(
     if not user:
         raise HTTPBadRequestException("Invalid or expired token")
 
-    new_password = Hash().get_password_hash(data.password)
+    new_password = await password_hasher.hash(data.password)
     updated_user = await user_service.update_user(
-        user, UserUpdate(password=new_password)
+        user, UserUpdate(password=new_password), revoke_tokens=True
     )
 
     if updated_user:
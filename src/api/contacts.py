@@ -1,16 +1,20 @@
-from typing import List
+from typing import List, Literal
 
-from fastapi import APIRouter, Query, Depends, status, Response
+from fastapi import APIRouter, Query, Depends, status, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.db import get_db
 from src.services.contacts import ContactsService
+from src.services.contacts_io import EXPORT_FORMATS, read_records
 from src.schemas.contacts import (
     ContactCreateModel,
+    ContactImportReportModel,
     ContactUpdateModel,
     ResponseContactModel,
 )
-from src.schemas.users import User
+from src.schemas.serializers import contact_response, contacts_response
+from src.schemas.users import Principal
 from src.services.auth import get_current_user
 from src.utils import bad_request_response_docs, not_found_response_docs
 
@@ -20,26 +24,37 @@ routerContacts = APIRouter(prefix="/contacts", tags=["contacts"])
 @routerContacts.get("/", response_model=List[ResponseContactModel])
 async def get_contacts(
     search: str | None = Query(
-        default=None, description="Search by first name, last name and email"
+        default=None,
+        description="Search by first name, last name and email, ordered by relevance",
     ),
     birthdays_within: int | None = Query(
         default=None,
+        ge=0,
         description="Search for contacts with birthdays within a specified number of days",
     ),
     offset: int | None = Query(default=None, description="Offset"),
     limit: int | None = Query(default=None, description="limit"),
+    cursor: str | None = Query(
+        default=None,
+        description="Cursor of the next page from the X-Next-Cursor response header",
+    ),
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     """
-    Return all Contacts.
+    Return all Contacts ordered by ID, or by relevance for a search.
+
+    A full page sets the X-Next-Cursor response header, which can be passed
+    back as cursor to fetch the next page without an OFFSET scan. Search
+    results are paginated with offset only.
 
     Args:
         search (str, Optional): Search query for email, first name and last name.
         birthdays_within (int, Optional): Number of days within future birthdays.
         offset (int, Optional): The number of Contacts to skip.
         limit (int, Optional): The maximum number of Contacts to return.
-        user (User): a current user
+        cursor (str, Optional): An opaque cursor of the next page.
+        user (Principal): a current user
         db (AsyncSession): An instance of AsyncSession.
 
     Returns:
@@ -47,8 +62,66 @@ async def get_contacts(
     """
 
     contacts_service = ContactsService(db, user)
-    return await contacts_service.get_all(
-        search=search, birthdays_within=birthdays_within, offset=offset, limit=limit
+    contacts = await contacts_service.get_all(
+        search=search,
+        birthdays_within=birthdays_within,
+        offset=offset,
+        limit=limit,
+        cursor=cursor,
+    )
+
+    next_cursor = contacts_service.get_next_cursor(contacts, limit, search)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return contacts_response(contacts, headers=headers)
+
+
+@routerContacts.get("/export", response_class=StreamingResponse)
+async def export_contacts(
+    export_format: Literal["ndjson", "csv", "vcf"] = Query(
+        default="ndjson", alias="format", description="Export format"
+    ),
+    cursor: str | None = Query(
+        default=None,
+        description="Resume an interrupted export after the Contact of this cursor",
+    ),
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user),
+):
+    """
+    Stream all Contacts ordered by ID as NDJSON, CSV or vCard.
+
+    Contacts are read through a server-side cursor, so memory use does not
+    depend on the number of Contacts. Every exported Contact carries a cursor,
+    the cursor field of NDJSON and CSV or X-CURSOR of vCard, so an interrupted
+    export is resumed with the cursor of the last received Contact.
+
+    Args:
+        export_format (str): ndjson, csv or vcf.
+        cursor (str, Optional): Export only Contacts after the one of this cursor.
+        db (AsyncSession): An instance of AsyncSession.
+        user (Principal): a current user
+
+    Returns:
+        StreamingResponse
+    """
+
+    media_type, extension, _ = EXPORT_FORMATS[export_format]
+    # An invalid cursor is rejected before the response starts
+    chunks = ContactsService(db, user).export(export_format, cursor)
+
+    async def export_chunks():
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            # get_db exits before a streamed body is sent, so the session
+            # reopened by the cursor has to be released here
+            await db.close()
+
+    return StreamingResponse(
+        export_chunks(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="contacts.{extension}"'},
     )
 
 
@@ -60,7 +133,7 @@ async def get_contacts(
 async def get_contact_by_id(
     contact_id: int,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     """
     Return a Contact by ID Contacts.
@@ -68,14 +141,14 @@ async def get_contact_by_id(
     Args:
         contact_id (int): a Contact ID.
         db (AsyncSession): An instance of AsyncSession.
-        user (User): a current user
+        user (Principal): a current user
 
     Returns:
         Contact
     """
 
     contacts_service = ContactsService(db, user)
-    return await contacts_service.get_by_id(contact_id)
+    return contact_response(await contacts_service.get_by_id(contact_id))
 
 
 @routerContacts.post(
@@ -87,7 +160,7 @@ async def get_contact_by_id(
 async def create_contact(
     body: ContactCreateModel,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     """
     Add a new Contact.
@@ -95,14 +168,46 @@ async def create_contact(
     Args:
         body (ContactCreateModel): instance of ContactCreateModel
         db (AsyncSession): An instance of AsyncSession.
-        user (User): a current user
+        user (Principal): a current user
 
     Returns:
         Contact
     """
 
     contacts_service = ContactsService(db, user)
-    return await contacts_service.create(body)
+    contact = await contacts_service.create(body)
+    return contact_response(contact, status_code=status.HTTP_201_CREATED)
+
+
+@routerContacts.post(
+    "/import",
+    response_model=ContactImportReportModel,
+    responses={**bad_request_response_docs},
+)
+async def import_contacts(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    user: Principal = Depends(get_current_user),
+):
+    """
+    Import Contacts from a streamed text/csv or application/x-ndjson body.
+
+    CSV needs a header row with the ContactCreateModel field names. Rows are
+    validated as they arrive and inserted in batches; invalid rows and
+    duplicate emails are reported by their row number.
+
+    Args:
+        request (Request): An instance of Request.
+        db (AsyncSession): An instance of AsyncSession.
+        user (Principal): a current user
+
+    Returns:
+        ContactImportReportModel
+    """
+
+    records = read_records(request.stream(), request.headers.get("content-type", ""))
+    contacts_service = ContactsService(db, user)
+    return await contacts_service.import_contacts(records)
 
 
 @routerContacts.patch(
@@ -117,7 +222,7 @@ async def update_contact_by_id(
     body: ContactUpdateModel,
     contact_id: int,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     """
     Update a Contact.
@@ -126,14 +231,14 @@ async def update_contact_by_id(
         body (ContactUpdateModel): instance of ContactUpdateModel
         contact_id (int): a Contact ID
         db (AsyncSession): An instance of AsyncSession.
-        user (User): a current user
+        user (Principal): a current user
 
     Returns:
         Contact
     """
 
     contacts_service = ContactsService(db, user)
-    return await contacts_service.update_by_id(contact_id, body)
+    return contact_response(await contacts_service.update_by_id(contact_id, body))
 
 
 @routerContacts.delete(
@@ -144,7 +249,7 @@ async def update_contact_by_id(
 async def delete_contact_by_id(
     contact_id: int,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_user),
 ):
     """
     Delete a Contact by its ID.
@@ -152,7 +257,7 @@ async def delete_contact_by_id(
     Args:
         contact_id (int): a Contact ID
         db (AsyncSession): An instance of AsyncSession.
-        user (User): a current user
+        user (Principal): a current user
 
     Returns:
         NO CONTENT
@@ -1,25 +1,25 @@
 from fastapi import APIRouter, Depends, File, UploadFile, Request
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 from sqlalchemy.ext.asyncio import AsyncSession
+from src.conf.config import settings
 from src.database.db import get_db
 
-from src.schemas.users import User
-from src.services.auth import get_current_user, get_current_user_admin
+from src.schemas.serializers import user_response
+from src.schemas.users import Principal, User
+from src.services.auth import get_current_db_user, get_current_user_admin
+from src.services.limiter import limiter
 from src.services.users import UserService
 from src.services.upload import UploadService, CloudinaryUploadService
 
 routerUsers = APIRouter(prefix="/users", tags=["users"])
-limiter = Limiter(key_func=get_remote_address)
 
 
 @routerUsers.get(
     "/me", response_model=User, description="Limitted by 10 requests per 1 minute"
 )
-@limiter.limit("10/minute")
-async def me(request: Request, user: User = Depends(get_current_user)):
+@limiter.limit(settings.RATE_LIMIT_ME)
+async def me(request: Request, user: User = Depends(get_current_db_user)):
     """
-    Return a curent user. Limitted request by 10 requests per 1 minute
+    Return a curent user. Limitted request by 10 requests per 1 minute per user
 
     Args:
         request (Request): An instance of Request.
@@ -28,13 +28,14 @@ async def me(request: Request, user: User = Depends(get_current_user)):
     Returns:
         User
     """
-    return user
+    return user_response(user)
 
 
 @routerUsers.patch("/avatar", response_model=User)
 async def update_avatar_user(
     file: UploadFile = File(),
-    user: User = Depends(get_current_user_admin),
+    _: Principal = Depends(get_current_user_admin),
+    user: User = Depends(get_current_db_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -42,6 +43,7 @@ async def update_avatar_user(
 
     Args:
         file (UploadFile): An instance of UploadFile.
+        _ (Principal): an admin Principal.
         user (User): a current user
         db (AsyncSession): An instance of AsyncSession.
 
@@ -53,4 +55,4 @@ async def update_avatar_user(
     avatar_url = upload_service.upload_file(file, user.username)
     user_service = UserService(db)
 
-    return await user_service.update_avatar_url(user.email, avatar_url)
+    return user_response(await user_service.update_avatar_url(user.email, avatar_url))
@@ -3,6 +3,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
 from src.database.db import get_db
+from src.database.models import User
+from src.services.auth import get_current_user_admin
+from src.services.metrics import metrics
 
 routerUtils = APIRouter(tags=["utils"])
 
@@ -35,3 +38,18 @@ async def healthchecker(db: AsyncSession = Depends(get_db)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error connecting to the database",
         )
+
+
+@routerUtils.get("/metrics/")
+async def get_metrics(_: User = Depends(get_current_user_admin)):
+    """
+    Return in-process metrics of the worker. Admins only.
+
+    Args:
+        _ (User): Injected instance of an Admin User.
+
+    Returns:
+        dict(counters, gauges, timings)
+    """
+
+    return metrics.snapshot()
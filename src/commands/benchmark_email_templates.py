@@ -0,0 +1,87 @@
+"""
+Measure the cost of rendering a thousand email templates.
+
+Compares loading and compiling a template for every message, the way a new
+mail client per email did, with rendering the precompiled template.
+
+Run from the project root:
+    python -m src.commands.benchmark_email_templates --messages 1000
+"""
+
+import argparse
+import time
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from src.services.email import (
+    EMAIL_TEMPLATES,
+    TEMPLATE_FOLDER,
+    VERIFICATION_EMAIL,
+    get_email_template,
+    precompile_templates,
+)
+
+CONTEXT = {"username": "benchmark", "host": "https://example.com/", "token": "x" * 160}
+
+
+def render_uncached(kind: str, messages: int) -> float:
+    """
+    Render messages with a new environment for every message.
+
+    Args:
+        kind (str): a kind of the email.
+        messages (int): the number of messages.
+
+    Returns:
+        Seconds
+    """
+
+    started = time.perf_counter()
+    for _ in range(messages):
+        environment = Environment(
+            loader=FileSystemLoader(TEMPLATE_FOLDER),
+            autoescape=select_autoescape(["html"]),
+        )
+        environment.get_template(EMAIL_TEMPLATES[kind][1]).render(**CONTEXT)
+    return time.perf_counter() - started
+
+
+def render_precompiled(kind: str, messages: int) -> float:
+    """
+    Render messages with the precompiled template.
+
+    Args:
+        kind (str): a kind of the email.
+        messages (int): the number of messages.
+
+    Returns:
+        Seconds
+    """
+
+    precompile_templates()
+    started = time.perf_counter()
+    for _ in range(messages):
+        get_email_template(kind).render(**CONTEXT)
+    return time.perf_counter() - started
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument(
+        "--kind", choices=sorted(EMAIL_TEMPLATES), default=VERIFICATION_EMAIL
+    )
+    args = parser.parse_args(argv)
+
+    uncached = render_uncached(args.kind, args.messages)
+    precompiled = render_precompiled(args.kind, args.messages)
+    per_thousand = 1000 / args.messages
+
+    print(f"{'':>12} {'ms/1000 messages':>17}")
+    print(f"{'uncached':>12} {uncached * per_thousand * 1000:>17.1f}")
+    print(f"{'precompiled':>12} {precompiled * per_thousand * 1000:>17.1f}")
+    print(f"speedup x{uncached / precompiled:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Compare the cost of verifying an access token with and without the decode cache.
+
+A client repeats the same bearer token on every request, so the benchmark
+decodes one token `--iterations` times through jwt.decode and through the
+TokenDecodeCache.
+
+Run from the project root:
+    python -m src.commands.benchmark_jwt_decode --iterations 20000
+"""
+
+import argparse
+import time
+from datetime import UTC, datetime, timedelta
+
+from jose import jwt
+
+from src.conf.config import settings
+from src.services.tokens import TokenDecodeCache
+
+
+def measure(decode, token: str, iterations: int) -> float:
+    """
+    Return the mean time of decoding a token.
+
+    Args:
+        decode (Callable): a function decoding a token.
+        token (str): an encoded JWT.
+        iterations (int): the number of decodes.
+
+    Returns:
+        Seconds per decode.
+    """
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        decode(token)
+    return (time.perf_counter() - started) / iterations
+
+
+def benchmark(iterations: int) -> tuple[float, float]:
+    """
+    Measure decoding without and with the cache.
+
+    Args:
+        iterations (int): decodes per variant.
+
+    Returns:
+        (seconds per uncached decode, seconds per cached decode)
+    """
+
+    token = jwt.encode(
+        {
+            "sub": "benchmark",
+            "uid": 1,
+            "role": "user",
+            "confirmed": True,
+            "ver": 0,
+            "exp": datetime.now(UTC) + timedelta(hours=1),
+        },
+        settings.JWT_SECRET,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+    cache = TokenDecodeCache(max_size=1, leeway=5, max_ttl=300)
+
+    uncached = measure(
+        lambda value: jwt.decode(
+            value, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
+        ),
+        token,
+        iterations,
+    )
+    cached = measure(cache.decode, token, iterations)
+    return uncached, cached
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    uncached, cached = benchmark(args.iterations)
+
+    print(f"{'':>8} {'us/decode':>10}")
+    print(f"{'jwt':>8} {uncached * 1e6:>10.2f}")
+    print(f"{'cached':>8} {cached * 1e6:>10.2f}")
+    print(f"speedup x{uncached / cached:.1f}")
+
+
+if __name__ == "__main__":
+    main()
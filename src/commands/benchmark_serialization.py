@@ -0,0 +1,90 @@
+"""
+Compare serialization of a contacts page by response_model and by TypeAdapter.
+
+FastAPI response_model validation of ORM Contacts is compared with the
+precompiled TypeAdapter path of src.schemas.serializers fed with ContactRecord
+DTOs of the Core read path.
+
+Run from the project root:
+    python -m src.commands.benchmark_serialization --rows 1000
+"""
+
+import argparse
+import asyncio
+import timeit
+from datetime import date
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from src.database.models import Contact
+from src.schemas.contacts import ContactRecord, ResponseContactModel
+from src.schemas.serializers import contacts_response
+
+REPEAT = 5
+NUMBER = 20
+
+
+def make_contacts(count: int) -> list[Contact]:
+    return [
+        Contact(
+            id=contact_id,
+            first_name=f"First{contact_id}",
+            last_name=f"Last{contact_id}",
+            email=f"contact{contact_id}@example.com",
+            phone="+380501234567",
+            birthday=date(1990, 1, 1 + contact_id % 28),
+            user_id=1,
+        )
+        for contact_id in range(1, count + 1)
+    ]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    contacts = make_contacts(args.rows)
+    records = [
+        ContactRecord(
+            contact.id,
+            contact.first_name,
+            contact.last_name,
+            contact.email,
+            contact.phone,
+            contact.birthday,
+        )
+        for contact in contacts
+    ]
+    field = create_model_field(
+        name="Response_get_contacts", type_=List[ResponseContactModel]
+    )
+    loop = asyncio.new_event_loop()
+
+    def fastapi_path():
+        content = loop.run_until_complete(
+            serialize_response(field=field, response_content=contacts)
+        )
+        return JSONResponse(content).body
+
+    def fast_path():
+        return contacts_response(records).body
+
+    assert fastapi_path() == fast_path()
+
+    results = {}
+    for name, func in (("response_model", fastapi_path), ("TypeAdapter", fast_path)):
+        best = min(timeit.repeat(func, repeat=REPEAT, number=NUMBER)) / NUMBER
+        results[name] = best
+        print(f"{name:>15}: {best * 1000:.2f} ms per {args.rows} rows")
+
+    speedup = results["response_model"] / results["TypeAdapter"]
+    print(f"{'speedup':>15}: {speedup:.1f}x")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
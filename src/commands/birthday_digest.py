@@ -0,0 +1,40 @@
+"""
+Queue digests of upcoming birthdays for one day.
+
+Runs the same batch as the scheduler, e.g. from cron. A day's batch is queued
+once, a repeated run of the day is a no-op.
+
+Run from the project root:
+    python -m src.commands.birthday_digest --date 2024-12-30 --days 7
+"""
+
+import argparse
+import asyncio
+from datetime import date
+
+from src.conf.config import settings
+from src.utils import utcnow
+from src.workers.birthday_digest import queue_digests
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--date", type=date.fromisoformat, default=None, help="today UTC by default"
+    )
+    parser.add_argument("--days", type=int, default=settings.BIRTHDAY_DIGEST_DAYS)
+    args = parser.parse_args(argv)
+
+    from src.database.db import sessionmanager
+
+    today = args.date or utcnow().date()
+    queued = asyncio.run(queue_digests(sessionmanager.session, today, args.days))
+
+    if queued is None:
+        print(f"Birthday digests of {today} are queued already.")
+    else:
+        print(f"Queued {queued} birthday digests of {today}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Measure argon2id hashing latency on this host and recommend cost settings.
+
+Every candidate cost is hashed by `--concurrency` threads at once, the way
+PASSWORD_HASH_WORKERS concurrent logins do, and the strongest cost whose
+p99 latency fits the target is recommended.
+
+Run from the project root:
+    python -m src.commands.calibrate_password_hash --target-ms 250
+"""
+
+import argparse
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.hash import argon2
+
+from src.conf.config import settings
+
+MEMORY_COSTS = (19456, 32768, 47104, 65536, 131072)  # KiB
+TIME_COSTS = (1, 2, 3, 4)
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    """
+    Return a nearest-rank percentile of samples.
+
+    Args:
+        samples (list[float]): measured values.
+        percent (float): a percentile between 0 and 100.
+
+    Returns:
+        float
+    """
+
+    ordered = sorted(samples)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def measure(
+    memory_cost: int,
+    time_cost: int,
+    parallelism: int,
+    samples: int,
+    concurrency: int,
+) -> list[float]:
+    """
+    Hash a password `samples` times with `concurrency` threads.
+
+    Args:
+        memory_cost (int): argon2 memory cost in KiB.
+        time_cost (int): argon2 number of passes.
+        parallelism (int): argon2 lanes.
+        samples (int): the number of hashes.
+        concurrency (int): the number of threads hashing at once.
+
+    Returns:
+        Latencies in seconds.
+    """
+
+    hasher = argon2.using(
+        type="ID",
+        memory_cost=memory_cost,
+        time_cost=time_cost,
+        parallelism=parallelism,
+    )
+
+    def run(_):
+        started = time.perf_counter()
+        hasher.hash("calibration password")
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(run, range(samples)))
+
+
+def calibrate(
+    target: float, parallelism: int, samples: int, concurrency: int
+) -> tuple[list[tuple[int, int, float]], tuple[int, int] | None]:
+    """
+    Measure candidate costs and pick the strongest one within the target.
+
+    Args:
+        target (float): the target p99 latency in seconds.
+        parallelism (int): argon2 lanes.
+        samples (int): hashes per candidate.
+        concurrency (int): threads hashing at once.
+
+    Returns:
+        (a list of (memory cost, time cost, p99), a recommended (memory cost, time cost) or None)
+    """
+
+    results = []
+    best = None
+
+    for memory_cost in MEMORY_COSTS:
+        for time_cost in TIME_COSTS:
+            p99 = percentile(
+                measure(memory_cost, time_cost, parallelism, samples, concurrency),
+                99,
+            )
+            results.append((memory_cost, time_cost, p99))
+
+            if p99 > target:
+                # Higher time costs of this memory cost are slower still
+                break
+            if best is None or memory_cost * time_cost > best[0] * best[1]:
+                best = (memory_cost, time_cost)
+
+    return results, best
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--target-ms",
+        type=float,
+        default=250,
+        help="target p99 latency of a password hash in milliseconds",
+    )
+    parser.add_argument(
+        "--parallelism", type=int, default=settings.PASSWORD_ARGON2_PARALLELISM
+    )
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.PASSWORD_HASH_WORKERS
+    )
+    args = parser.parse_args(argv)
+
+    results, best = calibrate(
+        args.target_ms / 1000, args.parallelism, args.samples, args.concurrency
+    )
+
+    print(f"{'memory KiB':>10} {'time':>4} {'p99 ms':>8}")
+    for memory_cost, time_cost, p99 in results:
+        print(f"{memory_cost:>10} {time_cost:>4} {p99 * 1000:>8.1f}")
+
+    if best is None:
+        print(f"No cost fits a p99 of {args.target_ms:g} ms on this host.")
+        return
+
+    print()
+    print(f"PASSWORD_ARGON2_MEMORY_COST={best[0]}")
+    print(f"PASSWORD_ARGON2_TIME_COST={best[1]}")
+    print(f"PASSWORD_ARGON2_PARALLELISM={args.parallelism}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,19 @@ class Settings(BaseSettings):
     JWT_SECRET: str = ""
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRATION_SECONDS: int = 3600
+    # Embed id, role, confirmed flag and token version in access tokens
+    JWT_STATELESS_PRINCIPAL: bool = True
+    JWT_VERSION_CACHE_SECONDS: int = 30
+    # Verified claims are reused until `exp` minus the leeway
+    JWT_DECODE_CACHE_SIZE: int = 10000
+    JWT_DECODE_CACHE_LEEWAY: float = 5
+    JWT_DECODE_CACHE_MAX_TTL: float = 300
+    REFRESH_TOKEN_EXPIRATION_SECONDS: int = 30 * 24 * 3600
+    # A per-worker Bloom filter of revoked access tokens
+    TOKEN_REVOCATION_BLOOM_CAPACITY: int = 100_000
+    TOKEN_REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    TOKEN_REVOCATION_REFRESH_SECONDS: float = 1
+    TOKEN_REVOCATION_REBUILD_SECONDS: float = 3600
     CLOUDINARY_NAME: str = ""
     CLOUDINARY_API_KEY: int = 0
     CLOUDINARY_API_SECRET: str = ""
@@ -18,6 +31,75 @@ class Settings(BaseSettings):
     MAIL_PORT: int = 465
     MAIL_SERVER: str = ""
     MAIL_FROM_NAME: str = ""
+    MAIL_SSL_TLS: bool = True
+    MAIL_STARTTLS: bool = False
+    MAIL_VALIDATE_CERTS: bool = True
+    MAIL_TIMEOUT: float = 30
+    # Persistent SMTP connections of an outbox worker
+    MAIL_POOL_SIZE: int = 4
+    MAIL_POOL_IDLE_SECONDS: float = 60
+    MAIL_POOL_CHECK_SECONDS: float = 10
+
+    # Compiled email templates, a per-user temporary directory by default
+    EMAIL_TEMPLATE_CACHE_DIR: str = ""
+
+    # Emails are sent by `python -m src.workers.email_outbox`
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_POLL_SECONDS: float = 2
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8
+    EMAIL_OUTBOX_RETRY_BASE_SECONDS: float = 30
+    EMAIL_OUTBOX_RETRY_MAX_SECONDS: float = 3600
+    # A claimed batch is not claimed again until its lease expires, it must
+    # outlast sending the batch
+    EMAIL_OUTBOX_LEASE_SECONDS: float = 300
+    # Sent emails per second of a worker, 0 is unlimited
+    EMAIL_OUTBOX_RATE_PER_SECOND: float = 0
+    # Repeated reset password requests for a recipient within the window
+    # reuse the email already in the outbox
+    EMAIL_COALESCE_SECONDS: float = 300
+
+    # Daily digests of upcoming birthdays, queued once a day at the UTC hour
+    # by `python -m src.commands.birthday_digest` or the scheduler
+    BIRTHDAY_DIGEST_DAYS: int = 7
+    BIRTHDAY_DIGEST_HOUR: int = 8
+    BIRTHDAY_DIGEST_RETRY_BASE_SECONDS: float = 30
+    BIRTHDAY_DIGEST_RETRY_MAX_SECONDS: float = 900
+    # Run the scheduler in the API process, every node may run it
+    BIRTHDAY_DIGEST_SCHEDULER: bool = False
+
+    CONTACTS_IMPORT_BATCH_SIZE: int = 1000
+    CONTACTS_IMPORT_MAX_ERRORS: int = 1000
+    # Characters of an imported row, a longer row rejects the import
+    CONTACTS_IMPORT_MAX_LINE_LENGTH: int = 65536
+    CONTACTS_EXPORT_BATCH_SIZE: int = 1000
+
+    # argon2id cost, memory in KiB
+    PASSWORD_ARGON2_MEMORY_COST: int = 19456
+    PASSWORD_ARGON2_TIME_COST: int = 2
+    PASSWORD_ARGON2_PARALLELISM: int = 1
+
+    REDIS_URL: str = "redis://localhost:6379/0"
+
+    # "memory" (in-process L1 only) or "redis" (L1 and a shared L2 with
+    # invalidation across workers)
+    CACHE_BACKEND: str = "memory"
+    CACHE_PREFIX: str = "contacts-api:"
+    CACHE_L1_MAX_SIZE: int = 10000
+    CACHE_L1_TTL: float = 30
+    CACHE_LOCK_TIMEOUT: float = 2.0
+    USER_CACHE_TTL: int = 180
+    CONTACTS_CACHE_TTL: int = 60
+
+    # memory:// counts per worker, redis://host:port/db shares limits across workers
+    RATE_LIMIT_STORAGE_URI: str = "memory://"
+    RATE_LIMIT_STRATEGY: str = "moving-window"
+    RATE_LIMIT_ME: str = "10/minute"
+    RATE_LIMIT_LOGIN: str = "10/minute"
+    RATE_LIMIT_PASSWORD_RESET: str = "3/minute"
+
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_WAITING: int = 64
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = 5.0
 
     model_config = ConfigDict(
         extra="ignore",
@@ -1,4 +1,6 @@
 import contextlib
+import re
+from sqlalchemy import event
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
@@ -9,11 +11,66 @@ from sqlalchemy.ext.asyncio import (
 from src.conf.config import settings
 
 
+def _trigrams(value: str) -> set[str]:
+    trigrams = set()
+    for word in re.findall(r"[^\W_]+", value.lower()):
+        padded = f"  {word} "
+        trigrams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def trigram_similarity(left: str | None, right: str | None) -> float:
+    """
+    Return a pg_trgm compatible similarity of two strings.
+
+    Args:
+        left (str): the first string.
+        right (str): the second string.
+
+    Returns:
+        float from 0 to 1
+    """
+
+    if left is None or right is None:
+        return 0.0
+
+    left_trigrams, right_trigrams = _trigrams(left), _trigrams(right)
+    union = left_trigrams | right_trigrams
+
+    if not union:
+        return 0.0
+
+    return len(left_trigrams & right_trigrams) / len(union)
+
+
+def register_sqlite_functions(engine: AsyncEngine) -> None:
+    """
+    Register SQL functions that SQLite lacks, e.g. similarity() of pg_trgm.
+
+    Args:
+        engine (AsyncEngine): a SQLite engine.
+
+    Returns:
+        None
+    """
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def connect(dbapi_connection, _):
+        dbapi_connection.create_function(
+            "similarity", 2, trigram_similarity, deterministic=True
+        )
+
+
 class DatabaseSessionManager:
     def __init__(self, url: str):
         self._engine: AsyncEngine | None = create_async_engine(url)
+        if self._engine.dialect.name == "sqlite":
+            register_sqlite_functions(self._engine)
         self._session_maker: async_sessionmaker = async_sessionmaker(
-            autoflush=False, autocommit=False, bind=self._engine
+            autoflush=False,
+            autocommit=False,
+            expire_on_commit=False,
+            bind=self._engine,
         )
 
     @contextlib.asynccontextmanager
@@ -1,7 +1,25 @@
 from datetime import date
 from enum import Enum
-from sqlalchemy import Integer, String, Date, ForeignKey, Boolean, Enum as SqlEnum
-from sqlalchemy.orm import DeclarativeBase, relationship, mapped_column, Mapped
+from sqlalchemy import (
+    JSON,
+    Integer,
+    String,
+    Text,
+    Date,
+    ForeignKey,
+    Boolean,
+    Index,
+    UniqueConstraint,
+    Enum as SqlEnum,
+    func,
+)
+from sqlalchemy.orm import (
+    DeclarativeBase,
+    relationship,
+    mapped_column,
+    Mapped,
+    validates,
+)
 from sqlalchemy.sql.sqltypes import DateTime, Date
 from datetime import datetime
 
@@ -15,6 +33,20 @@ class Base(DeclarativeBase):
     pass
 
 
+def get_birthday_key(birthday: date) -> int:
+    """
+    Return a sortable month/day key of a birthday, e.g. 1231 for 31 December.
+
+    Args:
+        birthday (date): a date of birth.
+
+    Returns:
+        int
+    """
+
+    return birthday.month * 100 + birthday.day
+
+
 class Contact(Base):
     __tablename__ = "contacts"
 
@@ -23,12 +55,37 @@ class Contact(Base):
     last_name: Mapped[str] = mapped_column(String(100), nullable=False)
     email: Mapped[str] = mapped_column(String(180), nullable=False)
     phone: Mapped[str] = mapped_column(String(80), nullable=False)
-    birthday: Mapped[str] = mapped_column(String(10), nullable=False)
+    birthday: Mapped[date] = mapped_column(Date, nullable=False)
+    birthday_key: Mapped[int] = mapped_column(Integer, nullable=False)
     user_id: Mapped[int] = mapped_column(
         ForeignKey("users.id", ondelete="CASCADE"), default=None
     )
     user = relationship("User", backref="contacts")
 
+    __table_args__ = (
+        Index("ix_contacts_user_id_id", "user_id", "id"),
+        Index("ix_contacts_user_id_birthday_key", "user_id", "birthday_key"),
+        Index(
+            "ix_contacts_search_trgm",
+            "first_name",
+            "last_name",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={
+                "first_name": "gin_trgm_ops",
+                "last_name": "gin_trgm_ops",
+                "email": "gin_trgm_ops",
+            },
+        ),
+    )
+
+    @validates("birthday")
+    def validate_birthday(self, _, birthday: date | str) -> date:
+        if isinstance(birthday, str):
+            birthday = date.fromisoformat(birthday)
+        self.birthday_key = get_birthday_key(birthday)
+        return birthday
+
 
 class User(Base):
     __tablename__ = "users"
@@ -42,3 +99,113 @@ class User(Base):
     role: Mapped[SqlEnum] = mapped_column(
         SqlEnum(UserRole), default=UserRole.USER, nullable=False
     )
+    # Incremented to revoke issued access tokens
+    token_version: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    # An HMAC of the token, the token itself is never stored
+    token_hash: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    # Tokens rotated from the same login share a family
+    family_id: Mapped[str] = mapped_column(String(32), nullable=False)
+    # The token version of the user when the family was issued
+    token_version: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    used_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    revoked_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_refresh_tokens_family_id", "family_id"),
+        Index("ix_refresh_tokens_user_id", "user_id"),
+    )
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # The jti claim of a revoked access token
+    jti: Mapped[str] = mapped_column(String(32), unique=True, nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    revoked_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    # Expired tokens are rejected anyway, their rows can be dropped
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_revoked_tokens_revoked_at", "revoked_at"),
+        Index("ix_revoked_tokens_expires_at", "expires_at"),
+    )
+
+
+class EmailStatus(str, Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # A template of the email, e.g. "verification"
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)
+    recipient: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Template variables
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    status: Mapped[SqlEnum] = mapped_column(
+        SqlEnum(EmailStatus), default=EmailStatus.PENDING, nullable=False
+    )
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    sent_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+
+class JobRun(Base):
+    __tablename__ = "job_runs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # A scheduled job, e.g. "birthday_digest"
+    name: Mapped[str] = mapped_column(String(50), nullable=False)
+    # The day of the batch, one run per day on any node
+    run_date: Mapped[date] = mapped_column(Date, nullable=False)
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    finished_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    # The number of processed items, e.g. queued emails
+    items: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("name", "run_date", name="uq_job_runs_name_run_date"),
+    )
+
+
+Index(
+    "ix_contacts_user_id_lower_email",
+    Contact.user_id,
+    func.lower(Contact.email),
+    unique=True,
+)
+Index("ix_users_lower_username", func.lower(User.username), unique=True)
+Index("ix_users_lower_email", func.lower(User.email), unique=True)
+Index(
+    "ix_email_outbox_lower_recipient_kind_created_at",
+    func.lower(EmailOutbox.recipient),
+    EmailOutbox.kind,
+    EmailOutbox.created_at,
+)
@@ -0,0 +1,54 @@
+from datetime import date
+from typing import Sequence
+
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import Contact, User
+from src.repository.contacts import ContactsRepository
+
+
+class BirthdaysRepository:
+    def __init__(self, session: AsyncSession):
+        """
+        Initialize a BirthdaysRepository of contacts of all users.
+
+        Args:
+            session: An AsyncSession object connected to the database.
+        """
+
+        self.db = session
+
+    async def get_upcoming(self, today: date, days: int) -> Sequence[Row]:
+        """
+        Get upcoming birthdays of contacts of all confirmed users in one query.
+
+        Args:
+            today (date): The first day of the period.
+            days (int): Number of days within future birthdays.
+
+        Returns:
+            Rows of (user_id, username, email, first_name, last_name, birthday)
+            ordered by user_id.
+        """
+
+        stmt = (
+            select(
+                User.id.label("user_id"),
+                User.username,
+                User.email,
+                Contact.first_name,
+                Contact.last_name,
+                Contact.birthday,
+            )
+            .join(Contact, Contact.user_id == User.id)
+            .filter(User.confirmed.is_(True))
+            .order_by(User.id, Contact.id)
+        )
+
+        birthdays_filter = ContactsRepository._birthdays_filter(today, days)
+        if birthdays_filter is not None:
+            stmt = stmt.filter(birthdays_filter)
+
+        result = await self.db.execute(stmt)
+        return result.all()
@@ -1,27 +1,138 @@
-from datetime import datetime, timedelta
-from sqlalchemy import select
+import calendar
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql.expression import or_, and_, func
 
-from src.database.models import Contact
-from src.schemas.contacts import ContactCreateModel, ContactUpdateModel
+from src.database.models import Contact, get_birthday_key
+from src.schemas.contacts import (
+    ContactCreateModel,
+    ContactRecord,
+    ContactUpdateModel,
+)
 from src.schemas.users import User
+from src.services.cache import ContactCache, contact_cache
+
+# The same default as pg_trgm.similarity_threshold used by the % operator
+SEARCH_SIMILARITY_THRESHOLD = 0.3
+
+# SQLSTATE of a unique constraint violation reported by asyncpg
+UNIQUE_VIOLATION = "23505"
+
+RECORD_COLUMNS = (
+    Contact.id,
+    Contact.first_name,
+    Contact.last_name,
+    Contact.email,
+    Contact.phone,
+    Contact.birthday,
+)
+
+BULK_COLUMNS = (
+    "first_name",
+    "last_name",
+    "email",
+    "phone",
+    "birthday",
+    "birthday_key",
+    "user_id",
+)
 
 
 class ContactsRepository:
     current_user: User
 
-    def __init__(self, session: AsyncSession, user: User):
+    def __init__(
+        self, session: AsyncSession, user: User, cache: ContactCache | None = None
+    ):
         """
         Initialize a ContactsRepository.
 
         Args:
             session: An AsyncSession object connected to the database.
             user: An instance of the User class. The owner of the Contacts to retrieve.
+            cache: A ContactCache of reads, invalidated on every write, the shared one by default.
         """
 
         self.db = session
         self.current_user = user
+        self.cache = cache if cache is not None else contact_cache
+
+    def _select_records(self):
+        """
+        Select columns of ContactRecord of the current user with Core, so rows
+        are not hydrated into ORM objects or tracked by the session.
+        """
+
+        return select(*RECORD_COLUMNS).filter(Contact.user_id == self.current_user.id)
+
+    def _is_postgresql(self) -> bool:
+        return self.db.get_bind().dialect.name == "postgresql"
+
+    def _search_clauses(self, search: str):
+        """
+        Build a filter and a relevance expression for a search query.
+
+        On PostgreSQL the % similarity operator and ILIKE are served by the
+        pg_trgm GIN index. Other backends compare the registered similarity()
+        function with the pg_trgm default threshold.
+
+        Args:
+            search (str): Search query for email, first name and last name.
+
+        Returns:
+            A tuple of a filter clause and a relevance expression.
+        """
+
+        columns = (Contact.first_name, Contact.last_name, Contact.email)
+        similarities = [func.similarity(column, search) for column in columns]
+
+        if self._is_postgresql():
+            fuzzy = [column.op("%")(search) for column in columns]
+            relevance = func.greatest(*similarities)
+        else:
+            fuzzy = [
+                similarity >= SEARCH_SIMILARITY_THRESHOLD for similarity in similarities
+            ]
+            relevance = func.max(*similarities)
+
+        contains = [column.ilike(f"%{search}%") for column in columns]
+        return or_(*contains, *fuzzy), relevance
+
+    @staticmethod
+    def _birthdays_filter(today: date, days: int):
+        """
+        Build a filter of birthdays within a number of days from today.
+
+        The filter is a range over the indexed birthday_key, split in two
+        ranges when the period crosses the New Year. A 29 February birthday
+        is celebrated on 28 February in a non-leap year.
+
+        Args:
+            today (date): The first day of the period.
+            days (int): Number of days within future birthdays.
+
+        Returns:
+            A filter clause or None if the period covers a whole year.
+        """
+
+        if days >= 365:
+            return None
+
+        end = today + timedelta(days=days)
+        start_key, end_key = get_birthday_key(today), get_birthday_key(end)
+
+        if end_key == 228 and not calendar.isleap(end.year):
+            end_key = 229
+
+        if end.year > today.year:
+            return or_(
+                Contact.birthday_key >= start_key, Contact.birthday_key <= end_key
+            )
+
+        return Contact.birthday_key.between(start_key, end_key)
 
     async def get_all(
         self,
@@ -29,51 +140,99 @@ class ContactsRepository:
         search: str | None = None,
         offset: int | None = None,
         limit: int | None = None,
+        after_id: int | None = None,
     ):
         """
-        Get a list of Contacts with possible pagination.
+        Get a list of Contacts ordered by ID with possible pagination through the cache.
+        Search results are ordered by relevance instead.
 
         Args:
             birthdays_within (int, Optional): Number of days within future birthdays.
             search (str, Optional): Search query for email, first name and last name.
             offset (int, Optional): The number of Contacts to skip.
             limit (int, Optional): The maximum number of Contacts to return.
+            after_id (int, Optional): Return only Contacts with an ID greater than this one (keyset pagination).
 
         Returns:
-            A list of Contacts.
+            A list of ContactRecord.
         """
 
-        stmt = select(Contact).limit(limit).offset(offset)
+        params = {
+            "birthdays_within": birthdays_within,
+            "search": search,
+            "offset": offset,
+            "limit": limit,
+            "after_id": after_id,
+        }
+        if birthdays_within is not None:
+            # The window moves with the current date
+            params["today"] = datetime.now().date()
+
+        return await self.cache.get_page(
+            self.current_user.id, params, lambda: self._get_all(**params)
+        )
+
+    async def _get_all(
+        self,
+        birthdays_within: int | None = None,
+        search: str | None = None,
+        offset: int | None = None,
+        limit: int | None = None,
+        after_id: int | None = None,
+        today: date | None = None,
+    ) -> list[ContactRecord]:
+        stmt = self._select_records().limit(limit).offset(offset)
+
+        if after_id is not None:
+            stmt = stmt.filter(Contact.id > after_id)
 
         if search is not None:
-            stmt = stmt.filter(
-                or_(
-                    Contact.first_name.ilike(f"%{search}%"),
-                    Contact.last_name.ilike(f"%{search}%"),
-                    Contact.email.ilike(f"%{search}%"),
-                )
-            )
+            search_filter, relevance = self._search_clauses(search)
+            stmt = stmt.filter(search_filter).order_by(relevance.desc())
 
-        if birthdays_within is not None:
-            today = datetime.now().date()
-            week = today + timedelta(days=birthdays_within)
+        stmt = stmt.order_by(Contact.id)
 
-            stmt = stmt.filter(
-                or_(
-                    func.to_char(Contact.birthday, "MM-DD").between(
-                        today.strftime("%m-%d"), week.strftime("%m-%d")
-                    )
-                )
+        if birthdays_within is not None:
+            birthdays_filter = self._birthdays_filter(
+                today or datetime.now().date(), birthdays_within
             )
 
-        stmt = stmt.filter(and_(Contact.user == self.current_user))
-        contacts = await self.db.execute(stmt)
+            if birthdays_filter is not None:
+                stmt = stmt.filter(birthdays_filter)
+
+        rows = await self.db.execute(stmt)
+        return [ContactRecord(*row) for row in rows]
+
+    async def stream_all(
+        self, after_id: int | None = None, batch_size: int = 1000
+    ) -> AsyncIterator[ContactRecord]:
+        """
+        Stream all Contacts ordered by ID through a server-side cursor.
+
+        Args:
+            after_id (int, Optional): Stream only Contacts with an ID greater than this one.
+            batch_size (int): The number of rows fetched from the cursor at once.
+
+        Returns:
+            An async iterator of ContactRecord.
+        """
 
-        return contacts.scalars().all()
+        stmt = (
+            self._select_records()
+            .order_by(Contact.id)
+            .execution_options(yield_per=batch_size)
+        )
+
+        if after_id is not None:
+            stmt = stmt.filter(Contact.id > after_id)
+
+        result = await self.db.stream(stmt)
+        async for row in result:
+            yield ContactRecord(*row)
 
     async def get_contact_by_email(self, email: str) -> Contact | None:
         """
-        Get a Contact by an email.
+        Get a Contact by a case-insensitive email.
 
         Args:
             email (str): An email address to search for a contact.
@@ -85,7 +244,10 @@ class ContactsRepository:
         return (
             await self.db.execute(
                 select(Contact).filter(
-                    and_(Contact.email == email, Contact.user == self.current_user)
+                    and_(
+                        func.lower(Contact.email) == email.lower(),
+                        Contact.user_id == self.current_user.id,
+                    )
                 )
             )
         ).scalar_one_or_none()
@@ -93,67 +255,181 @@ class ContactsRepository:
     async def get_contact_by_id(
         self,
         contact_id: int,
-    ) -> Contact | None:
+    ) -> ContactRecord | None:
         """
-        Get a Contact by an ID.
+        Get a Contact by an ID through the cache.
 
         Args:
             contact_id (int): An ID to search for a contact.
 
         Returns:
-            A Contact or None.
+            A ContactRecord or None.
         """
 
-        return (
+        return await self.cache.get_contact(
+            self.current_user.id,
+            contact_id,
+            lambda: self._get_contact_by_id(contact_id),
+        )
+
+    async def _get_contact_by_id(self, contact_id: int) -> ContactRecord | None:
+        row = (
             await self.db.execute(
-                select(Contact).filter(
-                    and_(Contact.id == contact_id, Contact.user == self.current_user)
-                )
+                self._select_records().filter(Contact.id == contact_id)
             )
-        ).scalar_one_or_none()
+        ).one_or_none()
+        return ContactRecord(*row) if row else None
 
     async def create(self, body: ContactCreateModel):
         """
-        Add a new Contact.
+        Add a new Contact with a single INSERT statement.
 
         Args:
             body (obj): An instance of ContactCreateModel class.
 
         Returns:
             A Contact.
+
+        Raises:
+            IntegrityError: The user already has a Contact with the same email.
         """
 
-        contact = Contact(**body.model_dump(exclude_unset=True), user=self.current_user)
+        contact = Contact(
+            **body.model_dump(exclude_unset=True), user_id=self.current_user.id
+        )
         self.db.add(contact)
-        await self.db.commit()
-        await self.db.refresh(contact)
+
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            raise
+
+        await self.cache.bump(self.current_user.id)
         return contact
 
+    async def bulk_create(self, bodies: list[ContactCreateModel]) -> set[str]:
+        """
+        Add a batch of Contacts skipping emails that the user already has.
+
+        The batch is sent with COPY on PostgreSQL and executemany elsewhere,
+        then committed once. A batch that races with a concurrent insert is
+        retried once against fresh duplicates.
+
+        Args:
+            bodies (list): instances of ContactCreateModel with unique emails.
+
+        Returns:
+            A set of lowercased emails skipped as duplicates.
+        """
+
+        for attempt in range(2):
+            existing = await self._get_existing_emails(
+                {body.email.lower() for body in bodies}
+            )
+            rows = [
+                {
+                    **body.model_dump(),
+                    "birthday_key": get_birthday_key(body.birthday),
+                    "user_id": self.current_user.id,
+                }
+                for body in bodies
+                if body.email.lower() not in existing
+            ]
+
+            try:
+                if rows and self._is_postgresql():
+                    await self._copy_contacts(rows)
+                elif rows:
+                    await self.db.execute(insert(Contact), rows)
+                await self.db.commit()
+                await self.cache.bump(self.current_user.id)
+                return existing
+            except IntegrityError:
+                await self.db.rollback()
+                if attempt:
+                    raise
+
+        return existing
+
+    async def _get_existing_emails(self, emails: set[str]) -> set[str]:
+        if not emails:
+            return set()
+
+        result = await self.db.execute(
+            select(func.lower(Contact.email)).filter(
+                and_(
+                    Contact.user_id == self.current_user.id,
+                    func.lower(Contact.email).in_(emails),
+                )
+            )
+        )
+        return set(result.scalars().all())
+
+    async def _copy_contacts(self, rows: list[dict]) -> None:
+        connection = await self.db.connection()
+        raw_connection = await connection.get_raw_connection()
+
+        try:
+            await raw_connection.driver_connection.copy_records_to_table(
+                Contact.__tablename__,
+                records=[tuple(row[column] for column in BULK_COLUMNS) for row in rows],
+                columns=BULK_COLUMNS,
+            )
+        except Exception as e:
+            if getattr(e, "sqlstate", None) == UNIQUE_VIOLATION:
+                raise IntegrityError("COPY contacts", None, e) from e
+            raise
+
     async def update(self, contact_id: int, body: ContactUpdateModel):
         """
-        Update a Contact.
+        Update a Contact with a single UPDATE ... RETURNING statement.
 
         Args:.
             contact_id (int): An ID of a Contact to update
             body (obj): An instance of ContactUpdateModel class.
 
         Returns:
-            An updated Contact.
+            An updated ContactRecord or None.
+
+        Raises:
+            IntegrityError: The user already has a Contact with the same email.
         """
 
-        contact = await self.get_contact_by_id(contact_id)
+        values = body.model_dump(exclude_unset=True)
 
-        if contact:
-            for key, value in body.model_dump(exclude_unset=True).items():
-                setattr(contact, key, value)
+        if not values:
+            return await self.get_contact_by_id(contact_id)
+
+        if values.get("birthday") is not None:
+            values["birthday_key"] = get_birthday_key(values["birthday"])
 
+        stmt = (
+            update(Contact)
+            .where(
+                Contact.id == contact_id,
+                Contact.user_id == self.current_user.id,
+            )
+            .values(**values)
+            .returning(*RECORD_COLUMNS)
+        )
+
+        try:
+            row = (await self.db.execute(stmt)).one_or_none()
             await self.db.commit()
-            await self.db.refresh(contact)
-            return contact
+        except IntegrityError:
+            await self.db.rollback()
+            raise
+
+        if row is None:
+            return None
+
+        await self.cache.bump(self.current_user.id)
+        return ContactRecord(*row)
 
     async def delete(self, contact_id: int) -> Contact | None:
         """
-        Delete a Contact.
+        Delete a Contact with a single DELETE ... RETURNING statement.
 
         Args:.
             contact_id (int): An ID of a Contact to delete
@@ -161,9 +437,19 @@ class ContactsRepository:
         Returns:
             A Contact or None.
         """
-        contact = await self.get_contact_by_id(contact_id)
+
+        contact = (
+            await self.db.execute(
+                delete(Contact)
+                .where(
+                    Contact.id == contact_id,
+                    Contact.user_id == self.current_user.id,
+                )
+                .returning(Contact)
+            )
+        ).scalar_one_or_none()
+        await self.db.commit()
 
         if contact:
-            await self.db.delete(contact)
-            await self.db.commit()
-            return contact
+            await self.cache.bump(self.current_user.id)
+        return contact
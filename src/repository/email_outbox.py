@@ -0,0 +1,138 @@
+from datetime import datetime
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import EmailOutbox, EmailStatus
+
+
+class EmailOutboxRepository:
+    def __init__(self, session: AsyncSession):
+        """
+        Initialize an EmailOutboxRepository.
+
+        Args:
+            session: An AsyncSession object connected to the database.
+        """
+
+        self.db = session
+
+    def add(self, kind: str, recipient: str, payload: dict, now: datetime) -> None:
+        """
+        Stage an email in the session without committing it, so it is written
+        in the same transaction as the change that triggers it.
+
+        Args:
+            kind (str): A template of the email.
+            recipient (str): An email address.
+            payload (dict): JSON serializable template variables.
+            now (datetime): The current time in UTC.
+        """
+
+        self.db.add(
+            EmailOutbox(
+                kind=kind,
+                recipient=recipient,
+                payload=payload,
+                status=EmailStatus.PENDING,
+                attempts=0,
+                next_attempt_at=now,
+                created_at=now,
+            )
+        )
+
+    async def has_recent(self, kind: str, recipient: str, since: datetime) -> bool:
+        """
+        Check if an email of a kind was added for a recipient since a moment and
+        has not failed.
+
+        Args:
+            kind (str): A template of the email.
+            recipient (str): An email address, compared case-insensitively.
+            since (datetime): The start of the window in UTC.
+
+        Returns:
+            bool
+        """
+
+        result = await self.db.execute(
+            select(EmailOutbox.id)
+            .filter(
+                func.lower(EmailOutbox.recipient) == recipient.lower(),
+                EmailOutbox.kind == kind,
+                EmailOutbox.created_at >= since,
+                EmailOutbox.status != EmailStatus.FAILED,
+            )
+            .limit(1)
+        )
+        return result.scalar_one_or_none() is not None
+
+    async def claim_batch(
+        self, now: datetime, limit: int, lease_until: datetime
+    ) -> list[EmailOutbox]:
+        """
+        Lock pending emails that are due, skipping rows locked by other workers,
+        and lease them by moving their next attempt to the end of the lease.
+
+        The caller commits the claim before sending, so no locks are held
+        during the sends and leased emails are not due for other workers.
+
+        Args:
+            now (datetime): The current time in UTC.
+            limit (int): The maximum number of emails.
+            lease_until (datetime): The end of the lease in UTC.
+
+        Returns:
+            A list of EmailOutbox.
+        """
+
+        result = await self.db.execute(
+            select(EmailOutbox)
+            .filter(
+                EmailOutbox.status == EmailStatus.PENDING,
+                EmailOutbox.next_attempt_at <= now,
+            )
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        emails = list(result.scalars())
+        for email in emails:
+            email.next_attempt_at = lease_until
+        return emails
+
+    async def save_result(self, email: EmailOutbox, lease_until: datetime) -> bool:
+        """
+        Save the result of sending a leased email, unless the lease was lost.
+
+        Args:
+            email (EmailOutbox): A claimed email with the result of sending.
+            lease_until (datetime): The end of the lease of the claim.
+
+        Returns:
+            bool: The lease was still held and the result is staged.
+        """
+
+        result = await self.db.execute(
+            update(EmailOutbox)
+            .where(
+                EmailOutbox.id == email.id,
+                EmailOutbox.status == EmailStatus.PENDING,
+                EmailOutbox.next_attempt_at == lease_until,
+            )
+            .values(
+                status=email.status,
+                attempts=email.attempts,
+                next_attempt_at=email.next_attempt_at,
+                last_error=email.last_error,
+                sent_at=email.sent_at,
+            )
+        )
+        return result.rowcount == 1
+
+    async def commit(self) -> None:
+        """
+        Commit staged emails, a claimed batch or a result of sending.
+        """
+
+        await self.db.commit()
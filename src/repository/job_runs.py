@@ -0,0 +1,60 @@
+from datetime import date, datetime
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import JobRun
+
+
+class JobRunRepository:
+    def __init__(self, session: AsyncSession):
+        """
+        Initialize a JobRunRepository.
+
+        Args:
+            session: An AsyncSession object connected to the database.
+        """
+
+        self.db = session
+
+    async def claim(self, name: str, run_date: date, now: datetime) -> JobRun | None:
+        """
+        Insert a run of a job for a day without committing it.
+
+        The unique (name, run_date) constraint is the lock: an insert of the
+        same run on another node waits for this transaction and fails once it
+        commits, or takes the run over if it rolls back.
+
+        Args:
+            name (str): The name of the job.
+            run_date (date): The day of the batch.
+            now (datetime): The current time in UTC.
+
+        Returns:
+            A JobRun or None if the run is claimed already.
+        """
+
+        run = JobRun(name=name, run_date=run_date, started_at=now, items=0)
+        self.db.add(run)
+
+        try:
+            await self.db.flush()
+        except IntegrityError:
+            await self.db.rollback()
+            return None
+
+        return run
+
+    async def finish(self, run: JobRun, items: int, now: datetime) -> None:
+        """
+        Commit a claimed run with the work staged in the same transaction.
+
+        Args:
+            run (JobRun): A claimed run.
+            items (int): The number of processed items.
+            now (datetime): The current time in UTC.
+        """
+
+        run.items = items
+        run.finished_at = now
+        await self.db.commit()
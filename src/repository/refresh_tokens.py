@@ -0,0 +1,120 @@
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import RefreshToken
+
+
+class RefreshTokenRepository:
+    def __init__(self, session: AsyncSession):
+        """
+        Initialize a RefreshTokenRepository.
+
+        Args:
+            session: An AsyncSession object connected to the database.
+        """
+
+        self.db = session
+
+    async def create(
+        self,
+        user_id: int,
+        token_hash: str,
+        family_id: str,
+        token_version: int,
+        created_at: datetime,
+        expires_at: datetime,
+    ) -> None:
+        """
+        Store a hash of a new refresh token.
+
+        Args:
+            user_id (int): An ID of the owner.
+            token_hash (str): An HMAC of the token.
+            family_id (str): An ID of the token family.
+            token_version (int): The token version of the owner.
+            created_at (datetime): An issue time in UTC.
+            expires_at (datetime): An expiration time in UTC.
+        """
+
+        self.db.add(
+            RefreshToken(
+                user_id=user_id,
+                token_hash=token_hash,
+                family_id=family_id,
+                token_version=token_version,
+                created_at=created_at,
+                expires_at=expires_at,
+            )
+        )
+        await self.db.commit()
+
+    async def use(self, token_hash: str, now: datetime) -> Row | None:
+        """
+        Mark an active refresh token as used with a single UPDATE ... RETURNING
+        statement on the unique hash index, so a token rotates at most once.
+
+        Args:
+            token_hash (str): An HMAC of the token.
+            now (datetime): The current time in UTC.
+
+        Returns:
+            A row of user_id, family_id and token_version or None.
+        """
+
+        row = (
+            await self.db.execute(
+                update(RefreshToken)
+                .where(
+                    RefreshToken.token_hash == token_hash,
+                    RefreshToken.used_at.is_(None),
+                    RefreshToken.revoked_at.is_(None),
+                    RefreshToken.expires_at > now,
+                )
+                .values(used_at=now)
+                .returning(
+                    RefreshToken.user_id,
+                    RefreshToken.family_id,
+                    RefreshToken.token_version,
+                )
+            )
+        ).one_or_none()
+        await self.db.commit()
+        return row
+
+    async def get_by_hash(self, token_hash: str) -> RefreshToken | None:
+        """
+        Get a refresh token by its hash.
+
+        Args:
+            token_hash (str): An HMAC of the token.
+
+        Returns:
+            A RefreshToken or None.
+        """
+
+        result = await self.db.execute(
+            select(RefreshToken).filter(RefreshToken.token_hash == token_hash)
+        )
+        return result.scalar_one_or_none()
+
+    async def revoke_family(self, family_id: str, now: datetime) -> None:
+        """
+        Revoke all active tokens of a family.
+
+        Args:
+            family_id (str): An ID of the token family.
+            now (datetime): The current time in UTC.
+        """
+
+        await self.db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.family_id == family_id,
+                RefreshToken.revoked_at.is_(None),
+            )
+            .values(revoked_at=now)
+        )
+        await self.db.commit()
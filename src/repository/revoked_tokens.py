@@ -0,0 +1,95 @@
+from datetime import datetime
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import RevokedToken
+
+
+class RevokedTokenRepository:
+    def __init__(self, session: AsyncSession):
+        """
+        Initialize a RevokedTokenRepository.
+
+        Args:
+            session: An AsyncSession object connected to the database.
+        """
+
+        self.db = session
+
+    async def add(
+        self, jti: str, user_id: int, revoked_at: datetime, expires_at: datetime
+    ) -> None:
+        """
+        Revoke a token, revoking it again is a no-op.
+
+        Args:
+            jti (str): The jti claim of the token.
+            user_id (int): An ID of the owner.
+            revoked_at (datetime): The current time in UTC.
+            expires_at (datetime): The expiration time of the token in UTC.
+        """
+
+        self.db.add(
+            RevokedToken(
+                jti=jti, user_id=user_id, revoked_at=revoked_at, expires_at=expires_at
+            )
+        )
+
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+
+    async def is_revoked(self, jti: str) -> bool:
+        """
+        Check a token by its jti with a unique index lookup.
+
+        Args:
+            jti (str): The jti claim of the token.
+
+        Returns:
+            bool
+        """
+
+        result = await self.db.execute(
+            select(RevokedToken.id).filter(RevokedToken.jti == jti)
+        )
+        return result.scalar_one_or_none() is not None
+
+    async def get_revoked_since(self, since: datetime, now: datetime) -> list[str]:
+        """
+        Get jti claims of not yet expired tokens revoked at or after a time.
+
+        Args:
+            since (datetime): A lower bound of the revocation time in UTC.
+            now (datetime): The current time in UTC.
+
+        Returns:
+            A list of jti claims.
+        """
+
+        result = await self.db.execute(
+            select(RevokedToken.jti).filter(
+                RevokedToken.revoked_at >= since, RevokedToken.expires_at > now
+            )
+        )
+        return list(result.scalars())
+
+    async def delete_expired(self, now: datetime) -> int:
+        """
+        Drop revocations of expired tokens.
+
+        Args:
+            now (datetime): The current time in UTC.
+
+        Returns:
+            The number of deleted rows.
+        """
+
+        result = await self.db.execute(
+            delete(RevokedToken).where(RevokedToken.expires_at <= now)
+        )
+        await self.db.commit()
+        return result.rowcount
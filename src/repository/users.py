@@ -1,21 +1,25 @@
 from typing import Optional
-from sqlalchemy import select
+from sqlalchemy import select, update, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import User
 from src.schemas.users import UserCreate, UserUpdate
+from src.services.cache import UserCache, user_cache
 
 
 class UserRepository:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, cache: UserCache | None = None):
         """
         Initialize a UserRepository.
 
         Args:
             session: An AsyncSession object connected to the database.
+            cache: A UserCache invalidated on every write, the shared one by default.
         """
 
         self.db = session
+        self.cache = cache if cache is not None else user_cache
 
     async def get_user_by_id(self, user_id: int) -> User | None:
         """
@@ -33,7 +37,7 @@ class UserRepository:
 
     async def get_user_by_username(self, username: str) -> User | None:
         """
-        Get a User by a username.
+        Get a User by a case-insensitive username.
 
         Args:
             username (str): A username to search for a user.
@@ -42,12 +46,14 @@ class UserRepository:
             A User or None.
         """
 
-        user = await self.db.execute(select(User).filter(User.username == username))
+        user = await self.db.execute(
+            select(User).filter(func.lower(User.username) == username.lower())
+        )
         return user.scalar_one_or_none()
 
     async def get_user_by_email(self, email: str) -> User | None:
         """
-        Get a User by an email address.
+        Get a User by a case-insensitive email address.
 
         Args:
             email (str): An email address to search for a user.
@@ -56,12 +62,14 @@ class UserRepository:
             A User or None.
         """
 
-        user = await self.db.execute(select(User).filter(User.email == email))
+        user = await self.db.execute(
+            select(User).filter(func.lower(User.email) == email.lower())
+        )
         return user.scalar_one_or_none()
 
     async def create_user(self, body: UserCreate, avatar: Optional[str] = None) -> User:
         """
-        Add a new User.
+        Add a new User with a single INSERT statement.
 
         Args:
             body (obj): An instance of UserCreate class.
@@ -69,17 +77,26 @@ class UserRepository:
 
         Returns:
             A User.
+
+        Raises:
+            IntegrityError: A user with the same email or username exists.
         """
 
         new_user = User(**body.model_dump(exclude_unset=True), avatar=avatar)
         self.db.add(new_user)
-        await self.db.commit()
-        await self.db.refresh(new_user)
+
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            raise
+
+        await self.cache.invalidate(new_user.id, new_user.username)
         return new_user
 
     async def update_avatar_url(self, email: str, url: str) -> User | None:
         """
-        Update an avatar url of a User.
+        Update an avatar url of a User with a single UPDATE ... RETURNING statement.
 
         Args:
             email (str): A email address to search for a user.
@@ -89,44 +106,95 @@ class UserRepository:
             A User or None.
         """
 
-        user = await self.get_user_by_email(email)
+        user = (
+            await self.db.execute(
+                update(User)
+                .where(func.lower(User.email) == email.lower())
+                .values(avatar=url)
+                .returning(User)
+            )
+        ).scalar_one_or_none()
+        await self.db.commit()
 
         if user:
-            setattr(user, "avatar", url)
-            await self.db.commit()
-            await self.db.refresh(user)
-            return user
+            await self.cache.invalidate(user.id, user.username)
+        return user
 
-    async def verify_email(self, email: str) -> None:
+    async def verify_email(self, email: str) -> bool:
         """
-        Verify a User by an email address.
+        Verify a not yet verified User by an email address.
 
         Args:
             email (str): A email address to search for a user.
 
         Returns:
-            None
-        """
+            True if a User was verified by this call.
+        """
+
+        row = (
+            await self.db.execute(
+                update(User)
+                .where(
+                    func.lower(User.email) == email.lower(),
+                    User.confirmed.is_not(True),
+                )
+                .values(confirmed=True)
+                .returning(User.id, User.username)
+            )
+        ).one_or_none()
+        await self.db.commit()
 
-        user = await self.get_user_by_email(email)
+        if row is None:
+            return False
 
-        if user:
-            setattr(user, "confirmed", True)
-            await self.db.commit()
+        await self.cache.invalidate(row.id, row.username)
+        return True
 
-    async def update_user(self, user: User, body: UserUpdate) -> User:
+    async def update_user(
+        self, user: User, body: UserUpdate, revoke_tokens: bool = False
+    ) -> User | None:
         """
-        Update passed user with provided data.
+        Update passed user with provided data with a single UPDATE ... RETURNING statement.
 
         Args:
             user (obj): The instance of User.
             body (UserUpdate): the instance of UserUpdate
+            revoke_tokens (bool): increment the token version to revoke issued access tokens.
 
         Returns:
-            User
+            User or None
         """
-        for key, value in body.model_dump(exclude_unset=True).items():
-            setattr(user, key, value)
+
+        values = body.model_dump(exclude_unset=True)
+
+        if revoke_tokens:
+            values["token_version"] = User.token_version + 1
+
+        if not values:
+            return user
+
+        updated_user = (
+            await self.db.execute(
+                update(User).where(User.id == user.id).values(**values).returning(User)
+            )
+        ).scalar_one_or_none()
         await self.db.commit()
-        await self.db.refresh(user)
-        return user
+
+        await self.cache.invalidate(user.id, user.username)
+        return updated_user
+
+    async def get_token_version(self, user_id: int) -> int | None:
+        """
+        Get the token version of a User by an ID.
+
+        Args:
+            user_id (int): An ID of a user.
+
+        Returns:
+            int or None
+        """
+
+        result = await self.db.execute(
+            select(User.token_version).filter(User.id == user_id)
+        )
+        return result.scalar_one_or_none()
@@ -1,14 +1,18 @@
+from dataclasses import dataclass
 from datetime import date
-from typing import Any
+from typing import Any, List
 from pydantic import BaseModel, Field, EmailStr, model_validator
 
 from src.utils import HTTPBadRequestException
 
 
 def validate_birthday(birthday: Any):
+    if isinstance(birthday, date):
+        return
+
     try:
         date.fromisoformat(birthday)
-    except ValueError:
+    except (TypeError, ValueError):
         raise HTTPBadRequestException("Invalid date format. Should be YYYY-MM-DD.")
 
 
@@ -17,7 +21,7 @@ class ContactCreateModel(BaseModel):
     last_name: str = Field(min_length=1, max_length=100)
     email: EmailStr = Field(max_length=180)
     phone: str = Field(min_length=3, max_length=80)
-    birthday: str
+    birthday: date
 
     @model_validator(mode="before")
     @classmethod
@@ -32,7 +36,7 @@ class ContactUpdateModel(BaseModel):
     last_name: str | None = Field(default=None, min_length=1, max_length=100)
     email: EmailStr | None = Field(default=None, max_length=180)
     phone: str | None = Field(default=None, min_length=3, max_length=80)
-    birthday: str | None = None
+    birthday: date | None = None
 
     @model_validator(mode="before")
     @classmethod
@@ -49,4 +53,29 @@ class ResponseContactModel(BaseModel):
     last_name: str
     email: EmailStr
     phone: str
-    birthday: str
+    birthday: date
+
+
+@dataclass(slots=True, frozen=True)
+class ContactRecord:
+    """
+    A read-only Contact row without ORM state, built by the read path of ContactsRepository.
+    """
+
+    id: int
+    first_name: str
+    last_name: str
+    email: str
+    phone: str
+    birthday: date
+
+
+class ContactImportErrorModel(BaseModel):
+    row: int
+    detail: str
+
+
+class ContactImportReportModel(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ContactImportErrorModel]
@@ -0,0 +1,119 @@
+from typing import Any, List, Mapping, Type, TypeVar
+
+from fastapi import Response, status
+from pydantic import BaseModel, TypeAdapter
+
+from src.schemas.contacts import ContactRecord, ResponseContactModel
+from src.schemas.users import User
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+contact_adapter = TypeAdapter(ResponseContactModel)
+contact_record_adapter = TypeAdapter(ContactRecord)
+contact_records_adapter = TypeAdapter(List[ContactRecord])
+user_adapter = TypeAdapter(User)
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+
+def construct(model: Type[ModelT], row: Any) -> ModelT:
+    """
+    Build a model from attributes of a trusted row without validation.
+
+    Args:
+        model (Type[BaseModel]): a response model.
+        row (Any): an ORM object or a row with the model fields as attributes.
+
+    Returns:
+        An instance of the model.
+    """
+
+    return model.model_construct(
+        **{name: getattr(row, name) for name in model.model_fields}
+    )
+
+
+def json_response(
+    adapter: TypeAdapter,
+    content: Any,
+    status_code: int = status.HTTP_200_OK,
+    headers: Mapping[str, str] | None = None,
+) -> FastJSONResponse:
+    """
+    Encode content with a precompiled TypeAdapter into a response.
+
+    Returning a Response skips the response_model validation and
+    jsonable_encoder pass of FastAPI, so the route has to pass data that
+    already matches the adapter type.
+
+    Args:
+        adapter (TypeAdapter): a precompiled adapter of the response type.
+        content (Any): data matching the adapter type.
+        status_code (int): a response status code.
+        headers (Mapping, Optional): response headers.
+
+    Returns:
+        FastJSONResponse
+    """
+
+    return FastJSONResponse(
+        adapter.dump_json(content), status_code=status_code, headers=headers
+    )
+
+
+def contact_response(
+    contact: Any, status_code: int = status.HTTP_200_OK
+) -> FastJSONResponse:
+    """
+    Return a response of a single Contact.
+
+    Args:
+        contact (ContactRecord | Contact): a ContactRecord or a Contact.
+        status_code (int): a response status code.
+
+    Returns:
+        FastJSONResponse
+    """
+
+    if isinstance(contact, ContactRecord):
+        return json_response(contact_record_adapter, contact, status_code)
+
+    return json_response(
+        contact_adapter, construct(ResponseContactModel, contact), status_code
+    )
+
+
+def contacts_response(
+    contacts: List[ContactRecord], headers: Mapping[str, str] | None = None
+) -> FastJSONResponse:
+    """
+    Return a response of a list of Contacts.
+
+    ContactRecord fields match ResponseContactModel, so the list is encoded
+    as is without building a model per row.
+
+    Args:
+        contacts (List[ContactRecord]): Contacts.
+        headers (Mapping, Optional): response headers.
+
+    Returns:
+        FastJSONResponse
+    """
+
+    return json_response(contact_records_adapter, contacts, headers=headers)
+
+
+def user_response(user: Any) -> FastJSONResponse:
+    """
+    Return a response of a User.
+
+    Args:
+        user (User): a User.
+
+    Returns:
+        FastJSONResponse
+    """
+
+    return json_response(user_adapter, construct(User, user))
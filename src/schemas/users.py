@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from typing import Optional
 from pydantic import BaseModel, ConfigDict, EmailStr
 from src.database.models import UserRole
@@ -12,6 +13,34 @@ class User(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+@dataclass(slots=True, frozen=True)
+class Principal:
+    """
+    An authenticated user built from access token claims.
+    """
+
+    id: int
+    username: str
+    role: UserRole
+    confirmed: bool
+    token_version: int
+
+
+@dataclass(slots=True, frozen=True)
+class UserRecord:
+    """
+    A cacheable snapshot of a User without the password hash.
+    """
+
+    id: int
+    username: str
+    email: str
+    avatar: str | None
+    confirmed: bool
+    role: UserRole
+    token_version: int
+
+
 class UserCreate(BaseModel):
     username: str
     email: EmailStr
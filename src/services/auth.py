@@ -1,6 +1,6 @@
+import uuid
 from datetime import datetime, timedelta, UTC
 from typing import Optional
-from aiocache import cached
 
 from fastapi import Depends, HTTPException, status
 from passlib.context import CryptContext
@@ -11,6 +11,11 @@ import logging
 
 from src.database.db import get_db
 from src.database.models import UserRole, User
+from src.repository.users import UserRepository
+from src.schemas.users import Principal, UserRecord
+from src.services.cache import user_cache
+from src.services.revocation import revocation_list
+from src.services.tokens import token_decode_cache
 from src.conf.config import settings
 from src.services.users import UserService
 from src.utils import HTTPBadRequestException
@@ -22,11 +27,35 @@ logger = logging.getLogger(__name__)
 
 
 class Hash:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    # New hashes are argon2id, bcrypt hashes are still verified and upgraded
+    pwd_context = CryptContext(
+        schemes=["argon2", "bcrypt"],
+        deprecated=["bcrypt"],
+        argon2__type="ID",
+        argon2__memory_cost=settings.PASSWORD_ARGON2_MEMORY_COST,
+        argon2__time_cost=settings.PASSWORD_ARGON2_TIME_COST,
+        argon2__parallelism=settings.PASSWORD_ARGON2_PARALLELISM,
+    )
 
     def verify_password(self, plain_password, hashed_password):
         return self.pwd_context.verify(plain_password, hashed_password)
 
+    def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        """
+        Verify a password and return a new hash if the stored one is outdated.
+
+        Args:
+            plain_password (str): a plain password.
+            hashed_password (str): a stored hash.
+
+        Returns:
+            (verified, a new hash or None)
+        """
+
+        return self.pwd_context.verify_and_update(plain_password, hashed_password)
+
     def get_password_hash(self, password: str):
         return self.pwd_context.hash(password)
 
@@ -53,13 +82,43 @@ async def create_access_token(payload: dict, expires_delta: Optional[int] = None
         expire = datetime.now(UTC) + timedelta(
             seconds=int(settings.JWT_EXPIRATION_SECONDS)
         )
-    payload_data.update({"exp": expire})
+    # A unique ID lets a single token be revoked
+    payload_data.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded = jwt.encode(
         payload_data, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM
     )
     return encoded
 
 
+def get_access_token_claims(user: User) -> dict:
+    """
+    Return access token claims of a user.
+
+    The token version is always embedded, so bumping it revokes the token.
+    With JWT_STATELESS_PRINCIPAL the claims also carry the id, role and
+    confirmed flag, so requests authenticate without loading the user.
+
+    Args:
+        user (User): an instance of User.
+
+    Returns:
+        dict
+    """
+
+    claims = {"sub": user.username, "ver": user.token_version}
+
+    if settings.JWT_STATELESS_PRINCIPAL:
+        claims.update(
+            {
+                "uid": user.id,
+                "role": UserRole(user.role).value,
+                "confirmed": bool(user.confirmed),
+            }
+        )
+
+    return claims
+
+
 def create_token(payload: dict):
     """
     Create a token with provided payload
@@ -78,40 +137,119 @@ def create_token(payload: dict):
     return token
 
 
-def cached_key(func, args, kwargs):
-    return f"username {args[0]}"
+async def get_current_user_from_db(
+    username: str, db: AsyncSession
+) -> UserRecord | None:
+    """
+    Return a snapshot of a current user from either a cache or database
+
+    Args:
+        username (str): username for searching.
+        db (AsyncSession): instance of AsyncSession
+
+    Returns:
+        UserRecord or None
+    """
+
+    async def load():
+        logger.info(f'Search "{username}" in database.')
+        return await UserService(db).get_user_by_username(username)
+
+    return await user_cache.get_by_username(username, load)
 
 
-@cached(ttl=180, key_builder=cached_key)  # 3 minutes
-async def get_current_user_from_db(username: str, db: AsyncSession) -> User | None:
+async def get_user_record_by_id(user_id: int, db: AsyncSession) -> UserRecord | None:
     """
-    Return a current user from either database or a cache, save id redis by a username
+    Return a snapshot of a user by an ID from either a cache or database
 
     Args:
-        username (str): username for searching.
+        user_id (int): an ID of a user.
         db (AsyncSession): instance of AsyncSession
 
     Returns:
-        User
+        UserRecord or None
     """
-    logger.info(f'Search "{username}" in database.')
-    user_service = UserService(db)
-    return await user_service.get_user_by_username(username)
+
+    return await user_cache.get_by_id(
+        user_id, lambda: UserRepository(db).get_user_by_id(user_id)
+    )
+
+
+async def get_token_version(user_id: int, db: AsyncSession) -> int | None:
+    """
+    Return the current token version of a user from either a cache or database.
+
+    Args:
+        user_id (int): an ID of a user.
+        db (AsyncSession): instance of AsyncSession
+
+    Returns:
+        int or None
+    """
+
+    return await user_cache.get_token_version(
+        user_id, lambda: UserService(db).get_token_version(user_id)
+    )
+
+
+def get_principal_from_claims(payload: dict) -> Principal:
+    """
+    Build a Principal from access token claims.
+
+    Args:
+        payload (dict): decoded claims.
+
+    Returns:
+        Principal
+    """
+
+    return Principal(
+        id=int(payload["uid"]),
+        username=payload["sub"],
+        role=UserRole(payload["role"]),
+        confirmed=bool(payload["confirmed"]),
+        token_version=int(payload["ver"]),
+    )
+
+
+def get_principal_from_user(user: User | UserRecord) -> Principal:
+    """
+    Build a Principal from a User.
+
+    Args:
+        user (User | UserRecord): a user.
+
+    Returns:
+        Principal
+    """
+
+    return Principal(
+        id=user.id,
+        username=user.username,
+        role=UserRole(user.role),
+        confirmed=bool(user.confirmed),
+        token_version=user.token_version,
+    )
 
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db),
-):
+) -> Principal:
     """
     Return a current user
 
+    Tokens with principal claims are checked against the token version only,
+    tokens with a username only load the user and compare its token version.
+    Tokens without a token version are rejected. Tokens with a jti are checked
+    against the revocation list.
+
     Args:
         token (str): access token.
         db (AsyncSession): instance of AsyncSession
 
     Returns:
-        User
+        Principal
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -120,32 +258,45 @@ async def get_current_user(
     )
 
     try:
-        # Decode JWT
-        payload = jwt.decode(
-            token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
-        )
+        # Decode JWT, verified claims are cached until expiration
+        payload = token_decode_cache.decode(token)
         username = payload["sub"]
+        token_version = int(payload["ver"])
         if username is None:
             raise credentials_exception
-    except JWTError:
+    except (JWTError, KeyError, TypeError, ValueError):
+        raise credentials_exception
+
+    if "jti" in payload and await revocation_list.is_revoked(payload["jti"], db):
         raise credentials_exception
 
+    if "uid" in payload:
+        try:
+            principal = get_principal_from_claims(payload)
+        except (KeyError, TypeError, ValueError):
+            raise credentials_exception
+
+        if await get_token_version(principal.id, db) != principal.token_version:
+            raise credentials_exception
+
+        return principal
+
     user = await get_current_user_from_db(username, db)
-    if user is None:
+    if user is None or user.token_version != token_version:
         raise credentials_exception
 
-    return user
+    return get_principal_from_user(user)
 
 
-def get_current_user_admin(current_user: User = Depends(get_current_user)):
+def get_current_user_admin(current_user: Principal = Depends(get_current_user)):
     """
     Get current user if a role is Admin
 
     Args:
-        current_user (User): Injected instance of a User.
+        current_user (Principal): Injected Principal.
 
     Returns:
-        An Admin User
+        An Admin Principal
     """
 
     if current_user.role != UserRole.ADMIN:
@@ -153,6 +304,33 @@ def get_current_user_admin(current_user: User = Depends(get_current_user)):
     return current_user
 
 
+async def get_current_db_user(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> UserRecord:
+    """
+    Return a profile snapshot of a current user for routes returning profile data.
+
+    Args:
+        current_user (Principal): Injected Principal.
+        db (AsyncSession): instance of AsyncSession
+
+    Returns:
+        UserRecord
+    """
+
+    user = await get_user_record_by_id(current_user.id, db)
+
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return user
+
+
 async def get_email_from_token(token: str):
     """
     Return email from a provided token
@@ -165,9 +343,7 @@ async def get_email_from_token(token: str):
     """
 
     try:
-        payload = jwt.decode(
-            token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
-        )
+        payload = token_decode_cache.decode(token)
         email = payload["sub"]
         return email
     except JWTError:
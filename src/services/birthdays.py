@@ -0,0 +1,115 @@
+import calendar
+from datetime import date
+from itertools import groupby
+from typing import Sequence
+
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.repository.birthdays import BirthdaysRepository
+from src.repository.email_outbox import EmailOutboxRepository
+from src.repository.job_runs import JobRunRepository
+from src.services.email import BIRTHDAY_DIGEST_EMAIL
+from src.services.metrics import metrics
+from src.utils import utcnow
+
+BIRTHDAY_DIGEST_JOB = "birthday_digest"
+
+
+def next_birthday(birthday: date, today: date) -> date:
+    """
+    Return the next celebration of a birthday from today on. A 29 February
+    birthday is celebrated on 28 February in a non-leap year.
+
+    Args:
+        birthday (date): a date of birth.
+        today (date): the current day.
+
+    Returns:
+        date
+    """
+
+    for year in (today.year, today.year + 1):
+        day = birthday.day
+        if birthday.month == 2 and day == 29 and not calendar.isleap(year):
+            day = 28
+        celebration = date(year, birthday.month, day)
+        if celebration >= today:
+            return celebration
+
+
+def build_digests(rows: Sequence[Row], today: date) -> list[tuple[str, dict]]:
+    """
+    Group upcoming birthdays by user into digest email payloads.
+
+    Args:
+        rows (Sequence[Row]): rows of BirthdaysRepository.get_upcoming ordered by user.
+        today (date): the current day.
+
+    Returns:
+        A list of (recipient, payload).
+    """
+
+    digests = []
+    for _, user_rows in groupby(rows, key=lambda row: row.user_id):
+        user_rows = list(user_rows)
+        birthdays = sorted(
+            (
+                next_birthday(row.birthday, today),
+                f"{row.first_name} {row.last_name}",
+            )
+            for row in user_rows
+        )
+        payload = {
+            "username": user_rows[0].username,
+            "birthdays": [
+                {
+                    "name": name,
+                    "date": celebration.isoformat(),
+                    "days": (celebration - today).days,
+                }
+                for celebration, name in birthdays
+            ],
+        }
+        digests.append((user_rows[0].email, payload))
+    return digests
+
+
+class BirthdayDigestService:
+    def __init__(self, db: AsyncSession):
+        self.birthdays_repository = BirthdaysRepository(db)
+        self.outbox_repository = EmailOutboxRepository(db)
+        self.job_runs_repository = JobRunRepository(db)
+
+    async def queue_digests(
+        self, today: date, days: int = settings.BIRTHDAY_DIGEST_DAYS
+    ) -> int | None:
+        """
+        Queue one digest email per user with upcoming birthdays, once a day.
+
+        The run of the day and its emails are committed in one transaction, so
+        a failed run leaves nothing behind and is retried by the next call.
+
+        Args:
+            today (date): the day of the batch.
+            days (int): number of days within future birthdays.
+
+        Returns:
+            The number of queued emails or None if the day's batch is taken.
+        """
+
+        now = utcnow()
+        run = await self.job_runs_repository.claim(BIRTHDAY_DIGEST_JOB, today, now)
+        if run is None:
+            metrics.increment("birthday_digest_skipped_total")
+            return None
+
+        rows = await self.birthdays_repository.get_upcoming(today, days)
+        digests = build_digests(rows, today)
+        for recipient, payload in digests:
+            self.outbox_repository.add(BIRTHDAY_DIGEST_EMAIL, recipient, payload, now)
+
+        await self.job_runs_repository.finish(run, len(digests), utcnow())
+        metrics.increment("birthday_digest_emails_total", len(digests))
+        return len(digests)
@@ -0,0 +1,699 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Awaitable, Callable, List
+
+from pydantic import TypeAdapter
+
+from src.conf.config import settings
+from src.database.models import User
+from src.schemas.contacts import ContactRecord
+from src.schemas.users import UserRecord
+from src.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[], Awaitable[bytes | None]]
+
+
+class BaseCache(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        pass
+
+    @abstractmethod
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """
+        Set a key only if it does not exist.
+
+        Returns:
+            True if the key was set.
+        """
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        pass
+
+    @abstractmethod
+    async def clear(self) -> None:
+        pass
+
+
+class MemoryCache(BaseCache):
+    """
+    A per-process LRU cache with a maximum size and per-key TTL.
+    """
+
+    def __init__(self, max_size: int, ttl: float | None = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: OrderedDict[str, tuple[bytes, float | None]] = OrderedDict()
+
+    async def get(self, key: str) -> bytes | None:
+        item = self._items.get(key)
+        if item is None:
+            return None
+
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._items[key]
+            return None
+
+        self._items.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        ttl = ttl or self.ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._items[key] = (value, expires_at)
+        self._items.move_to_end(key)
+
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        if await self.get(key) is not None:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._items.pop(key, None)
+
+    async def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class RedisCache(BaseCache):
+    """
+    A cache shared by workers in Redis.
+    """
+
+    def __init__(self, url: str, prefix: str = "", ttl: float | None = None) -> None:
+        from redis.asyncio import Redis
+
+        self.redis = Redis.from_url(url)
+        self.prefix = prefix
+        self.ttl = ttl
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.redis.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        ttl = ttl or self.ttl
+        await self.redis.set(
+            self.prefix + key, value, px=int(ttl * 1000) if ttl else None
+        )
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return bool(
+            await self.redis.set(self.prefix + key, value, px=int(ttl * 1000), nx=True)
+        )
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.redis.delete(*(self.prefix + key for key in keys))
+
+    async def clear(self) -> None:
+        async for key in self.redis.scan_iter(match=self.prefix + "*"):
+            await self.redis.delete(key)
+
+
+class TieredCache(BaseCache):
+    """
+    A bounded in-process L1 in front of an optional shared L2.
+
+    Deletes are published on a Redis channel, every worker drops the keys
+    from its L1, so L1 entries only outlive a write on another worker if a
+    message is lost, and then at most for `l1_ttl` seconds. A delete that
+    fails in Redis is logged and counted, the keys expire by their TTL.
+
+    get_or_load protects a missing key from a stampede: concurrent callers
+    in a worker share one load, and across workers only the holder of a
+    short L2 lock loads while the others wait for its value.
+    """
+
+    def __init__(
+        self,
+        l1: MemoryCache,
+        l2: BaseCache | None = None,
+        l1_ttl: float | None = None,
+        channel: str | None = None,
+        lock_timeout: float = 2.0,
+    ) -> None:
+        self.l1 = l1
+        self.l2 = l2
+        self.l1_ttl = l1_ttl
+        self.channel = channel
+        self.lock_timeout = lock_timeout
+        self._epoch = 0
+        self._inflight: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._listener: asyncio.Task | None = None
+
+    @property
+    def redis(self):
+        return self.l2.redis if isinstance(self.l2, RedisCache) else None
+
+    @property
+    def epoch(self) -> int:
+        """
+        A counter of deletes seen by this worker, a value loaded while it
+        changed may be stale.
+        """
+
+        return self._epoch
+
+    def _l1_ttl(self, ttl: float | None) -> float | None:
+        if ttl and self.l1_ttl:
+            return min(ttl, self.l1_ttl)
+        return ttl or self.l1_ttl
+
+    async def get(self, key: str) -> bytes | None:
+        value = await self.l1.get(key)
+        if value is not None:
+            metrics.increment("cache_l1_hits_total")
+            return value
+
+        if self.l2 is not None:
+            value = await self.l2.get(key)
+            if value is not None:
+                metrics.increment("cache_l2_hits_total")
+                await self.l1.set(key, value, self._l1_ttl(None))
+                return value
+
+        metrics.increment("cache_misses_total")
+        return None
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        if self.l2 is not None:
+            await self.l2.set(key, value, ttl)
+        await self.l1.set(key, value, self._l1_ttl(ttl))
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        if self.l2 is not None:
+            return await self.l2.add(key, value, ttl)
+        return await self.l1.add(key, value, ttl)
+
+    async def delete(self, *keys: str) -> None:
+        if not keys:
+            return
+
+        self._epoch += 1
+        await self.l1.delete(*keys)
+
+        # Deletes follow committed writes, a failed one leaves the keys to
+        # expire by TTL instead of failing the write
+        if self.l2 is not None:
+            try:
+                await self.l2.delete(*keys)
+            except Exception:
+                metrics.increment("cache_invalidation_errors_total")
+                logger.exception("Failed to delete keys from the L2 cache.")
+
+        if self.redis is not None and self.channel:
+            try:
+                await self.redis.publish(self.channel, json.dumps(keys))
+            except Exception:
+                metrics.increment("cache_invalidation_errors_total")
+                logger.exception("Failed to publish a cache invalidation.")
+
+    async def clear(self) -> None:
+        self._epoch += 1
+        await self.l1.clear()
+        if self.l2 is not None:
+            await self.l2.clear()
+
+    def _get_inflight(self) -> dict[str, asyncio.Future]:
+        # Futures are bound to the loop they are created in
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.get(loop)
+        if inflight is None:
+            inflight = self._inflight[loop] = {}
+        return inflight
+
+    async def _wait_for_l2(self, key: str) -> bytes | None:
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            value = await self.l2.get(key)
+            if value is not None:
+                return value
+        return None
+
+    async def _load(self, key: str, load: Loader, ttl: float | None) -> bytes | None:
+        epoch = self._epoch
+        lock_key = f"lock:{key}"
+        locked = False
+
+        if self.l2 is not None:
+            locked = await self.l2.add(lock_key, b"1", self.lock_timeout)
+            if not locked:
+                metrics.increment("cache_lock_waits_total")
+                value = await self._wait_for_l2(key)
+                if value is not None:
+                    await self.l1.set(key, value, self._l1_ttl(ttl))
+                    return value
+
+        try:
+            metrics.increment("cache_loads_total")
+            value = await load()
+            # A delete during the load means the value may already be stale
+            if value is not None and epoch == self._epoch:
+                await self.set(key, value, ttl)
+            return value
+        finally:
+            if locked:
+                await self.l2.delete(lock_key)
+
+    async def get_or_load(
+        self, key: str, load: Loader, ttl: float | None = None
+    ) -> bytes | None:
+        """
+        Return a cached value or load, cache and return it once for all concurrent callers.
+
+        Args:
+            key (str): a cache key.
+            load (Loader): a coroutine function returning a value or None, None is not cached.
+            ttl (float, Optional): TTL of a loaded value in seconds.
+
+        Returns:
+            bytes or None
+        """
+
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        inflight = self._get_inflight()
+        future = inflight.get(key)
+        if future is not None:
+            metrics.increment("cache_coalesced_total")
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        inflight[key] = future
+        try:
+            value = await self._load(key, load, ttl)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved when no other caller waits
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            inflight.pop(key, None)
+
+    async def _listen(self, pubsub) -> None:
+        async for message in pubsub.listen():
+            if message["type"] != "message":
+                continue
+            try:
+                keys = json.loads(message["data"])
+            except ValueError:
+                logger.warning("Invalid cache invalidation message.")
+                continue
+            self._epoch += 1
+            await self.l1.delete(*keys)
+
+    async def start(self) -> None:
+        """
+        Subscribe to invalidations published by other workers.
+        """
+
+        if self.redis is None or not self.channel or self._listener is not None:
+            return
+
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen(pubsub))
+
+    async def stop(self) -> None:
+        """
+        Stop listening to invalidations.
+        """
+
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+def create_cache() -> TieredCache:
+    """
+    Create the shared cache configured by CACHE_* settings.
+
+    Returns:
+        TieredCache
+    """
+
+    l1 = MemoryCache(max_size=settings.CACHE_L1_MAX_SIZE, ttl=settings.CACHE_L1_TTL)
+
+    if settings.CACHE_BACKEND == "redis":
+        l2 = RedisCache(settings.REDIS_URL, prefix=settings.CACHE_PREFIX)
+        return TieredCache(
+            l1,
+            l2,
+            l1_ttl=settings.CACHE_L1_TTL,
+            channel=settings.CACHE_PREFIX + "invalidate",
+            lock_timeout=settings.CACHE_LOCK_TIMEOUT,
+        )
+    if settings.CACHE_BACKEND == "memory":
+        return TieredCache(l1, l1_ttl=settings.CACHE_L1_TTL)
+    raise ValueError(f"Unknown cache backend: {settings.CACHE_BACKEND}")
+
+
+class UserCache:
+    """
+    Snapshots of users by ID and by case-insensitive username, and token versions.
+
+    Stores plain UserRecord JSON, never ORM objects, so a cached user does not
+    outlive or depend on the session it was loaded in.
+    """
+
+    adapter = TypeAdapter(UserRecord)
+
+    def __init__(
+        self, cache: TieredCache, ttl: float, token_version_ttl: float
+    ) -> None:
+        self.cache = cache
+        self.ttl = ttl
+        self.token_version_ttl = token_version_ttl
+
+    @staticmethod
+    def id_key(user_id: int) -> str:
+        return f"users:id:{user_id}"
+
+    @staticmethod
+    def username_key(username: str) -> str:
+        return f"users:username:{username.lower()}"
+
+    @staticmethod
+    def token_version_key(user_id: int) -> str:
+        return f"users:token_version:{user_id}"
+
+    @staticmethod
+    def to_record(user: User) -> UserRecord:
+        """
+        Build a UserRecord of a User.
+
+        Args:
+            user (User): an instance of User.
+
+        Returns:
+            UserRecord
+        """
+
+        return UserRecord(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            avatar=user.avatar,
+            confirmed=bool(user.confirmed),
+            role=user.role,
+            token_version=user.token_version,
+        )
+
+    async def _get_or_load(
+        self, key: str, load: Callable[[], Awaitable[User | None]]
+    ) -> UserRecord | None:
+        loaded = False
+
+        async def load_value() -> bytes | None:
+            nonlocal loaded
+            loaded = True
+            epoch = self.cache.epoch
+            user = await load()
+            if user is None:
+                return None
+
+            record = self.to_record(user)
+            value = self.adapter.dump_json(record)
+            # Cache under the other key as well, get_or_load sets `key`. Like
+            # get_or_load, skip it if an invalidation raced with the load
+            if self.cache.epoch != epoch:
+                return value
+            for other_key in (
+                self.id_key(record.id),
+                self.username_key(record.username),
+            ):
+                if other_key != key:
+                    await self.cache.set(other_key, value, self.ttl)
+            return value
+
+        value = await self.cache.get_or_load(key, load_value, self.ttl)
+        metrics.increment(
+            "user_cache_misses_total" if loaded else "user_cache_hits_total"
+        )
+        return self.adapter.validate_json(value) if value is not None else None
+
+    async def get_by_id(
+        self, user_id: int, load: Callable[[], Awaitable[User | None]]
+    ) -> UserRecord | None:
+        """
+        Return a snapshot of a user by an ID, loading it on a miss.
+
+        Args:
+            user_id (int): an ID of a user.
+            load (Callable): a coroutine function returning a User or None.
+
+        Returns:
+            UserRecord or None
+        """
+
+        return await self._get_or_load(self.id_key(user_id), load)
+
+    async def get_by_username(
+        self, username: str, load: Callable[[], Awaitable[User | None]]
+    ) -> UserRecord | None:
+        """
+        Return a snapshot of a user by a username, loading it on a miss.
+
+        Args:
+            username (str): a username.
+            load (Callable): a coroutine function returning a User or None.
+
+        Returns:
+            UserRecord or None
+        """
+
+        return await self._get_or_load(self.username_key(username), load)
+
+    async def get_token_version(
+        self, user_id: int, load: Callable[[], Awaitable[int | None]]
+    ) -> int | None:
+        """
+        Return a token version of a user, loading it on a miss.
+
+        Args:
+            user_id (int): an ID of a user.
+            load (Callable): a coroutine function returning a token version or None.
+
+        Returns:
+            int or None
+        """
+
+        async def load_value() -> bytes | None:
+            version = await load()
+            return None if version is None else str(version).encode()
+
+        value = await self.cache.get_or_load(
+            self.token_version_key(user_id), load_value, self.token_version_ttl
+        )
+        return None if value is None else int(value)
+
+    async def invalidate(self, user_id: int, username: str) -> None:
+        """
+        Drop cached snapshots and the token version of a user in every worker.
+
+        Args:
+            user_id (int): an ID of a user.
+            username (str): a username of a user.
+        """
+
+        metrics.increment("user_cache_invalidations_total")
+        await self.cache.delete(
+            self.id_key(user_id),
+            self.username_key(username),
+            self.token_version_key(user_id),
+        )
+
+
+class ContactCache:
+    """
+    Per-user read-through cache of contact pages and single contacts.
+
+    Keys embed the current generation of the user. A write replaces the
+    generation, so every cached read of the user is orphaned in O(1) and
+    expires by TTL. The generation is a random token, not a counter, so an
+    evicted generation never comes back with an old value.
+
+    A disabled cache loads every read, see create_contact_cache.
+    """
+
+    record_adapter = TypeAdapter(ContactRecord)
+    records_adapter = TypeAdapter(List[ContactRecord])
+
+    def __init__(self, cache: TieredCache, ttl: float, enabled: bool = True) -> None:
+        self.cache = cache
+        self.ttl = ttl
+        self.enabled = enabled
+
+    @staticmethod
+    def generation_key(user_id: int) -> str:
+        return f"contacts:{user_id}:generation"
+
+    async def get_generation(self, user_id: int) -> str:
+        """
+        Return the current generation of a user, starting a new one if it is missing.
+
+        Args:
+            user_id (int): an ID of a user.
+
+        Returns:
+            str
+        """
+
+        key = self.generation_key(user_id)
+        value = await self.cache.get(key)
+
+        if value is None:
+            # Concurrent readers agree on the generation that was added first
+            await self.cache.add(key, uuid.uuid4().hex.encode(), self.ttl * 2)
+            value = await self.cache.get(key)
+
+        return value.decode() if value is not None else uuid.uuid4().hex
+
+    async def bump(self, user_id: int) -> None:
+        """
+        Invalidate all cached reads of a user in every worker.
+
+        Args:
+            user_id (int): an ID of a user.
+        """
+
+        if not self.enabled:
+            return
+
+        metrics.increment("contact_cache_invalidations_total")
+        await self.cache.delete(self.generation_key(user_id))
+
+    async def _get_or_load(self, key: str, adapter: TypeAdapter, load: Callable):
+        loaded = False
+
+        async def load_value() -> bytes | None:
+            nonlocal loaded
+            loaded = True
+            value = await load()
+            return None if value is None else adapter.dump_json(value)
+
+        value = await self.cache.get_or_load(key, load_value, self.ttl)
+        metrics.increment(
+            "contact_cache_misses_total" if loaded else "contact_cache_hits_total"
+        )
+        return None if value is None else adapter.validate_json(value)
+
+    async def get_page(
+        self,
+        user_id: int,
+        params: dict,
+        load: Callable[[], Awaitable[List[ContactRecord]]],
+    ) -> List[ContactRecord]:
+        """
+        Return a cached page of contacts, loading it on a miss.
+
+        Args:
+            user_id (int): an ID of a user.
+            params (dict): JSON serializable query parameters of the page.
+            load (Callable): a coroutine function returning the page.
+
+        Returns:
+            List[ContactRecord]
+        """
+
+        if not self.enabled:
+            return await load()
+
+        generation = await self.get_generation(user_id)
+        digest = hashlib.sha1(
+            json.dumps(params, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        key = f"contacts:{user_id}:{generation}:page:{digest}"
+        return await self._get_or_load(key, self.records_adapter, load)
+
+    async def get_contact(
+        self,
+        user_id: int,
+        contact_id: int,
+        load: Callable[[], Awaitable[ContactRecord | None]],
+    ) -> ContactRecord | None:
+        """
+        Return a cached contact, loading it on a miss. A missing contact is not cached.
+
+        Args:
+            user_id (int): an ID of a user.
+            contact_id (int): an ID of a contact.
+            load (Callable): a coroutine function returning a ContactRecord or None.
+
+        Returns:
+            ContactRecord or None
+        """
+
+        if not self.enabled:
+            return await load()
+
+        generation = await self.get_generation(user_id)
+        key = f"contacts:{user_id}:{generation}:id:{contact_id}"
+        return await self._get_or_load(key, self.record_adapter, load)
+
+
+def create_contact_cache(cache: TieredCache) -> ContactCache:
+    """
+    Create a ContactCache, enabled only over a shared L2.
+
+    Reads of contacts must see a write of any worker at once. An in-process
+    cache is not invalidated by writes of other workers, so without an L2
+    contacts are read from the database.
+
+    Args:
+        cache (TieredCache): the shared cache.
+
+    Returns:
+        ContactCache
+    """
+
+    return ContactCache(
+        cache, ttl=settings.CONTACTS_CACHE_TTL, enabled=cache.l2 is not None
+    )
+
+
+cache = create_cache()
+
+user_cache = UserCache(
+    cache,
+    ttl=settings.USER_CACHE_TTL,
+    token_version_ttl=settings.JWT_VERSION_CACHE_SECONDS,
+)
+
+contact_cache = create_contact_cache(cache)
@@ -1,9 +1,23 @@
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.conf.config import settings
+
 from src.repository.contacts import ContactsRepository
+from src.services.contacts_io import write_records
 from src.schemas.users import User
 from src.schemas.contacts import ContactCreateModel, ContactUpdateModel
-from src.utils import HTTPNotFoundException, HTTPConflictRequestException
+from src.utils import (
+    HTTPNotFoundException,
+    HTTPConflictRequestException,
+    HTTPBadRequestException,
+    encode_cursor,
+    decode_cursor,
+)
 
 
 class ContactsService:
@@ -20,6 +34,7 @@ class ContactsService:
         birthdays_within: int | None = None,
         offset: int | None = None,
         limit: int | None = None,
+        cursor: str | None = None,
     ):
         """
         Return all contacts
@@ -29,17 +44,88 @@ class ContactsService:
             birthdays_within (int, Optional): Number of days within future birthdays.
             offset (int, Optional): The number of Contacts to skip.
             limit (int, Optional): The maximum number of Contacts to return.
+            cursor (str, Optional): An opaque cursor returned with the previous page.
 
         Returns:
             List[Contact]
         """
 
+        if cursor is not None and search is not None:
+            raise HTTPBadRequestException(
+                "Cursor pagination is not supported for search results"
+            )
+
         return await self.repository.get_all(
             search=search,
             birthdays_within=birthdays_within,
             offset=offset,
             limit=limit,
+            after_id=self.get_cursor_id(cursor),
+        )
+
+    @staticmethod
+    def get_cursor_id(cursor: str | None) -> int | None:
+        """
+        Return the ID of the last Contact of a cursor
+
+        Args:
+            cursor (str, Optional): An opaque cursor.
+
+        Returns:
+            int or None
+        """
+
+        if cursor is None:
+            return None
+
+        after_id = decode_cursor(cursor).get("id")
+
+        if not isinstance(after_id, int):
+            raise HTTPBadRequestException("Invalid cursor")
+
+        return after_id
+
+    @staticmethod
+    def get_next_cursor(
+        contacts, limit: int | None, search: str | None = None
+    ) -> str | None:
+        """
+        Return a cursor of the next page if the current page is full.
+        Search results are ordered by relevance and have no cursor.
+
+        Args:
+            contacts (List[Contact]): Contacts of the current page.
+            limit (int, Optional): The maximum number of Contacts in a page.
+            search (str, Optional): Search query of the current page.
+
+        Returns:
+            str or None
+        """
+
+        if search or not limit or len(contacts) < limit:
+            return None
+
+        return encode_cursor({"id": contacts[-1].id})
+
+    def export(
+        self, export_format: str, cursor: str | None = None
+    ) -> AsyncIterator[str]:
+        """
+        Return chunks of an export document of all contacts
+
+        Args:
+            export_format (str): ndjson, csv or vcf.
+            cursor (str, Optional): Export only Contacts after the one of this cursor.
+
+        Returns:
+            AsyncIterator[str]
+        """
+
+        contacts = self.repository.stream_all(
+            after_id=self.get_cursor_id(cursor),
+            batch_size=settings.CONTACTS_EXPORT_BATCH_SIZE,
         )
+        return write_records(contacts, export_format)
 
     async def get_by_id(self, contact_id: int):
         """
@@ -70,14 +156,78 @@ class ContactsService:
             Contact
         """
 
-        contact = await self.repository.get_contact_by_email(body.email)
-
-        if contact:
+        try:
+            return await self.repository.create(body)
+        except IntegrityError:
             raise HTTPConflictRequestException(
                 "Contact already exists with the same email"
             )
 
-        return await self.repository.create(body)
+    async def import_contacts(
+        self, records: AsyncIterator[tuple[int, dict | str]]
+    ) -> dict:
+        """
+        Validate and insert streamed contact records in batches
+
+        Args:
+            records (AsyncIterator): pairs of a row number and a record or a parse error.
+
+        Returns:
+            dict(imported, failed, errors)
+        """
+
+        report = {"imported": 0, "failed": 0, "errors": []}
+        batch: dict[str, tuple[int, ContactCreateModel]] = {}
+
+        def add_error(row: int, detail: str):
+            report["failed"] += 1
+            if len(report["errors"]) < settings.CONTACTS_IMPORT_MAX_ERRORS:
+                report["errors"].append({"row": row, "detail": detail})
+
+        async def flush():
+            duplicates = await self.repository.bulk_create(
+                [body for _, body in batch.values()]
+            )
+            for email, (row, _) in batch.items():
+                if email in duplicates:
+                    add_error(row, "Contact already exists with the same email")
+                else:
+                    report["imported"] += 1
+            batch.clear()
+
+        async for row, record in records:
+            if isinstance(record, str):
+                add_error(row, record)
+                continue
+
+            try:
+                body = ContactCreateModel(**record)
+            except ValidationError as e:
+                add_error(
+                    row,
+                    "; ".join(
+                        f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                        for error in e.errors()
+                    ),
+                )
+                continue
+            except HTTPException as e:
+                add_error(row, e.detail)
+                continue
+
+            email = body.email.lower()
+            if email in batch:
+                add_error(row, "Contact already exists with the same email")
+                continue
+
+            batch[email] = (row, body)
+            if len(batch) >= settings.CONTACTS_IMPORT_BATCH_SIZE:
+                await flush()
+
+        if batch:
+            await flush()
+
+        return report
 
     async def update_by_id(self, contact_id: int, body: ContactUpdateModel):
         """
@@ -91,12 +241,17 @@ class ContactsService:
             Contact
         """
 
-        contact = await self.repository.get_contact_by_id(contact_id)
+        try:
+            contact = await self.repository.update(contact_id, body)
+        except IntegrityError:
+            raise HTTPConflictRequestException(
+                "Contact already exists with the same email"
+            )
 
-        if not contact:
+        if contact is None:
             raise HTTPNotFoundException("Contact not found")
 
-        return await self.repository.update(contact_id, body)
+        return contact
 
     async def delete_by_id(self, contact_id: int):
         """
@@ -109,9 +264,9 @@ class ContactsService:
             Contact
         """
 
-        contact = await self.repository.get_contact_by_id(contact_id)
+        contact = await self.repository.delete(contact_id)
 
         if contact is None:
             raise HTTPNotFoundException("Contact Not found")
 
-        return await self.repository.delete(contact_id)
+        return contact
@@ -0,0 +1,340 @@
+import codecs
+import csv
+import io
+import json
+from typing import AsyncIterator, Callable
+
+from src.conf.config import settings
+from src.utils import (
+    HTTPBadRequestException,
+    HTTPUnsupportedMediaTypeException,
+    encode_cursor,
+)
+
+CSV_CONTENT_TYPES = ("text/csv",)
+NDJSON_CONTENT_TYPES = (
+    "application/x-ndjson",
+    "application/ndjson",
+    "application/jsonl",
+)
+
+# The cursor of a record resumes an interrupted export after it
+EXPORT_FIELDS = (
+    "id",
+    "first_name",
+    "last_name",
+    "email",
+    "phone",
+    "birthday",
+    "cursor",
+)
+
+
+def get_export_cursor(contact) -> str:
+    """
+    Return the cursor that resumes an export after a Contact.
+
+    Args:
+        contact (Contact): a Contact.
+
+    Returns:
+        str
+    """
+
+    return encode_cursor({"id": contact.id})
+
+
+def _line_too_long(number: int, max_length: int) -> HTTPBadRequestException:
+    return HTTPBadRequestException(
+        f"Line {number} is longer than {max_length} characters."
+    )
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes],
+    max_length: int = settings.CONTACTS_IMPORT_MAX_LINE_LENGTH,
+) -> AsyncIterator[str]:
+    """
+    Split a stream of UTF-8 encoded chunks into lines without buffering the whole stream.
+
+    Args:
+        chunks (AsyncIterator[bytes]): chunks of a request body.
+        max_length (int): The maximum number of characters of a line.
+
+    Returns:
+        AsyncIterator[str]
+
+    Raises:
+        HTTPBadRequestException: The body is not valid UTF-8 or a line is too long.
+    """
+
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    # Pieces of an unfinished line, only a new chunk is split
+    pending = []
+    pending_length = 0
+    number = 0
+
+    try:
+        async for chunk in chunks:
+            *lines, tail = decoder.decode(chunk).split("\n")
+
+            for line in lines:
+                if pending:
+                    line = "".join(pending) + line
+                    pending = []
+                    pending_length = 0
+                number += 1
+                line = line.rstrip("\r")
+                if len(line) > max_length:
+                    raise _line_too_long(number, max_length)
+                yield line
+
+            if tail:
+                pending.append(tail)
+                pending_length += len(tail)
+                # One more character for a "\r" before the line break
+                if pending_length > max_length + 1:
+                    raise _line_too_long(number + 1, max_length)
+
+        pending.append(decoder.decode(b"", final=True))
+    except UnicodeDecodeError:
+        raise HTTPBadRequestException("Request body is not valid UTF-8.")
+
+    line = "".join(pending)
+    if line:
+        line = line.rstrip("\r")
+        if len(line) > max_length:
+            raise _line_too_long(number + 1, max_length)
+        yield line
+
+
+async def parse_csv(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, dict | str]]:
+    """
+    Parse CSV lines with a header row into records.
+
+    Quoted values can not contain line breaks.
+
+    Args:
+        lines (AsyncIterator[str]): lines of a CSV document.
+
+    Returns:
+        AsyncIterator of (row number, record or an error message)
+    """
+
+    header = None
+    row = 0
+
+    async for line in lines:
+        if not line.strip():
+            continue
+
+        try:
+            values = next(csv.reader([line]))
+        except csv.Error as e:
+            values = None
+            error = str(e)
+
+        if header is None:
+            if values is None:
+                raise HTTPBadRequestException("Invalid CSV header.")
+            header = [name.strip() for name in values]
+            continue
+
+        row += 1
+        if values is None:
+            yield row, error
+        elif len(values) != len(header):
+            yield row, f"Expected {len(header)} values, got {len(values)}."
+        else:
+            yield row, dict(zip(header, values))
+
+
+async def parse_ndjson(
+    lines: AsyncIterator[str],
+) -> AsyncIterator[tuple[int, dict | str]]:
+    """
+    Parse newline delimited JSON objects into records.
+
+    Args:
+        lines (AsyncIterator[str]): lines of a NDJSON document.
+
+    Returns:
+        AsyncIterator of (row number, record or an error message)
+    """
+
+    row = 0
+
+    async for line in lines:
+        if not line.strip():
+            continue
+
+        row += 1
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield row, "Invalid JSON."
+            continue
+
+        if isinstance(record, dict):
+            yield row, record
+        else:
+            yield row, "Expected a JSON object."
+
+
+def read_records(
+    chunks: AsyncIterator[bytes], content_type: str
+) -> AsyncIterator[tuple[int, dict | str]]:
+    """
+    Return an async iterator of records of a streamed CSV or NDJSON body.
+
+    Args:
+        chunks (AsyncIterator[bytes]): chunks of a request body.
+        content_type (str): Content-Type header of a request.
+
+    Returns:
+        AsyncIterator of (row number, record or an error message)
+    """
+
+    media_type = content_type.split(";")[0].strip().lower()
+    max_length = settings.CONTACTS_IMPORT_MAX_LINE_LENGTH
+
+    if media_type in CSV_CONTENT_TYPES:
+        return parse_csv(iter_lines(chunks, max_length))
+
+    if media_type in NDJSON_CONTENT_TYPES:
+        return parse_ndjson(iter_lines(chunks, max_length))
+
+    raise HTTPUnsupportedMediaTypeException(
+        "Supported content types are text/csv and application/x-ndjson."
+    )
+
+
+def format_ndjson(contact) -> str:
+    """
+    Format a Contact as a line of NDJSON.
+
+    Args:
+        contact (Contact): a Contact.
+
+    Returns:
+        str
+    """
+
+    return (
+        json.dumps(
+            {
+                "id": contact.id,
+                "first_name": contact.first_name,
+                "last_name": contact.last_name,
+                "email": contact.email,
+                "phone": contact.phone,
+                "birthday": contact.birthday.isoformat(),
+                "cursor": get_export_cursor(contact),
+            },
+            ensure_ascii=False,
+        )
+        + "\n"
+    )
+
+
+def format_csv(contact) -> str:
+    """
+    Format a Contact as a CSV row.
+
+    Args:
+        contact (Contact): a Contact.
+
+    Returns:
+        str
+    """
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(
+        [
+            contact.id,
+            contact.first_name,
+            contact.last_name,
+            contact.email,
+            contact.phone,
+            contact.birthday.isoformat(),
+            get_export_cursor(contact),
+        ]
+    )
+    return buffer.getvalue()
+
+
+def _escape_vcard(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(",", "\\,")
+        .replace(";", "\\;")
+        .replace("\n", "\\n")
+    )
+
+
+def format_vcard(contact) -> str:
+    """
+    Format a Contact as a vCard 3.0.
+
+    Args:
+        contact (Contact): a Contact.
+
+    Returns:
+        str
+    """
+
+    first_name = _escape_vcard(contact.first_name)
+    last_name = _escape_vcard(contact.last_name)
+    lines = (
+        "BEGIN:VCARD",
+        "VERSION:3.0",
+        f"UID:contact-{contact.id}",
+        f"N:{last_name};{first_name};;;",
+        f"FN:{first_name} {last_name}",
+        f"EMAIL:{_escape_vcard(contact.email)}",
+        f"TEL:{_escape_vcard(contact.phone)}",
+        f"BDAY:{contact.birthday.isoformat()}",
+        f"X-CURSOR:{get_export_cursor(contact)}",
+        "END:VCARD",
+    )
+    return "\r\n".join(lines) + "\r\n"
+
+
+EXPORT_FORMATS: dict[str, tuple[str, str, Callable]] = {
+    "ndjson": ("application/x-ndjson", "ndjson", format_ndjson),
+    "csv": ("text/csv", "csv", format_csv),
+    "vcf": ("text/vcard", "vcf", format_vcard),
+}
+
+
+async def write_records(
+    contacts: AsyncIterator, export_format: str, chunk_size: int = 100
+) -> AsyncIterator[str]:
+    """
+    Format streamed Contacts into chunks of an export document.
+
+    Args:
+        contacts (AsyncIterator[Contact]): streamed Contacts.
+        export_format (str): one of EXPORT_FORMATS.
+        chunk_size (int): the number of Contacts in one chunk.
+
+    Returns:
+        AsyncIterator[str]
+    """
+
+    _, _, formatter = EXPORT_FORMATS[export_format]
+    chunk = []
+
+    if export_format == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(EXPORT_FIELDS)
+        chunk.append(buffer.getvalue())
+
+    async for contact in contacts:
+        chunk.append(formatter(contact))
+        if len(chunk) >= chunk_size:
+            yield "".join(chunk)
+            chunk = []
+
+    if chunk:
+        yield "".join(chunk)
@@ -1,84 +1,376 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+from email.utils import formataddr
+from datetime import timedelta
 from pathlib import Path
+from typing import AsyncIterator, Callable
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
-from pydantic import SecretStr
+import aiosmtplib
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    Template,
+    select_autoescape,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.services.auth import create_token
 from src.conf.config import settings
+from src.repository.email_outbox import EmailOutboxRepository
+from src.services.auth import create_token
+from src.services.metrics import metrics
+from src.utils import utcnow
+
+TEMPLATE_FOLDER = Path(__file__).parent.parent / "templates"
+
+VERIFICATION_EMAIL = "verification"
+RESET_PASSWORD_EMAIL = "reset_password"
+BIRTHDAY_DIGEST_EMAIL = "birthday_digest"
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.MAIL_USERNAME,
-    MAIL_PASSWORD=SecretStr(settings.MAIL_PASSWORD),
-    MAIL_FROM=settings.MAIL_FROM,
-    MAIL_PORT=settings.MAIL_PORT,
-    MAIL_SERVER=settings.MAIL_SERVER,
-    MAIL_FROM_NAME=settings.MAIL_FROM_NAME,
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent.parent / "templates",
+# A kind of an outbox email: (subject, template)
+EMAIL_TEMPLATES = {
+    VERIFICATION_EMAIL: ("Verify your email", "verification_email.html"),
+    RESET_PASSWORD_EMAIL: ("Reset Password request", "reset_password_email.html"),
+    BIRTHDAY_DIGEST_EMAIL: ("Upcoming birthdays", "birthday_digest_email.html"),
+}
+
+# Kinds of emails with a token of the recipient
+TOKEN_EMAILS = {VERIFICATION_EMAIL, RESET_PASSWORD_EMAIL}
+
+# Templates do not change while a process runs, so they are not checked for
+# updates, and their bytecode is cached on disk for the next process
+templates = Environment(
+    loader=FileSystemLoader(TEMPLATE_FOLDER),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False,
+    bytecode_cache=FileSystemBytecodeCache(settings.EMAIL_TEMPLATE_CACHE_DIR or None),
 )
 
+compiled_templates: dict[str, Template] = {}
+
 
-async def send_email(email: str, username: str, host: str):
+def precompile_templates() -> None:
     """
-    Send a verification email
+    Compile all email templates once, e.g. at startup.
+    """
+
+    for kind, (_, template_name) in EMAIL_TEMPLATES.items():
+        compiled_templates[kind] = templates.get_template(template_name)
+
+
+def get_email_template(kind: str) -> Template:
+    """
+    Return a compiled template of an email kind.
 
     Args:
-        email (str): email address
-        username (str): username
-        host (str): host address
+        kind (str): a kind of the email, a key of EMAIL_TEMPLATES.
 
     Returns:
-        None
+        Template
     """
 
-    try:
-        token = create_token(payload={"sub": email})
-        message = MessageSchema(
-            subject="Verify your email",
-            recipients=[email],
-            template_body={
-                "host": host,
-                "username": username,
-                "token": token,
-            },
-            subtype=MessageType.html,
+    template = compiled_templates.get(kind)
+    if template is None:
+        template = compiled_templates[kind] = templates.get_template(
+            EMAIL_TEMPLATES[kind][1]
         )
+    return template
 
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="verification_email.html")
-    except ConnectionErrors as e:
-        print(e)
 
-
-async def send_reset_email(email: str, token: str, host: str):
+def render_email(kind: str, recipient: str, payload: dict) -> EmailMessage:
     """
-    Send a resent password email
+    Render an outbox email. Tokens are created at sending time, so they are
+    never stored in the outbox.
 
     Args:
-        email (str): email address
-        token (str): token
-        host (str): host address
+        kind (str): a kind of the email, a key of EMAIL_TEMPLATES.
+        recipient (str): email address
+        payload (dict): template variables.
 
     Returns:
-        None
+        EmailMessage
+    """
+
+    subject = EMAIL_TEMPLATES[kind][0]
+    if kind in TOKEN_EMAILS:
+        payload = {**payload, "token": create_token(payload={"sub": recipient})}
+    html = get_email_template(kind).render(**payload)
+
+    message = EmailMessage()
+    message["Subject"] = subject
+    message["From"] = formataddr((settings.MAIL_FROM_NAME, settings.MAIL_FROM))
+    message["To"] = recipient
+    message.set_content(html, subtype="html")
+    return message
+
+
+class SMTPSender:
     """
-    try:
-        token = create_token(payload={"sub": email})
-        message = MessageSchema(
-            subject="Reset Password request",
-            recipients=[email],
-            template_body={
-                "host": host,
-                "token": token,
-            },
-            subtype=MessageType.html,
+    One SMTP connection reused for many emails.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: str = "",
+        password: str = "",
+        use_tls: bool = False,
+        start_tls: bool = False,
+        validate_certs: bool = True,
+        timeout: float = 30,
+    ) -> None:
+        self.username = username
+        self.password = password
+        self.smtp = aiosmtplib.SMTP(
+            hostname=hostname,
+            port=port,
+            use_tls=use_tls,
+            start_tls=start_tls,
+            validate_certs=validate_certs,
+            timeout=timeout,
         )
 
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="reset_password_email.html")
-    except ConnectionErrors as e:
-        print(e)
+    async def connect(self) -> None:
+        """
+        Open the connection and log in.
+        """
+
+        await self.smtp.connect()
+        if self.username:
+            await self.smtp.login(self.username, self.password)
+
+    async def close(self) -> None:
+        """
+        Say QUIT and close the connection, or just drop it if the server is gone.
+        """
+
+        if not self.smtp.is_connected:
+            return
+        try:
+            await self.smtp.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            self.smtp.close()
+
+    async def is_alive(self) -> bool:
+        """
+        Check the connection with a NOOP.
+
+        Returns:
+            bool
+        """
+
+        if not self.smtp.is_connected:
+            return False
+        try:
+            await self.smtp.noop()
+        except (aiosmtplib.SMTPException, OSError):
+            return False
+        return True
+
+    async def __aenter__(self) -> "SMTPSender":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    async def send(self, message: EmailMessage) -> None:
+        """
+        Send a message over the open connection.
+
+        Args:
+            message (EmailMessage): a message.
+        """
+
+        await self.smtp.send_message(message)
+
+
+def create_sender() -> SMTPSender:
+    """
+    Create an SMTPSender configured by MAIL_* settings.
+
+    Returns:
+        SMTPSender
+    """
+
+    return SMTPSender(
+        hostname=settings.MAIL_SERVER,
+        port=settings.MAIL_PORT,
+        username=settings.MAIL_USERNAME,
+        password=settings.MAIL_PASSWORD,
+        use_tls=settings.MAIL_SSL_TLS,
+        start_tls=settings.MAIL_STARTTLS,
+        validate_certs=settings.MAIL_VALIDATE_CERTS,
+        timeout=settings.MAIL_TIMEOUT,
+    )
+
+
+class SMTPPool:
+    """
+    A pool of persistent, logged in SMTP connections of one event loop.
+
+    At most `size` connections are open at once. A released connection is
+    reused by the next sender, so the TCP, TLS and login handshakes are paid
+    once per connection instead of once per email. A connection idle for more
+    than `check_after` seconds is checked with a NOOP before reuse, and one
+    idle for more than `idle_timeout` seconds is closed, before the server
+    drops it.
+    """
+
+    def __init__(
+        self,
+        sender_factory: Callable[[], SMTPSender] = create_sender,
+        size: int = settings.MAIL_POOL_SIZE,
+        idle_timeout: float = settings.MAIL_POOL_IDLE_SECONDS,
+        check_after: float = settings.MAIL_POOL_CHECK_SECONDS,
+    ) -> None:
+        self.sender_factory = sender_factory
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+        self._idle: deque[tuple[SMTPSender, float]] = deque()
+        self._slots: asyncio.Semaphore | None = None
+
+    async def _reuse(self) -> SMTPSender | None:
+        while self._idle:
+            # The most recently used connection is the most likely to be alive
+            sender, released_at = self._idle.pop()
+            idle = time.monotonic() - released_at
+
+            if idle > self.idle_timeout:
+                await sender.close()
+                continue
+            if idle > self.check_after and not await sender.is_alive():
+                metrics.increment("smtp_pool_broken_total")
+                await sender.close()
+                continue
+
+            metrics.increment("smtp_pool_reused_total")
+            return sender
+
+        return None
+
+    async def acquire(self) -> SMTPSender:
+        """
+        Return an open connection, waiting while all of them are in use.
+
+        Returns:
+            SMTPSender
+        """
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        await self._slots.acquire()
+
+        try:
+            sender = await self._reuse()
+            if sender is None:
+                sender = self.sender_factory()
+                await sender.connect()
+                metrics.increment("smtp_pool_connects_total")
+            return sender
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, sender: SMTPSender, broken: bool = False) -> None:
+        """
+        Return a connection to the pool, or close it if it is broken.
+
+        Args:
+            sender (SMTPSender): an acquired connection.
+            broken (bool): the connection failed and must not be reused.
+        """
+
+        try:
+            if broken or not sender.smtp.is_connected:
+                await sender.close()
+            else:
+                self._idle.append((sender, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[SMTPSender]:
+        """
+        Acquire a connection for a block, a connection error discards it.
+        """
+
+        sender = await self.acquire()
+        try:
+            yield sender
+        except OSError:
+            await self.release(sender, broken=True)
+            raise
+        except BaseException:
+            await self.release(sender)
+            raise
+        else:
+            await self.release(sender)
+
+    async def prune(self) -> None:
+        """
+        Close connections idle for longer than `idle_timeout`.
+        """
+
+        now = time.monotonic()
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            sender, _ = self._idle.popleft()
+            await sender.close()
+
+    async def close(self) -> None:
+        """
+        Close all idle connections.
+        """
+
+        while self._idle:
+            sender, _ = self._idle.popleft()
+            await sender.close()
+
+
+class EmailOutboxService:
+    def __init__(self, db: AsyncSession):
+        self.repository = EmailOutboxRepository(db)
+
+    def add_verification_email(self, email: str, username: str, host: str) -> None:
+        """
+        Stage a verification email, it is committed with the new user.
+
+        Args:
+            email (str): email address
+            username (str): username
+            host (str): host address
+        """
+
+        self.repository.add(
+            VERIFICATION_EMAIL, email, {"username": username, "host": host}, utcnow()
+        )
+
+    async def add_reset_email(self, email: str, host: str) -> bool:
+        """
+        Add a reset password email to the outbox, unless one was added for the
+        recipient within EMAIL_COALESCE_SECONDS. The token is created when the
+        email is sent, so a repeated request reuses both the email and its token.
+
+        Args:
+            email (str): email address
+            host (str): host address
+
+        Returns:
+            True if the email was added, False if it was coalesced.
+        """
+
+        now = utcnow()
+        since = now - timedelta(seconds=settings.EMAIL_COALESCE_SECONDS)
+        if await self.repository.has_recent(RESET_PASSWORD_EMAIL, email, since):
+            metrics.increment("email_outbox_coalesced_total")
+            metrics.increment(f"email_outbox_coalesced_{RESET_PASSWORD_EMAIL}_total")
+            return False
+
+        self.repository.add(RESET_PASSWORD_EMAIL, email, {"host": host}, now)
+        await self.repository.commit()
+        return True
@@ -0,0 +1,164 @@
+import asyncio
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from src.conf.config import settings
+from src.services.auth import Hash
+from src.services.metrics import metrics
+from src.utils import HTTPServiceUnavailableException
+
+
+class PasswordHasher:
+    """
+    Run password hashing and verification in a bounded thread pool.
+
+    argon2 and bcrypt release the GIL while hashing, so the event loop keeps
+    serving other requests. At most `workers` operations run at once; callers
+    beyond that wait up to `queue_timeout` seconds and at most `max_waiting`
+    callers wait, otherwise the call fails with 503.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_waiting: int,
+        queue_timeout: float,
+        hasher: Hash | None = None,
+    ) -> None:
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self.queue_timeout = queue_timeout
+        self.hasher = hasher or Hash()
+        self._executor: ThreadPoolExecutor | None = None
+        self._slots: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._waiting = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # asyncio primitives are bound to the loop they are first used in
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.workers)
+        return slots
+
+    async def _acquire(self, slots: asyncio.Semaphore) -> None:
+        if slots.locked() and self._waiting >= self.max_waiting:
+            metrics.increment("password_hash_rejected_total")
+            raise HTTPServiceUnavailableException(
+                "Too many password operations, try again later."
+            )
+
+        self._waiting += 1
+        metrics.add_gauge("password_hash_waiting", 1)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            metrics.increment("password_hash_timeouts_total")
+            raise HTTPServiceUnavailableException(
+                "Too many password operations, try again later."
+            )
+        finally:
+            self._waiting -= 1
+            metrics.add_gauge("password_hash_waiting", -1)
+            metrics.observe(
+                "password_hash_queue_seconds", time.perf_counter() - started
+            )
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """
+        Run a CPU bound password function in the pool.
+
+        Args:
+            func (Callable): a blocking function.
+            *args: arguments of the function.
+
+        Returns:
+            The result of the function.
+        """
+
+        slots = self._get_slots()
+        await self._acquire(slots)
+
+        metrics.add_gauge("password_hash_in_flight", 1)
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            slots.release()
+            metrics.add_gauge("password_hash_in_flight", -1)
+            metrics.observe("password_hash_seconds", time.perf_counter() - started)
+
+    async def hash(self, password: str) -> str:
+        """
+        Return a hash of a password.
+
+        Args:
+            password (str): a plain password.
+
+        Returns:
+            str
+        """
+
+        return await self.run(self.hasher.get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Check a password against a hash.
+
+        Args:
+            plain_password (str): a plain password.
+            hashed_password (str): a stored hash.
+
+        Returns:
+            bool
+        """
+
+        return await self.run(
+            self.hasher.verify_password, plain_password, hashed_password
+        )
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        """
+        Check a password and rehash it if the stored hash is outdated.
+
+        Args:
+            plain_password (str): a plain password.
+            hashed_password (str): a stored hash.
+
+        Returns:
+            (verified, a new hash or None)
+        """
+
+        return await self.run(
+            self.hasher.verify_and_update, plain_password, hashed_password
+        )
+
+    def shutdown(self) -> None:
+        """
+        Stop the pool threads.
+        """
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_waiting=settings.PASSWORD_HASH_MAX_WAITING,
+    queue_timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT,
+)
@@ -0,0 +1,41 @@
+from fastapi import Request
+from jose import JWTError
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from src.conf.config import settings
+from src.services.tokens import token_decode_cache
+
+
+def get_user_or_remote_address(request: Request) -> str:
+    """
+    Return a rate limit key of the subject of a valid bearer token, or of the client address.
+
+    Args:
+        request (Request): An instance of Request.
+
+    Returns:
+        str
+    """
+
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+
+    if scheme.lower() == "bearer" and token:
+        try:
+            # Verified claims are cached, so this is a dictionary lookup
+            return f"user:{token_decode_cache.decode(token)['sub']}"
+        except (JWTError, KeyError):
+            pass
+
+    return f"ip:{get_remote_address(request)}"
+
+
+# Limits are counted in RATE_LIMIT_STORAGE_URI, shared by all workers with
+# redis:// (atomic Lua scripts of the limits package), per worker with memory://
+limiter = Limiter(
+    key_func=get_user_or_remote_address,
+    storage_uri=settings.RATE_LIMIT_STORAGE_URI,
+    strategy=settings.RATE_LIMIT_STRATEGY,
+    key_prefix=settings.CACHE_PREFIX + "rate-limit",
+    in_memory_fallback_enabled=True,
+)
@@ -0,0 +1,83 @@
+import threading
+from collections import defaultdict
+
+
+class Metrics:
+    """
+    In-process counters, gauges and timings of a worker.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, int] = defaultdict(int)
+        self._gauges: dict[str, float] = defaultdict(float)
+        self._timings: dict[str, dict[str, float]] = {}
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """
+        Increase a counter.
+
+        Args:
+            name (str): a counter name.
+            value (int): an increment.
+        """
+
+        with self._lock:
+            self._counters[name] += value
+
+    def add_gauge(self, name: str, value: float) -> None:
+        """
+        Add a positive or negative value to a gauge.
+
+        Args:
+            name (str): a gauge name.
+            value (float): a delta.
+        """
+
+        with self._lock:
+            self._gauges[name] += value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """
+        Record a duration.
+
+        Args:
+            name (str): a timing name.
+            seconds (float): a duration in seconds.
+        """
+
+        with self._lock:
+            timing = self._timings.setdefault(
+                name, {"count": 0, "sum": 0.0, "max": 0.0}
+            )
+            timing["count"] += 1
+            timing["sum"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+
+    def snapshot(self) -> dict:
+        """
+        Return current values of all metrics.
+
+        Returns:
+            dict(counters, gauges, timings)
+        """
+
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": {name: dict(t) for name, t in self._timings.items()},
+            }
+
+    def reset(self) -> None:
+        """
+        Drop all recorded values.
+        """
+
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timings.clear()
+
+
+metrics = Metrics()
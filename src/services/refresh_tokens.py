@@ -0,0 +1,123 @@
+import hashlib
+import hmac
+import logging
+import secrets
+import uuid
+from datetime import timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.models import User
+from src.repository.refresh_tokens import RefreshTokenRepository
+from src.schemas.users import UserRecord
+from src.services.auth import get_user_record_by_id
+from src.utils import HTTPUnauthorizedException, utcnow
+
+logger = logging.getLogger(__name__)
+
+
+def hash_refresh_token(token: str) -> str:
+    """
+    Return an HMAC-SHA256 of a refresh token.
+
+    Refresh tokens are 256 random bits, so a keyed hash is enough to make a
+    leaked table useless and keeps the lookup a single indexed equality.
+
+    Args:
+        token (str): a refresh token.
+
+    Returns:
+        str
+    """
+
+    return hmac.new(
+        settings.JWT_SECRET.encode(), token.encode(), hashlib.sha256
+    ).hexdigest()
+
+
+class RefreshTokenService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.repository = RefreshTokenRepository(db)
+
+    async def issue(self, user: User | UserRecord, family_id: str | None = None) -> str:
+        """
+        Create a refresh token of a user.
+
+        Args:
+            user (User | UserRecord): the owner.
+            family_id (str, optional): a family of a rotated token, a new one by default.
+
+        Returns:
+            str
+        """
+
+        token = secrets.token_urlsafe(32)
+        now = utcnow()
+        await self.repository.create(
+            user_id=user.id,
+            token_hash=hash_refresh_token(token),
+            family_id=family_id or uuid.uuid4().hex,
+            token_version=user.token_version,
+            created_at=now,
+            expires_at=now
+            + timedelta(seconds=settings.REFRESH_TOKEN_EXPIRATION_SECONDS),
+        )
+        return token
+
+    async def rotate(self, token: str) -> tuple[UserRecord, str]:
+        """
+        Exchange a refresh token for a new one of the same family.
+
+        A token is accepted once. Presenting a used or revoked token again
+        means it leaked, so the whole family is revoked.
+
+        Args:
+            token (str): a refresh token.
+
+        Returns:
+            (the owner, a new refresh token)
+
+        Raises:
+            HTTPUnauthorizedException: The token is invalid, expired, reused or
+                issued before the tokens of the owner were revoked.
+        """
+
+        token_hash = hash_refresh_token(token)
+        now = utcnow()
+        row = await self.repository.use(token_hash, now)
+
+        if row is None:
+            stored = await self.repository.get_by_hash(token_hash)
+
+            if stored is not None and (stored.used_at or stored.revoked_at):
+                await self.repository.revoke_family(stored.family_id, now)
+                logger.warning(
+                    f"Refresh token reuse detected for a user {stored.user_id}, "
+                    f"family {stored.family_id} revoked."
+                )
+
+            raise HTTPUnauthorizedException("Invalid refresh token")
+
+        user = await get_user_record_by_id(row.user_id, self.db)
+
+        if user is None or user.token_version != row.token_version:
+            await self.repository.revoke_family(row.family_id, now)
+            raise HTTPUnauthorizedException("Invalid refresh token")
+
+        return user, await self.issue(user, row.family_id)
+
+    async def revoke(self, token: str, user_id: int) -> None:
+        """
+        Revoke the family of a refresh token of a user.
+
+        Args:
+            token (str): a refresh token.
+            user_id (int): an ID of the owner, tokens of other users are ignored.
+        """
+
+        stored = await self.repository.get_by_hash(hash_refresh_token(token))
+
+        if stored is not None and stored.user_id == user_id:
+            await self.repository.revoke_family(stored.family_id, utcnow())
@@ -0,0 +1,208 @@
+import asyncio
+import hashlib
+import math
+import time
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.repository.revoked_tokens import RevokedTokenRepository
+from src.services.metrics import metrics
+from src.utils import utcnow
+
+
+class BloomFilter:
+    """
+    A fixed size Bloom filter of strings.
+
+    Sized for `capacity` items at a false positive rate of `error_rate`.
+    Probes are derived from one BLAKE2b digest by double hashing.
+    """
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for probe in range(self.hashes):
+            yield (first + probe * second) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class TokenRevocationList:
+    """
+    Revoked access tokens in the database fronted by a per-worker Bloom filter.
+
+    A token that is not in the filter is certainly not revoked, so the common
+    case costs a few bit probes. A hit is confirmed by a unique index lookup.
+
+    The filter picks up revocations of other workers every `refresh_interval`
+    seconds by reading rows revoked since the previous refresh, with an
+    `overlap` for clock skew and late commits. It is rebuilt every
+    `rebuild_interval` seconds or when it is full, so revocations of expired
+    tokens fall out of it.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float,
+        refresh_interval: float,
+        rebuild_interval: float,
+        overlap: float = 30,
+    ) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.overlap = overlap
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Drop the filter, it is rebuilt on the next check.
+        """
+
+        self.bloom = BloomFilter(self.capacity, self.error_rate)
+        self._synced_at: datetime | None = None
+        self._next_refresh = 0.0
+        self._next_rebuild = 0.0
+        self._first_sync: asyncio.Future | None = None
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """
+        Add tokens revoked since the last refresh, or rebuild the filter when due.
+
+        Until the first rebuild succeeds, every caller waits for it, because an
+        empty filter would accept revoked tokens. A failed refresh is retried by
+        the next call.
+
+        Args:
+            db (AsyncSession): instance of AsyncSession
+        """
+
+        while self._synced_at is None:
+            first_sync = self._first_sync
+            if (
+                first_sync is not None
+                and not first_sync.done()
+                and first_sync.get_loop() is asyncio.get_running_loop()
+            ):
+                # Wait for the rebuild of another request, then check its result
+                await asyncio.shield(first_sync)
+                continue
+
+            self._first_sync = asyncio.get_running_loop().create_future()
+            try:
+                await self._sync(db, time.monotonic())
+            finally:
+                self._first_sync.set_result(None)
+                self._first_sync = None
+            return
+
+        now = time.monotonic()
+        if now < self._next_refresh:
+            return
+        # Concurrent requests skip the refresh instead of repeating it
+        self._next_refresh = now + self.refresh_interval
+
+        try:
+            await self._sync(db, now)
+        except BaseException:
+            self._next_refresh = 0.0
+            raise
+
+    async def _sync(self, db: AsyncSession, now: float) -> None:
+        repository = RevokedTokenRepository(db)
+        started_at = utcnow()
+        rebuild = (
+            self._synced_at is None
+            or now >= self._next_rebuild
+            or self.bloom.count >= self.capacity
+        )
+
+        if rebuild:
+            await repository.delete_expired(started_at)
+            bloom = BloomFilter(self.capacity, self.error_rate)
+            for jti in await repository.get_revoked_since(datetime.min, started_at):
+                bloom.add(jti)
+            self.bloom = bloom
+            self._next_rebuild = now + self.rebuild_interval
+            self._next_refresh = now + self.refresh_interval
+            metrics.increment("token_revocation_rebuilds_total")
+        else:
+            since = self._synced_at - timedelta(seconds=self.overlap)
+            for jti in await repository.get_revoked_since(since, started_at):
+                if jti not in self.bloom:
+                    self.bloom.add(jti)
+
+        self._synced_at = started_at
+
+    async def is_revoked(self, jti: str, db: AsyncSession) -> bool:
+        """
+        Check whether a token is revoked.
+
+        Args:
+            jti (str): the jti claim of the token.
+            db (AsyncSession): instance of AsyncSession
+
+        Returns:
+            bool
+        """
+
+        await self.refresh(db)
+
+        if jti not in self.bloom:
+            return False
+
+        metrics.increment("token_revocation_bloom_hits_total")
+        return await RevokedTokenRepository(db).is_revoked(jti)
+
+    async def revoke(
+        self, jti: str, user_id: int, expires_at: float | None, db: AsyncSession
+    ) -> None:
+        """
+        Revoke a token in the database and in the filter of this worker.
+
+        Args:
+            jti (str): the jti claim of the token.
+            user_id (int): an ID of the owner.
+            expires_at (float, Optional): the exp claim of the token.
+            db (AsyncSession): instance of AsyncSession
+        """
+
+        now = utcnow()
+        expires = (
+            datetime.fromtimestamp(expires_at, UTC).replace(tzinfo=None)
+            if expires_at is not None
+            else now + timedelta(seconds=settings.JWT_EXPIRATION_SECONDS)
+        )
+        await RevokedTokenRepository(db).add(jti, user_id, now, expires)
+        self.bloom.add(jti)
+        metrics.increment("token_revocations_total")
+
+
+revocation_list = TokenRevocationList(
+    capacity=settings.TOKEN_REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+    refresh_interval=settings.TOKEN_REVOCATION_REFRESH_SECONDS,
+    rebuild_interval=settings.TOKEN_REVOCATION_REBUILD_SECONDS,
+)
@@ -0,0 +1,96 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from jose import jwt
+
+from src.conf.config import settings
+from src.services.metrics import metrics
+
+
+class TokenDecodeCache:
+    """
+    Bounded LRU of verified JWT claims keyed by a SHA-256 digest of the token.
+
+    A client sends the same bearer token on every request, so the signature
+    is verified once and the claims are reused until shortly before `exp`.
+    Entries expire `leeway` seconds early so a cached token never outlives
+    the one jwt.decode would still accept, even if the clock of this worker
+    runs behind; tokens without `exp` are kept for at most `max_ttl` seconds.
+    Invalid tokens are not cached and are verified every time.
+    """
+
+    def __init__(self, max_size: int, leeway: float, max_ttl: float) -> None:
+        self.max_size = max_size
+        self.leeway = leeway
+        self.max_ttl = max_ttl
+        self._lock = threading.Lock()
+        self._items: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        # Tokens are credentials, keep only digests in memory
+        return hashlib.sha256(token.encode()).digest()
+
+    def decode(self, token: str) -> dict:
+        """
+        Return verified claims of a token, from the cache if possible.
+
+        Args:
+            token (str): an encoded JWT.
+
+        Returns:
+            dict
+
+        Raises:
+            JWTError: The token is invalid or expired.
+        """
+
+        key = self._key(token)
+        now = time.time()
+
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                if item[1] > now:
+                    self._items.move_to_end(key)
+                    metrics.increment("jwt_decode_cache_hits_total")
+                    return dict(item[0])
+                del self._items[key]
+
+        metrics.increment("jwt_decode_cache_misses_total")
+        payload = jwt.decode(
+            token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
+        )
+
+        expires = now + self.max_ttl
+        if isinstance(payload.get("exp"), (int, float)):
+            expires = min(expires, payload["exp"] - self.leeway)
+
+        if self.max_size > 0 and expires > now:
+            with self._lock:
+                self._items[key] = (dict(payload), expires)
+                self._items.move_to_end(key)
+                while len(self._items) > self.max_size:
+                    self._items.popitem(last=False)
+
+        return payload
+
+    def clear(self) -> None:
+        """
+        Drop all cached claims.
+        """
+
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+token_decode_cache = TokenDecodeCache(
+    max_size=settings.JWT_DECODE_CACHE_SIZE,
+    leeway=settings.JWT_DECODE_CACHE_LEEWAY,
+    max_ttl=settings.JWT_DECODE_CACHE_MAX_TTL,
+)
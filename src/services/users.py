@@ -1,10 +1,11 @@
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from libgravatar import Gravatar
 
 from src.repository.users import UserRepository
 from src.database.models import User
 from src.schemas.users import UserCreate, UserUpdate
-from src.utils import HTTPNotFoundException
+from src.utils import HTTPNotFoundException, HTTPConflictRequestException
 
 
 class UserService:
@@ -13,7 +14,9 @@ class UserService:
 
     async def create_user(self, body: UserCreate):
         """
-        Create a user with avatar from Gravatar by email address
+        Create a user with avatar from Gravatar by email address.
+        Conflicts are detected by the unique constraints, and the violated
+        one is looked up only after a failed insert.
 
         Args:
             body (int): instance of UserCreate
@@ -29,7 +32,16 @@ class UserService:
         except Exception as e:
             print(e)
 
-        return await self.repository.create_user(body, avatar)
+        try:
+            return await self.repository.create_user(body, avatar)
+        except IntegrityError:
+            if await self.repository.get_user_by_email(body.email):
+                raise HTTPConflictRequestException(
+                    "A user already exists with the same email."
+                )
+            raise HTTPConflictRequestException(
+                "A user already exists with the same username."
+            )
 
     async def get_user_by_id(self, user_id: int):
         """
@@ -89,12 +101,12 @@ class UserService:
             User
         """
 
-        user = await self.get_user_by_email(email)
+        user = await self.repository.update_avatar_url(email, url)
 
         if not user:
             raise HTTPNotFoundException("User Not found")
 
-        return await self.repository.update_avatar_url(email, url)
+        return user
 
     async def verify_email(self, email: str):
         """
@@ -104,10 +116,15 @@ class UserService:
             email (str): email address
 
         Returns:
-            None
+            True if the user was verified by this call
         """
 
-        await self.repository.verify_email(email)
+        return await self.repository.verify_email(email)
+
+    async def update_user(
+        self, user: User, body: UserUpdate, revoke_tokens: bool = False
+    ):
+        return await self.repository.update_user(user, body, revoke_tokens)
 
-    async def update_user(self, user: User, body: UserUpdate):
-        return await self.repository.update_user(user, body)
+    async def get_token_version(self, user_id: int) -> int | None:
+        return await self.repository.get_token_version(user_id)
@@ -1,3 +1,8 @@
+import base64
+import binascii
+import json
+from datetime import UTC, datetime
+
 from fastapi import HTTPException, status
 from pydantic import BaseModel
 
@@ -26,6 +31,15 @@ class HTTPBadRequestException(HTTPException):
         )
 
 
+class HTTPUnauthorizedException(HTTPException):
+    def __init__(self, detail: str | None = None) -> None:
+        super().__init__(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=detail or "Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
 class HTTPNotFoundException(HTTPException):
     def __init__(self, detail: str | None = None) -> None:
         super().__init__(
@@ -34,6 +48,23 @@ class HTTPNotFoundException(HTTPException):
         )
 
 
+class HTTPUnsupportedMediaTypeException(HTTPException):
+    def __init__(self, detail: str | None = None) -> None:
+        super().__init__(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=detail or "Unsupported media type",
+        )
+
+
+class HTTPServiceUnavailableException(HTTPException):
+    def __init__(self, detail: str | None = None, retry_after: int = 1) -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail or "Service unavailable",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
 class BadRequestModel(BaseModel):
     detail: str
     status_code: int = 400
@@ -57,3 +88,52 @@ not_found_response_docs = {
         "description": "Not found",
     },
 }
+
+
+def utcnow() -> datetime:
+    """
+    Return the current time as naive UTC, the way timestamps are stored.
+
+    Returns:
+        datetime
+    """
+
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def encode_cursor(values: dict) -> str:
+    """
+    Encode keyset pagination values into an opaque cursor.
+
+    Args:
+        values (dict): values of the sort key of the last returned row.
+
+    Returns:
+        str
+    """
+
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Decode an opaque cursor created by encode_cursor.
+
+    Args:
+        cursor (str): an opaque cursor.
+
+    Returns:
+        dict
+    """
+
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (binascii.Error, ValueError):
+        raise HTTPBadRequestException("Invalid cursor")
+
+    if not isinstance(values, dict):
+        raise HTTPBadRequestException("Invalid cursor")
+
+    return values
@@ -0,0 +1,133 @@
+"""
+Queue digests of upcoming birthdays once a day.
+
+Every day at BIRTHDAY_DIGEST_HOUR UTC the scheduler queues one email per user
+with contacts celebrating within BIRTHDAY_DIGEST_DAYS days, the email outbox
+worker sends them. Schedulers of any number of nodes can run at once, the
+unique run of the day in job_runs lets only one of them queue the batch. A
+scheduler started after the hour catches up with the day's batch at once, and
+a failed batch is retried with backoff until it is queued.
+
+It runs in the API process with BIRTHDAY_DIGEST_SCHEDULER=true, or alone from
+the project root:
+    python -m src.workers.birthday_digest
+"""
+
+import asyncio
+import logging
+import signal
+from datetime import date, datetime, timedelta
+from typing import Callable
+
+from src.conf.config import settings
+from src.services.birthdays import BirthdayDigestService
+from src.utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+
+def seconds_until(hour: int, now: datetime) -> float:
+    """
+    Return seconds from now until the next start of an hour of a day.
+
+    Args:
+        hour (int): an hour of a day from 0 to 23.
+        now (datetime): the current time.
+
+    Returns:
+        Seconds
+    """
+
+    next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+async def queue_digests(
+    session_factory: Callable, today: date, days: int = settings.BIRTHDAY_DIGEST_DAYS
+) -> int | None:
+    """
+    Queue the digests of a day in a new session.
+
+    Args:
+        session_factory (Callable): an async context manager of sessions.
+        today (date): the day of the batch.
+        days (int): number of days within future birthdays.
+
+    Returns:
+        The number of queued emails or None if the day's batch is taken.
+    """
+
+    async with session_factory() as session:
+        queued = await BirthdayDigestService(session).queue_digests(today, days)
+
+    if queued is None:
+        logger.info(f"Birthday digests of {today} are queued by another run.")
+    else:
+        logger.info(f"Queued {queued} birthday digests of {today}.")
+    return queued
+
+
+async def run_scheduler(
+    session_factory: Callable,
+    stop: asyncio.Event,
+    hour: int = settings.BIRTHDAY_DIGEST_HOUR,
+    retry_base: float = settings.BIRTHDAY_DIGEST_RETRY_BASE_SECONDS,
+    retry_max: float = settings.BIRTHDAY_DIGEST_RETRY_MAX_SECONDS,
+) -> None:
+    """
+    Queue the digests every day at an hour UTC until stopped.
+
+    Args:
+        session_factory (Callable): an async context manager of sessions.
+        stop (asyncio.Event): set to stop the scheduler.
+        hour (int): an hour of a day from 0 to 23.
+        retry_base (float): the first delay before retrying a failed batch.
+        retry_max (float): the maximum delay before retrying a failed batch.
+    """
+
+    failures = 0
+    # The day of a batch to queue, kept until it succeeds even past midnight
+    run_date = None
+    while not stop.is_set():
+        now = utcnow()
+        if run_date is None and now.hour >= hour:
+            run_date = now.date()
+
+        delay = seconds_until(hour, now)
+        if run_date is not None:
+            try:
+                await queue_digests(session_factory, run_date)
+            except Exception:
+                failures += 1
+                logger.exception(f"Birthday digests of {run_date} failed.")
+                delay = min(retry_base * 2 ** (failures - 1), retry_max)
+            else:
+                failures = 0
+                run_date = None
+                delay = seconds_until(hour, utcnow())
+
+        try:
+            await asyncio.wait_for(stop.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def main() -> None:
+    from src.database.db import sessionmanager
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    logger.info("Birthday digest scheduler started.")
+    await run_scheduler(sessionmanager.session, stop)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,200 @@
+"""
+Send emails of the outbox.
+
+Pending emails are claimed in batches with SELECT ... FOR UPDATE SKIP LOCKED,
+so several workers can run at once. A claim leases the batch for
+EMAIL_OUTBOX_LEASE_SECONDS and is committed before sending, then the result of
+every email is committed on its own. An email whose result is lost is sent
+again only after the lease expires. A batch is sent concurrently over a pool
+of persistent SMTP connections, throttled to EMAIL_OUTBOX_RATE_PER_SECOND.
+Failed emails are retried with exponential backoff.
+
+Run from the project root:
+    python -m src.workers.email_outbox
+"""
+
+import asyncio
+import logging
+import random
+import signal
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+from src.conf.config import settings
+from src.database.models import EmailOutbox, EmailStatus
+from src.repository.email_outbox import EmailOutboxRepository
+from src.services.email import SMTPPool, precompile_templates, render_email
+from src.services.metrics import metrics
+from src.utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+
+class EmailOutboxWorker:
+    def __init__(
+        self,
+        session_factory: Callable,
+        pool: SMTPPool,
+        batch_size: int = settings.EMAIL_OUTBOX_BATCH_SIZE,
+        max_attempts: int = settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+        retry_base: float = settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS,
+        retry_max: float = settings.EMAIL_OUTBOX_RETRY_MAX_SECONDS,
+        poll_interval: float = settings.EMAIL_OUTBOX_POLL_SECONDS,
+        rate: float = settings.EMAIL_OUTBOX_RATE_PER_SECOND,
+        lease: float = settings.EMAIL_OUTBOX_LEASE_SECONDS,
+    ) -> None:
+        self.session_factory = session_factory
+        self.pool = pool
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.poll_interval = poll_interval
+        self.rate = rate
+        self.lease = lease
+        self._next_send_at = 0.0
+
+    def backoff(self, attempts: int) -> float:
+        """
+        Return a delay before the next attempt, doubled by every attempt with jitter.
+
+        Args:
+            attempts (int): the number of failed attempts.
+
+        Returns:
+            Seconds
+        """
+
+        delay = min(self.retry_base * 2 ** (attempts - 1), self.retry_max)
+        return delay * random.uniform(0.5, 1)
+
+    async def _throttle(self) -> None:
+        if not self.rate:
+            return
+        # Every sender reserves the next free slot, spaced by 1 / rate
+        now = time.monotonic()
+        send_at = max(self._next_send_at, now)
+        self._next_send_at = send_at + 1 / self.rate
+        if send_at > now:
+            await asyncio.sleep(send_at - now)
+
+    def _fail(self, email: EmailOutbox, error: Exception) -> None:
+        email.attempts += 1
+        email.last_error = f"{type(error).__name__}: {error}"[:1000]
+
+        if email.attempts >= self.max_attempts:
+            email.status = EmailStatus.FAILED
+            metrics.increment("email_outbox_failed_total")
+            logger.error(f"Email {email.id} failed: {email.last_error}")
+        else:
+            email.next_attempt_at = utcnow() + timedelta(
+                seconds=self.backoff(email.attempts)
+            )
+            metrics.increment("email_outbox_retries_total")
+
+    async def _save(self, email: EmailOutbox, lease_until: datetime) -> None:
+        try:
+            async with self.session_factory() as session:
+                repository = EmailOutboxRepository(session)
+                saved = await repository.save_result(email, lease_until)
+                await repository.commit()
+        except Exception:
+            # The lease keeps the email from being sent again until it expires
+            metrics.increment("email_outbox_save_errors_total")
+            logger.exception(f"Result of email {email.id} was not saved.")
+            return
+
+        if not saved:
+            logger.warning(f"Lease of email {email.id} expired before its result.")
+
+    async def _send(self, email: EmailOutbox, lease_until: datetime) -> None:
+        await self._throttle()
+        try:
+            async with self.pool.connection() as sender:
+                await sender.send(
+                    render_email(email.kind, email.recipient, email.payload)
+                )
+        except Exception as e:
+            # A lost connection is discarded by the pool, the email is retried
+            self._fail(email, e)
+        else:
+            email.attempts += 1
+            email.status = EmailStatus.SENT
+            email.sent_at = utcnow()
+            metrics.increment("email_outbox_sent_total")
+
+        await self._save(email, lease_until)
+
+    async def _send_batch(
+        self, emails: list[EmailOutbox], lease_until: datetime
+    ) -> None:
+        # Every pooled connection sends its next email as soon as it is free
+        await asyncio.gather(*(self._send(email, lease_until) for email in emails))
+
+    async def drain_once(self) -> int:
+        """
+        Claim one batch of due emails, send it and save the result of every email.
+
+        Returns:
+            The number of claimed emails.
+        """
+
+        now = utcnow()
+        lease_until = now + timedelta(seconds=self.lease)
+        async with self.session_factory() as session:
+            repository = EmailOutboxRepository(session)
+            emails = await repository.claim_batch(now, self.batch_size, lease_until)
+            await repository.commit()
+
+        if emails:
+            await self._send_batch(emails, lease_until)
+
+        return len(emails)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """
+        Drain the outbox until stopped, polling when it is empty.
+
+        Args:
+            stop (asyncio.Event): set to stop after the current batch.
+        """
+
+        while not stop.is_set():
+            try:
+                claimed = await self.drain_once()
+            except Exception:
+                # E.g. a lost database connection, the batch is claimed again
+                logger.exception("Email outbox batch failed.")
+                claimed = 0
+
+            if claimed < self.batch_size:
+                await self.pool.prune()
+                try:
+                    await asyncio.wait_for(stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+async def main() -> None:
+    from src.database.db import sessionmanager
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    precompile_templates()
+    logger.info("Email outbox worker started.")
+    pool = SMTPPool()
+    try:
+        await EmailOutboxWorker(sessionmanager.session, pool).run(stop)
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -8,7 +8,10 @@ from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 from main import app
 from src.database.models import Base, User
-from src.database.db import get_db
+from src.database.db import get_db, register_sqlite_functions
+from src.services.cache import user_cache
+from src.services.limiter import limiter
+from src.services.revocation import revocation_list
 from src.services.auth import create_access_token, Hash
 
 SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
@@ -18,6 +21,7 @@ engine = create_async_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
+register_sqlite_functions(engine)
 
 TestingSessionLocal = async_sessionmaker(
     autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
@@ -35,6 +39,8 @@ test_user = {
 @pytest.fixture(scope="module", autouse=True)
 def init_models_wrap():
     async def init_models():
+        await user_cache.cache.clear()
+        revocation_list.reset()
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.drop_all)
             await conn.run_sync(Base.metadata.create_all)
@@ -55,6 +61,11 @@ def init_models_wrap():
     asyncio.run(init_models())
 
 
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    limiter.reset()
+
+
 @pytest.fixture(scope="module")
 def client():
     async def override_get_db():
@@ -89,7 +100,11 @@ def client_fail_healthchecker():
 
 @pytest_asyncio.fixture()
 async def get_token():
-    token = await create_access_token(payload={"sub": test_user["username"]})
+    async with TestingSessionLocal() as session:
+        user = await session.get(User, test_user["id"])
+    token = await create_access_token(
+        payload={"sub": test_user["username"], "ver": user.token_version}
+    )
     return token
 
 
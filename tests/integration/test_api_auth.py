@@ -1,9 +1,14 @@
-from unittest.mock import Mock
+from unittest.mock import AsyncMock, Mock
 
 import pytest
+from jose import jwt
+from passlib.hash import bcrypt
 from sqlalchemy import select
 
-from src.database.models import User
+from src.conf.config import settings
+from src.database.models import EmailOutbox, EmailStatus, User
+from src.services.auth import create_access_token
+from src.services.metrics import metrics
 from src.utils import HTTPConflictRequestException
 from tests.conftest import TestingSessionLocal, test_user
 
@@ -15,9 +20,16 @@ user_data = {
 }
 
 
-def test_register_user(client, monkeypatch):
-    mock_send_email = Mock()
-    monkeypatch.setattr("src.api.auth.send_email", mock_send_email)
+async def get_outbox_emails(recipient: str) -> list[EmailOutbox]:
+    async with TestingSessionLocal() as session:
+        result = await session.execute(
+            select(EmailOutbox).filter(EmailOutbox.recipient == recipient)
+        )
+        return list(result.scalars())
+
+
+@pytest.mark.asyncio
+async def test_register_user(client):
     response = client.post("api/auth/register", json=user_data)
     assert response.status_code == 201, response.text
     data = response.json()
@@ -25,13 +37,14 @@ def test_register_user(client, monkeypatch):
     assert data["email"] == user_data["email"]
     assert "password" not in data
     assert "avatar" in data
+    emails = await get_outbox_emails(user_data["email"])
+    assert [email.kind for email in emails] == ["verification"]
+    assert emails[0].payload["username"] == user_data["username"]
+    assert emails[0].status == EmailStatus.PENDING
 
 
-def test_register_user_again(client, monkeypatch):
-    # Setup
-    mock_send_email = Mock()
-    monkeypatch.setattr("src.api.auth.send_email", mock_send_email)
-
+@pytest.mark.asyncio
+async def test_register_user_again(client):
     # Call method
     response = client.post("api/auth/register", json=user_data)
     data = response.json()
@@ -39,14 +52,14 @@ def test_register_user_again(client, monkeypatch):
     # Assertions
     assert response.status_code == 409, response.text
     assert data["detail"] == "A user already exists with the same email."
+    assert len(await get_outbox_emails(user_data["email"])) == 1
 
 
-def test_register_user_with_same_username(client, monkeypatch):
+@pytest.mark.asyncio
+async def test_register_user_with_same_username(client):
     # Setup
-    mock_send_email = Mock()
     updated_user_data = user_data.copy()
     updated_user_data["email"] = "updatedemail@gmail.com"
-    monkeypatch.setattr("src.api.auth.send_email", mock_send_email)
 
     # Call method
     response = client.post("api/auth/register", json=updated_user_data)
@@ -55,6 +68,7 @@ def test_register_user_with_same_username(client, monkeypatch):
     # Assertions
     assert response.status_code == 409, response.text
     assert data["detail"] == "A user already exists with the same username."
+    assert await get_outbox_emails(updated_user_data["email"]) == []
 
 
 def test_login_user_not_confirmed(client):
@@ -101,6 +115,35 @@ async def test_login_user(client):
     assert "token_type" in data
 
 
+@pytest.mark.asyncio
+async def test_login_user_rehashes_bcrypt_password(client):
+    # Setup
+    async with TestingSessionLocal() as session:
+        current_user = await session.execute(
+            select(User).where(User.email == user_data.get("email"))
+        )
+        current_user = current_user.scalar_one()
+        current_user.password = bcrypt.hash(user_data.get("password"))
+        await session.commit()
+
+    # Call method
+    response = client.post(
+        "api/auth/login",
+        data={
+            "username": user_data.get("username"),
+            "password": user_data.get("password"),
+        },
+    )
+
+    # Assertions
+    assert response.status_code == 200, response.text
+    async with TestingSessionLocal() as session:
+        current_user = await session.execute(
+            select(User).where(User.email == user_data.get("email"))
+        )
+        assert current_user.scalar_one().password.startswith("$argon2id$")
+
+
 def test_login_user_wrong_password(client):
     # Call method
     response = client.post(
@@ -158,3 +201,269 @@ async def test_verify_email(client, get_reset_token):
         )
         current_user = current_user.scalar_one_or_none()
         assert current_user.confirmed is True
+
+
+def login_test_user(client) -> str:
+    response = client.post(
+        "api/auth/login",
+        data={
+            "username": test_user.get("username"),
+            "password": test_user.get("password"),
+        },
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["access_token"]
+
+
+def test_login_token_has_principal_claims(client):
+    # Call method
+    token = login_test_user(client)
+    claims = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+
+    # Assertions
+    assert claims["sub"] == test_user["username"]
+    assert claims["uid"] == test_user["id"]
+    assert claims["role"] == "admin"
+    assert claims["confirmed"] is True
+    assert claims["ver"] == 0
+
+
+def test_principal_token_authenticates_without_user_lookup(client, monkeypatch):
+    # Setup
+    token = login_test_user(client)
+    mock_get_current_user_from_db = Mock()
+    monkeypatch.setattr(
+        "src.services.auth.get_current_user_from_db", mock_get_current_user_from_db
+    )
+
+    # Call method
+    response = client.get("api/contacts", headers={"Authorization": f"Bearer {token}"})
+
+    # Assertions
+    assert response.status_code == 200, response.text
+    mock_get_current_user_from_db.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_principal_token_with_stale_version(client):
+    # Setup
+    token = await create_access_token(
+        {
+            "sub": test_user["username"],
+            "uid": test_user["id"],
+            "role": "admin",
+            "confirmed": True,
+            "ver": 5,
+        }
+    )
+
+    # Call method
+    response = client.get("api/contacts", headers={"Authorization": f"Bearer {token}"})
+
+    # Assertions
+    assert response.status_code == 401, response.text
+
+
+def test_password_reset_revokes_principal_tokens(client, get_reset_token):
+    # Setup
+    token = login_test_user(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("api/contacts", headers=headers).status_code == 200
+
+    # Call method
+    response = client.post(
+        "api/auth/password-reset-confirm/",
+        json={"token": get_reset_token, "password": test_user["password"]},
+    )
+
+    # Assertions
+    assert response.status_code == 200, response.text
+    assert client.get("api/contacts", headers=headers).status_code == 401
+    new_headers = {"Authorization": f"Bearer {login_test_user(client)}"}
+    assert client.get("api/contacts", headers=new_headers).status_code == 200
+
+
+def login_test_user_for_refresh_token(client):
+    response = client.post(
+        "api/auth/login",
+        data={
+            "username": test_user.get("username"),
+            "password": test_user.get("password"),
+        },
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["refresh_token"]
+
+
+def test_refresh_token_rotation(client, monkeypatch):
+    # Setup
+    refresh_token = login_test_user_for_refresh_token(client)
+    mock_verify = Mock()
+    monkeypatch.setattr("src.api.auth.password_hasher.verify_and_update", mock_verify)
+
+    # Call method
+    response = client.post("api/auth/refresh", json={"refresh_token": refresh_token})
+    data = response.json()
+
+    # Assertions
+    assert response.status_code == 200, response.text
+    assert data["refresh_token"] != refresh_token
+    mock_verify.assert_not_called()
+    headers = {"Authorization": f"Bearer {data['access_token']}"}
+    assert client.get("api/contacts", headers=headers).status_code == 200
+
+
+def test_refresh_token_reuse_revokes_family(client):
+    # Setup
+    refresh_token = login_test_user_for_refresh_token(client)
+    rotated = client.post(
+        "api/auth/refresh", json={"refresh_token": refresh_token}
+    ).json()["refresh_token"]
+
+    # Call method
+    response = client.post("api/auth/refresh", json={"refresh_token": refresh_token})
+
+    # Assertions
+    assert response.status_code == 401, response.text
+    response = client.post("api/auth/refresh", json={"refresh_token": rotated})
+    assert response.status_code == 401, response.text
+
+
+def test_refresh_token_invalid(client):
+    # Call method
+    response = client.post("api/auth/refresh", json={"refresh_token": "invalid"})
+
+    # Assertions
+    assert response.status_code == 401, response.text
+    assert response.json()["detail"] == "Invalid refresh token"
+
+
+def test_password_reset_revokes_refresh_tokens(client, get_reset_token):
+    # Setup
+    refresh_token = login_test_user_for_refresh_token(client)
+
+    # Call method
+    client.post(
+        "api/auth/password-reset-confirm/",
+        json={"token": get_reset_token, "password": test_user["password"]},
+    )
+
+    # Assertions
+    response = client.post("api/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 401, response.text
+
+
+def test_logout_revokes_access_and_refresh_tokens(client):
+    # Setup
+    response = client.post(
+        "api/auth/login",
+        data={
+            "username": test_user.get("username"),
+            "password": test_user.get("password"),
+        },
+    )
+    tokens = response.json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    other_headers = {"Authorization": f"Bearer {login_test_user(client)}"}
+
+    # Call method
+    response = client.post(
+        "api/auth/logout",
+        headers=headers,
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+
+    # Assertions
+    assert response.status_code == 200, response.text
+    assert client.get("api/contacts", headers=headers).status_code == 401
+    assert client.get("api/contacts", headers=other_headers).status_code == 200
+    response = client.post(
+        "api/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 401, response.text
+
+
+def test_login_rate_limit(client, monkeypatch):
+    # Setup
+    data = {"username": test_user["username"], "password": "wrong"}
+    monkeypatch.setattr(
+        "src.api.auth.password_hasher.verify_and_update",
+        AsyncMock(return_value=(False, None)),
+    )
+    limit = int(settings.RATE_LIMIT_LOGIN.split("/")[0])
+    for _ in range(limit):
+        assert client.post("api/auth/login", data=data).status_code == 401
+
+    # Call method
+    response = client.post("api/auth/login", data=data)
+
+    # Assertions
+    assert response.status_code == 429, response.text
+
+
+@pytest.mark.asyncio
+async def test_password_reset_queues_email(client):
+    # Call method
+    response = client.post(
+        "api/auth/password-reset/", json={"email": test_user["email"]}
+    )
+
+    # Assertions
+    assert response.status_code == 200, response.text
+    emails = await get_outbox_emails(test_user["email"])
+    assert [email.kind for email in emails] == ["reset_password"]
+    assert "token" not in emails[0].payload
+
+
+@pytest.mark.asyncio
+async def test_password_reset_coalesces_repeated_requests(client):
+    # Setup
+    async with TestingSessionLocal() as session:
+        for email in await get_outbox_emails(test_user["email"]):
+            await session.delete(await session.merge(email))
+        await session.commit()
+    metrics.reset()
+
+    # Call method
+    for email in (test_user["email"], test_user["email"].upper(), test_user["email"]):
+        response = client.post("api/auth/password-reset/", json={"email": email})
+        assert response.status_code == 200, response.text
+
+    # Assertions
+    assert len(await get_outbox_emails(test_user["email"])) == 1
+    counters = metrics.snapshot()["counters"]
+    assert counters["email_outbox_coalesced_total"] == 2
+    assert counters["email_outbox_coalesced_reset_password_total"] == 2
+
+
+@pytest.mark.asyncio
+async def test_token_without_version_is_rejected(client):
+    # Setup
+    token = await create_access_token({"sub": test_user["username"]})
+
+    # Call method
+    response = client.get("api/contacts", headers={"Authorization": f"Bearer {token}"})
+
+    # Assertions
+    assert response.status_code == 401, response.text
+
+
+def test_password_reset_revokes_username_tokens(client, get_reset_token, monkeypatch):
+    # Setup
+    monkeypatch.setattr("src.services.auth.settings.JWT_STATELESS_PRINCIPAL", False)
+    token = login_test_user(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert "uid" not in jwt.get_unverified_claims(token)
+    assert client.get("api/contacts", headers=headers).status_code == 200
+
+    # Call method
+    response = client.post(
+        "api/auth/password-reset-confirm/",
+        json={"token": get_reset_token, "password": test_user["password"]},
+    )
+
+    # Assertions
+    assert response.status_code == 200, response.text
+    assert client.get("api/contacts", headers=headers).status_code == 401
+    new_headers = {"Authorization": f"Bearer {login_test_user(client)}"}
+    assert client.get("api/contacts", headers=new_headers).status_code == 200
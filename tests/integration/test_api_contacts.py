@@ -1,8 +1,14 @@
+import csv
+import io
+import json
+from datetime import date, timedelta
+
 import pytest
 from sqlalchemy import select
 
 from src.database.models import User, Contact
 from src.schemas.contacts import ContactCreateModel
+from src.services.cache import contact_cache
 from tests.conftest import TestingSessionLocal, test_user
 
 contact_model = {
@@ -32,6 +38,9 @@ async def init_contacts():
         session.add(Contact(**contact_model))
         await session.commit()
 
+    # Contacts are written around the repository, so drop cached reads
+    await contact_cache.bump(test_user["id"])
+
     yield
 
     async with TestingSessionLocal() as session:
@@ -159,6 +168,24 @@ async def test_update_contact_by_id_success(client, get_token):
     assert data["phone"] == phone
 
 
+@pytest.mark.asyncio
+async def test_get_contact_after_update(client, get_token):
+    # Setup
+    phone = "111-22-333"
+    token = get_token
+    headers = {"Authorization": f"Bearer {token}"}
+    url = f'api/contacts/{contact_model["id"]}'
+    assert client.get(url, headers=headers).json()["phone"] == contact_model["phone"]
+    assert client.get("api/contacts/", headers=headers).json()[0]["phone"] == "911"
+
+    # Call method
+    client.patch(url, headers=headers, json={"phone": phone})
+
+    # Assertions
+    assert client.get(url, headers=headers).json()["phone"] == phone
+    assert client.get("api/contacts/", headers=headers).json()[0]["phone"] == phone
+
+
 @pytest.mark.asyncio
 async def test_update_contact_by_id_fail(client, get_token):
     # Setup
@@ -177,3 +204,269 @@ async def test_update_contact_by_id_fail(client, get_token):
     # Assertions
     assert response.status_code == 404, response.text
     assert "detail" in data
+
+
+@pytest.mark.asyncio
+async def test_get_contacts_with_cursor(client, get_token):
+    # Setup
+    token = get_token
+    headers = {"Authorization": f"Bearer {token}"}
+    new_contact = contact_model.copy()
+    new_contact["email"] = "cursor@example.com"
+    client.post("api/contacts/", headers=headers, json=new_contact)
+
+    # Call method
+    first_page = client.get("api/contacts/?limit=1", headers=headers)
+    next_cursor = first_page.headers["X-Next-Cursor"]
+    second_page = client.get(
+        f"api/contacts/?limit=1&cursor={next_cursor}", headers=headers
+    )
+
+    # Assertions
+    assert first_page.status_code == 200, first_page.text
+    assert second_page.status_code == 200, second_page.text
+    assert len(second_page.json()) == 1
+    assert second_page.json()[0]["id"] > first_page.json()[0]["id"]
+
+
+@pytest.mark.asyncio
+async def test_get_contacts_with_invalid_cursor(client, get_token):
+    # Setup
+    token = get_token
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Call method
+    response = client.get("api/contacts/?cursor=broken", headers=headers)
+
+    # Assertions
+    assert response.status_code == 400, response.text
+
+
+@pytest.mark.asyncio
+async def test_search_contacts_ranked_by_relevance(client, get_token):
+    # Setup
+    token = get_token
+    headers = {"Authorization": f"Bearer {token}"}
+    new_contact = contact_model.copy()
+    new_contact["first_name"] = "Denis"
+    new_contact["email"] = "denis@example.com"
+    client.post("api/contacts/", headers=headers, json=new_contact)
+
+    # Call method
+    response = client.get("api/contacts/?search=Denn", headers=headers)
+    data = response.json()
+
+    # Assertions
+    names = [contact["first_name"] for contact in data]
+    assert response.status_code == 200, response.text
+    assert names[0] == "Den"
+    assert names[-1] == "Denis"
+
+
+@pytest.mark.asyncio
+async def test_search_contacts_with_cursor_fail(client, get_token):
+    # Setup
+    token = get_token
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Call method
+    response = client.get(
+        "api/contacts/?search=Den&cursor=eyJpZCI6MX0", headers=headers
+    )
+
+    # Assertions
+    assert response.status_code == 400, response.text
+
+
+@pytest.mark.asyncio
+async def test_search_contacts_page_has_no_cursor(client, get_token):
+    # Setup
+    token = get_token
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Call method
+    response = client.get("api/contacts/?search=Den&limit=1", headers=headers)
+
+    # Assertions
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == 1
+    assert "X-Next-Cursor" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_get_contacts_with_birthdays_within(client, get_token):
+    # Setup
+    token = get_token
+    headers = {"Authorization": f"Bearer {token}"}
+    birthday = date.today() + timedelta(days=3)
+    new_contact = contact_model.copy()
+    new_contact["email"] = "birthday@example.com"
+    new_contact["birthday"] = birthday.replace(year=1992).isoformat()
+    client.post("api/contacts/", headers=headers, json=new_contact)
+
+    # Call method
+    response = client.get("api/contacts/?birthdays_within=7", headers=headers)
+    data = response.json()
+
+    # Assertions
+    assert response.status_code == 200, response.text
+    assert "birthday@example.com" in [contact["email"] for contact in data]
+
+
+@pytest.mark.asyncio
+async def test_import_contacts_csv(client, get_token):
+    # Setup
+    token = get_token
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "text/csv"}
+    body = (
+        "first_name,last_name,email,phone,birthday\n"
+        "Ann,Lee,ann.import@example.com,911,1990-02-01\n"
+        "Bob,Ray,BOO@example.com,911,1990-02-01\n"
+        "Cid,Moe,cid.import@example.com,911,1990-02-30\n"
+    )
+
+    # Call method
+    response = client.post("api/contacts/import", headers=headers, content=body)
+    data = response.json()
+
+    # Assertions
+    assert response.status_code == 200, response.text
+    assert data["imported"] == 1
+    assert data["failed"] == 2
+    assert {error["row"] for error in data["errors"]} == {2, 3}
+
+
+@pytest.mark.asyncio
+async def test_import_contacts_ndjson(client, get_token):
+    # Setup
+    token = get_token
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/x-ndjson",
+    }
+    body = (
+        '{"first_name": "Eve", "last_name": "Kim", "email": "eve.import@example.com",'
+        ' "phone": "911", "birthday": "1990-02-01"}\n'
+    )
+
+    # Call method
+    response = client.post("api/contacts/import", headers=headers, content=body)
+    data = response.json()
+
+    # Assertions
+    assert response.status_code == 200, response.text
+    assert data == {"imported": 1, "failed": 0, "errors": []}
+
+
+@pytest.mark.asyncio
+async def test_import_contacts_line_too_long(client, get_token, monkeypatch):
+    # Setup
+    monkeypatch.setattr(
+        "src.services.contacts_io.settings.CONTACTS_IMPORT_MAX_LINE_LENGTH", 64
+    )
+    token = get_token
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "text/csv"}
+    body = "first_name,last_name,email,phone,birthday\n" + "x" * 100 + "\n"
+
+    # Call method
+    response = client.post("api/contacts/import", headers=headers, content=body)
+
+    # Assertions
+    assert response.status_code == 400, response.text
+    assert response.json()["detail"] == "Line 2 is longer than 64 characters."
+
+
+@pytest.mark.asyncio
+async def test_export_contacts_ndjson(client, get_token):
+    # Setup
+    token = get_token
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Call method
+    response = client.get("api/contacts/export", headers=headers)
+    records = [json.loads(line) for line in response.text.splitlines()]
+
+    # Assertions
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert records[0]["id"] == contact_model["id"]
+    assert records[0]["birthday"] == contact_model["birthday"]
+    assert [record["id"] for record in records] == sorted(
+        record["id"] for record in records
+    )
+
+
+@pytest.mark.asyncio
+async def test_export_contacts_resume(client, get_token):
+    # Setup
+    token = get_token
+    headers = {"Authorization": f"Bearer {token}"}
+
+    first_rows = list(
+        csv.DictReader(
+            io.StringIO(
+                client.get("api/contacts/export?format=csv", headers=headers).text
+            )
+        )
+    )
+
+    # Call method
+    response = client.get(
+        f"api/contacts/export?format=csv&cursor={first_rows[0]['cursor']}",
+        headers=headers,
+    )
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+
+    # Assertions
+    assert response.status_code == 200, response.text
+    assert rows
+    assert [row["id"] for row in rows] == [row["id"] for row in first_rows[1:]]
+
+
+@pytest.mark.asyncio
+async def test_export_contacts_with_invalid_cursor(client, get_token):
+    # Setup
+    token = get_token
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Call method
+    response = client.get("api/contacts/export?cursor=broken", headers=headers)
+
+    # Assertions
+    assert response.status_code == 400, response.text
+
+
+@pytest.mark.asyncio
+async def test_export_contacts_vcard(client, get_token):
+    # Setup
+    token = get_token
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Call method
+    response = client.get("api/contacts/export?format=vcf", headers=headers)
+
+    # Assertions
+    assert response.status_code == 200, response.text
+    assert response.text.startswith("BEGIN:VCARD\r\nVERSION:3.0\r\n")
+    assert "N:Boo;Den;;;\r\n" in response.text
+    assert "BDAY:1981-04-15\r\n" in response.text
+
+
+@pytest.mark.asyncio
+async def test_update_contact_by_id_conflict(client, get_token):
+    # Setup
+    token = get_token
+    headers = {"Authorization": f"Bearer {token}"}
+    new_contact = contact_model.copy()
+    new_contact["email"] = "taken@example.com"
+    client.post("api/contacts/", headers=headers, json=new_contact)
+
+    # Call method
+    response = client.patch(
+        f'api/contacts/{contact_model["id"]}',
+        headers=headers,
+        json={"email": "TAKEN@example.com"},
+    )
+
+    # Assertions
+    assert response.status_code == 409, response.text
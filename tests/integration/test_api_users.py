@@ -40,3 +40,33 @@ def test_update_avatar_user(mock_upload_file, client, get_token):
 
     # Перевірка виклику функції upload_file з об'єктом UploadFile
     mock_upload_file.assert_called_once()
+
+
+@patch("src.services.upload.UploadService.upload_file")
+def test_get_me_after_avatar_update(mock_upload_file, client, get_token):
+    # Setup
+    headers = {"Authorization": f"Bearer {get_token}"}
+    file_data = {"file": ("avatar.jpg", b"fake image content", "image/jpeg")}
+    mock_upload_file.return_value = "http://example.com/new-avatar.jpg"
+    client.get("api/users/me", headers=headers)
+
+    # Call method
+    client.patch("/api/users/avatar", headers=headers, files=file_data)
+    response = client.get("api/users/me", headers=headers)
+
+    # Assertions
+    assert response.status_code == 200, response.text
+    assert response.json()["avatar"] == "http://example.com/new-avatar.jpg"
+
+
+def test_get_me_rate_limit_per_user(client, get_token):
+    # Setup
+    headers = {"Authorization": f"Bearer {get_token}"}
+    for _ in range(10):
+        assert client.get("api/users/me", headers=headers).status_code == 200
+
+    # Call method
+    response = client.get("api/users/me", headers=headers)
+
+    # Assertions
+    assert response.status_code == 429, response.text
@@ -8,6 +8,26 @@ def test_healthchecker_success(client):
     assert data["message"] == "Welcome to REST API"
 
 
+def test_metrics(client, get_token):
+    # Call method
+    response = client.get(
+        "api/metrics", headers={"Authorization": f"Bearer {get_token}"}
+    )
+    data = response.json()
+
+    # Assertions
+    assert response.status_code == 200, response.text
+    assert set(data) == {"counters", "gauges", "timings"}
+
+
+def test_metrics_unauthorized(client):
+    # Call method
+    response = client.get("api/metrics")
+
+    # Assertions
+    assert response.status_code == 401, response.text
+
+
 def test_healthchecker_success_fail(client_fail_healthchecker):
     # Call method
     response = client_fail_healthchecker.get("api/healthchecker")
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from src.database.models import Contact, EmailOutbox, JobRun, User
+from src.services.email import BIRTHDAY_DIGEST_EMAIL, render_email
+from src.workers.birthday_digest import queue_digests
+from tests.conftest import TestingSessionLocal, test_user
+
+TODAY = date(2024, 12, 30)
+
+
+def make_contact(user_id: int, first_name: str, birthday: date) -> Contact:
+    return Contact(
+        first_name=first_name,
+        last_name="Doe",
+        email=f"{first_name.lower()}@example.com",
+        phone="+380501234567",
+        birthday=birthday,
+        user_id=user_id,
+    )
+
+
+@pytest.fixture(scope="module", autouse=True)
+def init_birthdays():
+    async def init():
+        async with TestingSessionLocal() as session:
+            session.add(
+                User(
+                    id=2,
+                    username="unconfirmed",
+                    email="unconfirmed@example.com",
+                    password="x",
+                    confirmed=False,
+                )
+            )
+            session.add_all(
+                [
+                    make_contact(test_user["id"], "Jan", date(1990, 1, 2)),
+                    make_contact(test_user["id"], "Dec", date(1985, 12, 31)),
+                    make_contact(test_user["id"], "Jun", date(1985, 6, 1)),
+                    make_contact(2, "Ann", date(2000, 12, 31)),
+                ]
+            )
+            await session.commit()
+
+    asyncio.run(init())
+
+
+async def get_digests() -> list[EmailOutbox]:
+    async with TestingSessionLocal() as session:
+        result = await session.execute(
+            select(EmailOutbox).filter(EmailOutbox.kind == BIRTHDAY_DIGEST_EMAIL)
+        )
+        return list(result.scalars())
+
+
+@pytest.mark.asyncio
+async def test_queue_digests_once_a_day():
+    # Call method
+    queued = await queue_digests(TestingSessionLocal, TODAY, 7)
+    queued_again = await queue_digests(TestingSessionLocal, TODAY, 7)
+
+    # Assertions
+    assert queued == 1
+    assert queued_again is None
+    digests = await get_digests()
+    assert len(digests) == 1
+    assert digests[0].recipient == test_user["email"]
+    assert [birthday["name"] for birthday in digests[0].payload["birthdays"]] == [
+        "Dec Doe",
+        "Jan Doe",
+    ]
+    async with TestingSessionLocal() as session:
+        run = (await session.execute(select(JobRun))).scalar_one()
+    assert (run.name, run.run_date, run.items) == ("birthday_digest", TODAY, 1)
+    assert run.finished_at is not None
+
+
+@pytest.mark.asyncio
+async def test_render_birthday_digest():
+    # Setup
+    digest = (await get_digests())[0]
+
+    # Call method
+    message = render_email(digest.kind, digest.recipient, digest.payload)
+
+    # Assertions
+    html = message.get_content()
+    assert message["Subject"] == "Upcoming birthdays"
+    assert "Dec Doe</b>, 2024-12-31" in html
+    assert "(tomorrow)" in html
+    assert "(in 3 days)" in html
@@ -0,0 +1,50 @@
+from datetime import date
+
+import pytest
+
+from src.database.models import User
+from src.repository.contacts import ContactsRepository
+from src.schemas.contacts import ContactCreateModel, ContactUpdateModel
+from src.services.cache import (
+    MemoryCache,
+    TieredCache,
+    create_contact_cache,
+)
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_workers_read_each_other_writes():
+    # Setup
+    worker1 = create_contact_cache(TieredCache(MemoryCache(max_size=10), l1_ttl=30))
+    worker2 = create_contact_cache(TieredCache(MemoryCache(max_size=10), l1_ttl=30))
+    user = User(id=1)
+    async with TestingSessionLocal() as session:
+        contact = await ContactsRepository(session, user, worker1).create(
+            ContactCreateModel(
+                first_name="Wade",
+                last_name="Wilson",
+                email="workers@example.com",
+                phone="911",
+                birthday=date(1990, 5, 17),
+            )
+        )
+    async with TestingSessionLocal() as session:
+        repository = ContactsRepository(session, user, worker1)
+        assert (await repository.get_contact_by_id(contact.id)).phone == "911"
+        assert "911" in [record.phone for record in await repository.get_all()]
+
+    # Call method
+    async with TestingSessionLocal() as session:
+        await ContactsRepository(session, user, worker2).update(
+            contact.id, ContactUpdateModel(phone="112")
+        )
+
+    # Assertions
+    assert not worker1.enabled
+    async with TestingSessionLocal() as session:
+        repository = ContactsRepository(session, user, worker1)
+        assert (await repository.get_contact_by_id(contact.id)).phone == "112"
+        records = await repository.get_all()
+        assert [r.phone for r in records if r.id == contact.id] == ["112"]
+        await repository.delete(contact.id)
@@ -0,0 +1,306 @@
+import asyncio
+import socket
+import time
+from datetime import timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+from aiosmtpd.controller import Controller
+from sqlalchemy import select
+
+from src.database.models import EmailOutbox, EmailStatus
+from src.repository.email_outbox import EmailOutboxRepository
+from src.services.email import VERIFICATION_EMAIL, SMTPPool, SMTPSender
+from src.utils import utcnow
+from src.workers.email_outbox import EmailOutboxWorker
+from tests.conftest import TestingSessionLocal
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+        self.rejected = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.rejected:
+            return "550 Mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append((envelope.rcpt_tos, envelope.content))
+        return "250 Message accepted for delivery"
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=get_free_port())
+    controller.start()
+    yield controller
+    controller.stop()
+
+
+@pytest.fixture(autouse=True)
+def mail_from(monkeypatch):
+    # An empty sender address is rejected by aiosmtplib
+    monkeypatch.setattr("src.services.email.settings.MAIL_FROM", "noreply@example.com")
+    monkeypatch.setattr("src.services.email.settings.MAIL_FROM_NAME", "Contacts App")
+
+
+@pytest.fixture(autouse=True)
+async def clear_outbox():
+    async with TestingSessionLocal() as session:
+        for email in (await session.execute(select(EmailOutbox))).scalars():
+            await session.delete(email)
+        await session.commit()
+
+
+async def add_emails(*recipients: str) -> None:
+    async with TestingSessionLocal() as session:
+        repository = EmailOutboxRepository(session)
+        for recipient in recipients:
+            repository.add(
+                VERIFICATION_EMAIL,
+                recipient,
+                {"username": "doon", "host": "https://example.com/"},
+                utcnow(),
+            )
+        await repository.commit()
+
+
+async def get_emails() -> dict[str, EmailOutbox]:
+    async with TestingSessionLocal() as session:
+        result = await session.execute(select(EmailOutbox))
+        return {email.recipient: email for email in result.scalars()}
+
+
+def make_pool(port: int, size: int = 1, **kwargs) -> SMTPPool:
+    return SMTPPool(
+        lambda: SMTPSender("127.0.0.1", port, timeout=5),
+        size=size,
+        **{"idle_timeout": 60, "check_after": 10, **kwargs},
+    )
+
+
+def make_worker(port: int, pool: SMTPPool | None = None, **kwargs):
+    return EmailOutboxWorker(
+        TestingSessionLocal,
+        pool or make_pool(port),
+        **{"batch_size": 10, "max_attempts": 3, "retry_base": 60, **kwargs},
+    )
+
+
+@pytest.mark.asyncio
+async def test_worker_sends_batch_over_one_connection(smtp_server):
+    # Setup
+    recipients = [f"user{number}@example.com" for number in range(3)]
+    await add_emails(*recipients)
+
+    # Call method
+    claimed = await make_worker(smtp_server.port).drain_once()
+
+    # Assertions
+    assert claimed == 3
+    assert len(smtp_server.handler.messages) == 3
+    assert len(smtp_server.handler.sessions) == 1
+    emails = await get_emails()
+    assert all(email.status == EmailStatus.SENT for email in emails.values())
+    assert all(email.sent_at is not None for email in emails.values())
+    assert await make_worker(smtp_server.port).drain_once() == 0
+
+
+@pytest.mark.asyncio
+async def test_worker_retries_rejected_email(smtp_server):
+    # Setup
+    smtp_server.handler.rejected.add("rejected@example.com")
+    await add_emails("rejected@example.com", "user@example.com")
+
+    # Call method
+    await make_worker(smtp_server.port).drain_once()
+
+    # Assertions
+    emails = await get_emails()
+    assert emails["user@example.com"].status == EmailStatus.SENT
+    rejected = emails["rejected@example.com"]
+    assert rejected.status == EmailStatus.PENDING
+    assert rejected.attempts == 1
+    assert "550" in rejected.last_error
+    assert rejected.next_attempt_at > utcnow() + timedelta(seconds=25)
+    assert await make_worker(smtp_server.port).drain_once() == 0
+
+
+@pytest.mark.asyncio
+async def test_worker_gives_up_after_max_attempts():
+    # Setup
+    await add_emails("user@example.com")
+    worker = make_worker(get_free_port(), retry_base=0)
+
+    # Call method
+    for _ in range(3):
+        assert await worker.drain_once() == 1
+
+    # Assertions
+    email = (await get_emails())["user@example.com"]
+    assert email.status == EmailStatus.FAILED
+    assert email.attempts == 3
+    assert await worker.drain_once() == 0
+
+
+def test_backoff():
+    # Setup
+    worker = make_worker(25, retry_base=30, retry_max=3600)
+
+    # Assertions
+    assert 15 <= worker.backoff(1) <= 30
+    assert 60 <= worker.backoff(3) <= 120
+    assert 1800 <= worker.backoff(20) <= 3600
+
+
+@pytest.mark.asyncio
+async def test_worker_reuses_pooled_connections(smtp_server):
+    # Setup
+    pool = make_pool(smtp_server.port, size=2)
+    worker = make_worker(smtp_server.port, pool)
+    await add_emails(*[f"user{number}@example.com" for number in range(6)])
+    await worker.drain_once()
+    await add_emails(*[f"other{number}@example.com" for number in range(6)])
+
+    # Call method
+    await worker.drain_once()
+
+    # Assertions
+    assert len(smtp_server.handler.messages) == 12
+    assert len(smtp_server.handler.sessions) == 2
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_replaces_broken_connection(smtp_server):
+    # Setup
+    pool = make_pool(smtp_server.port, check_after=0)
+    sender = await pool.acquire()
+    await pool.release(sender)
+    sender.smtp.close()
+
+    # Call method
+    async with pool.connection() as new_sender:
+        alive = await new_sender.is_alive()
+
+    # Assertions
+    assert new_sender is not sender
+    assert alive is True
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_closes_idle_connections(smtp_server):
+    # Setup
+    pool = make_pool(smtp_server.port, idle_timeout=0)
+    async with pool.connection() as sender:
+        pass
+
+    # Call method
+    await pool.prune()
+
+    # Assertions
+    assert not sender.smtp.is_connected
+
+
+@pytest.mark.asyncio
+async def test_worker_throttles_sending(smtp_server):
+    # Setup
+    await add_emails(*[f"user{number}@example.com" for number in range(4)])
+    worker = make_worker(smtp_server.port, make_pool(smtp_server.port, size=4), rate=20)
+
+    # Call method
+    started = time.monotonic()
+    await worker.drain_once()
+
+    # Assertions
+    assert time.monotonic() - started >= 0.15
+    assert len(smtp_server.handler.messages) == 4
+    await worker.pool.close()
+
+
+@pytest.mark.asyncio
+async def test_worker_keeps_polling_after_error(smtp_server):
+    # Setup
+    await add_emails("user@example.com")
+    stop = asyncio.Event()
+    sessions = []
+
+    def session_factory():
+        sessions.append(1)
+        if len(sessions) == 1:
+            raise OSError("Connection refused")
+        if len(sessions) == 3:
+            stop.set()
+        return TestingSessionLocal()
+
+    worker = EmailOutboxWorker(
+        session_factory, make_pool(smtp_server.port), poll_interval=0.01
+    )
+
+    # Call method
+    await worker.run(stop)
+
+    # Assertions
+    assert len(sessions) == 3
+    assert len(smtp_server.handler.messages) == 1
+    await worker.pool.close()
+
+
+@pytest.mark.asyncio
+async def test_worker_does_not_resend_email_with_lost_result(smtp_server):
+    # Setup
+    await add_emails("lost@example.com", "user@example.com")
+    sessions = []
+
+    def session_factory():
+        session = TestingSessionLocal()
+        sessions.append(session)
+        if len(sessions) == 2:
+            # The result of the first sent email fails to commit
+            session.commit = AsyncMock(side_effect=OSError("Connection reset"))
+        return session
+
+    worker = make_worker(smtp_server.port)
+    worker.session_factory = session_factory
+
+    # Call method
+    claimed = await worker.drain_once()
+
+    # Assertions
+    assert claimed == 2
+    assert len(smtp_server.handler.messages) == 2
+    emails = await get_emails()
+    statuses = sorted(email.status for email in emails.values())
+    assert statuses == [EmailStatus.PENDING, EmailStatus.SENT]
+    assert await make_worker(smtp_server.port).drain_once() == 0
+    assert len(smtp_server.handler.messages) == 2
+
+
+@pytest.mark.asyncio
+async def test_worker_claims_email_again_after_lease(smtp_server):
+    # Setup
+    await add_emails("user@example.com")
+    async with TestingSessionLocal() as session:
+        repository = EmailOutboxRepository(session)
+        await repository.claim_batch(utcnow(), 10, utcnow() - timedelta(seconds=1))
+        await repository.commit()
+
+    # Call method
+    claimed = await make_worker(smtp_server.port).drain_once()
+
+    # Assertions
+    assert claimed == 1
+    assert (await get_emails())["user@example.com"].status == EmailStatus.SENT
@@ -0,0 +1,38 @@
+from src.commands import calibrate_password_hash
+from src.commands.calibrate_password_hash import calibrate, percentile
+
+
+def test_percentile():
+    # Setup
+    samples = [float(value) for value in range(1, 101)]
+
+    # Assertions
+    assert percentile(samples, 99) == 99.0
+    assert percentile(samples, 50) == 50.0
+    assert percentile([0.3], 99) == 0.3
+
+
+def test_calibrate_picks_strongest_cost_within_target(monkeypatch):
+    # Setup
+    def fake_measure(memory_cost, time_cost, parallelism, samples, concurrency):
+        return [memory_cost * time_cost / 100_000] * samples
+
+    monkeypatch.setattr(calibrate_password_hash, "measure", fake_measure)
+
+    # Call method
+    results, best = calibrate(target=0.6, parallelism=1, samples=3, concurrency=2)
+
+    # Assertions
+    assert best == (19456, 3)
+    assert (19456, 3, 19456 * 3 / 100_000) in results
+
+
+def test_calibrate_nothing_fits(monkeypatch):
+    # Setup
+    monkeypatch.setattr(calibrate_password_hash, "measure", lambda *args: [1.0])
+
+    # Call method
+    _, best = calibrate(target=0.1, parallelism=1, samples=1, concurrency=1)
+
+    # Assertions
+    assert best is None
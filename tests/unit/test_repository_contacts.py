@@ -1,10 +1,14 @@
+from datetime import date
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import Contact, User
 from src.repository.contacts import ContactsRepository
-from src.schemas.contacts import ContactCreateModel, ContactUpdateModel
+from src.schemas.contacts import ContactCreateModel, ContactRecord, ContactUpdateModel
+from src.services.cache import ContactCache, MemoryCache, TieredCache
 
 
 @pytest.fixture
@@ -20,23 +24,15 @@ def user():
 
 @pytest.fixture
 def contacts_repository(mock_session, user):
-    return ContactsRepository(mock_session, user)
+    cache = ContactCache(TieredCache(MemoryCache(max_size=100)), ttl=60)
+    return ContactsRepository(mock_session, user, cache)
 
 
 @pytest.mark.asyncio
 async def test_get_all(contacts_repository, mock_session, user):
     # Setup mock
-    mock_result = MagicMock()
-    mock_result.scalars.return_value.all.return_value = [
-        Contact(
-            id=1,
-            first_name="Den",
-            last_name="Boo",
-            email="boo@example.com",
-            phone="911",
-            birthday="1981-04-15",
-            user=user,
-        )
+    mock_result = [
+        (1, "Den", "Boo", "boo@example.com", "911", date(1981, 4, 15)),
     ]
     mock_session.execute = AsyncMock(return_value=mock_result)
 
@@ -45,11 +41,12 @@ async def test_get_all(contacts_repository, mock_session, user):
 
     # Assertions
     assert len(contacts) == 1
+    assert isinstance(contacts[0], ContactRecord)
     assert contacts[0].first_name == "Den"
     assert contacts[0].last_name == "Boo"
     assert contacts[0].email == "boo@example.com"
     assert contacts[0].phone == "911"
-    assert contacts[0].birthday == "1981-04-15"
+    assert contacts[0].birthday == date(1981, 4, 15)
 
 
 @pytest.mark.asyncio
@@ -81,14 +78,13 @@ async def test_get_contact_by_email(contacts_repository, mock_session, user):
 async def test_get_contact_by_id(contacts_repository, mock_session, user):
     # Setup mock
     mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = Contact(
-        id=1,
-        first_name="Den",
-        last_name="Boo",
-        email="boo@example.com",
-        phone="911",
-        birthday="1981-04-15",
-        user=user,
+    mock_result.one_or_none.return_value = (
+        1,
+        "Den",
+        "Boo",
+        "boo@example.com",
+        "911",
+        date(1981, 4, 15),
     )
     mock_session.execute = AsyncMock(return_value=mock_result)
 
@@ -96,7 +92,7 @@ async def test_get_contact_by_id(contacts_repository, mock_session, user):
     contact = await contacts_repository.get_contact_by_id(contact_id=1)
 
     # Assertions
-    assert contact is not None
+    assert isinstance(contact, ContactRecord)
     assert contact.id == 1
     assert contact.first_name == "Den"
 
@@ -118,39 +114,100 @@ async def test_create(contacts_repository, mock_session):
     # Assertions
     assert isinstance(result, Contact)
     assert result.first_name == "Den"
+    assert result.birthday_key == 415
     mock_session.add.assert_called_once()
     mock_session.commit.assert_awaited_once()
-    mock_session.refresh.assert_awaited_once_with(result)
+    mock_session.refresh.assert_not_awaited()
 
 
 @pytest.mark.asyncio
-async def test_update(contacts_repository, mock_session, user):
+async def test_create_conflict(contacts_repository, mock_session):
     # Setup
-    contact_data = ContactUpdateModel(
-        first_name="Updated Den", last_name="Boo", email="boo@example.com", phone="911"
-    )
-    existing_contact = Contact(
-        id=1,
+    contact_data = ContactCreateModel(
         first_name="Den",
         last_name="Boo",
         email="boo@example.com",
         phone="911",
         birthday="1981-04-15",
-        user=user,
     )
+    mock_session.commit = AsyncMock(side_effect=IntegrityError("INSERT", {}, None))
+
+    # Call method
+    with pytest.raises(IntegrityError):
+        await contacts_repository.create(body=contact_data)
+
+    # Assertions
+    mock_session.rollback.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_update(contacts_repository, mock_session, user):
+    # Setup
+    contact_data = ContactUpdateModel(first_name="Updated Den", birthday="1981-12-31")
     mock_result = MagicMock()
-    # Mock calling get_contact_by_id
-    mock_result.scalar_one_or_none.return_value = existing_contact
+    # Mock UPDATE ... RETURNING
+    mock_result.one_or_none.return_value = (
+        1,
+        "Updated Den",
+        "Boo",
+        "boo@example.com",
+        "911",
+        date(1981, 12, 31),
+    )
     mock_session.execute = AsyncMock(return_value=mock_result)
 
     # Call method
     result = await contacts_repository.update(contact_id=1, body=contact_data)
 
     # Assertions
-    assert result is not None
+    stmt = mock_session.execute.await_args.args[0]
+    assert isinstance(result, ContactRecord)
     assert result.first_name == "Updated Den"
+    assert stmt.is_update
+    assert stmt.compile().params["birthday_key"] == 1231
+    mock_session.execute.assert_awaited_once()
     mock_session.commit.assert_awaited_once()
-    mock_session.refresh.assert_awaited_once_with(existing_contact)
+    mock_session.refresh.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_update_not_found(contacts_repository, mock_session):
+    # Setup
+    mock_result = MagicMock()
+    mock_result.one_or_none.return_value = None
+    mock_session.execute = AsyncMock(return_value=mock_result)
+
+    # Call method
+    result = await contacts_repository.update(
+        contact_id=1, body=ContactUpdateModel(phone="112")
+    )
+
+    # Assertions
+    assert result is None
+    mock_session.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_update_without_values(contacts_repository, mock_session):
+    # Setup
+    mock_result = MagicMock()
+    mock_result.one_or_none.return_value = (
+        1,
+        "Den",
+        "Boo",
+        "boo@example.com",
+        "911",
+        date(1981, 4, 15),
+    )
+    mock_session.execute = AsyncMock(return_value=mock_result)
+
+    # Call method
+    result = await contacts_repository.update(contact_id=1, body=ContactUpdateModel())
+
+    # Assertions
+    assert isinstance(result, ContactRecord)
+    assert result.first_name == "Den"
+    mock_session.commit.assert_not_awaited()
 
 
 @pytest.mark.asyncio
@@ -166,7 +223,7 @@ async def test_delete(contacts_repository, mock_session, user):
         user=user,
     )
     mock_result = MagicMock()
-    # Mock calling get_contact_by_id
+    # Mock DELETE ... RETURNING
     mock_result.scalar_one_or_none.return_value = existing_tag
     mock_session.execute = AsyncMock(return_value=mock_result)
 
@@ -176,5 +233,74 @@ async def test_delete(contacts_repository, mock_session, user):
     # Assertions
     assert result is not None
     assert result.first_name == "Den To Delete"
-    mock_session.delete.assert_awaited_once_with(existing_tag)
+    assert mock_session.execute.await_args.args[0].is_delete
+    mock_session.execute.assert_awaited_once()
+    mock_session.delete.assert_not_awaited()
+    mock_session.commit.assert_awaited_once()
+
+
+def compile_filter(clause):
+    return str(clause.compile(compile_kwargs={"literal_binds": True}))
+
+
+def test_birthdays_filter_within_year():
+    # Call method
+    clause = ContactsRepository._birthdays_filter(date(2025, 4, 10), 7)
+
+    # Assertions
+    assert compile_filter(clause) == "contacts.birthday_key BETWEEN 410 AND 417"
+
+
+def test_birthdays_filter_crosses_new_year():
+    # Call method
+    clause = ContactsRepository._birthdays_filter(date(2025, 12, 28), 7)
+
+    # Assertions
+    assert (
+        compile_filter(clause)
+        == "contacts.birthday_key >= 1228 OR contacts.birthday_key <= 104"
+    )
+
+
+def test_birthdays_filter_leap_day_in_non_leap_year():
+    # Call method
+    clause = ContactsRepository._birthdays_filter(date(2025, 2, 21), 7)
+
+    # Assertions
+    assert compile_filter(clause) == "contacts.birthday_key BETWEEN 221 AND 229"
+
+
+def test_birthdays_filter_whole_year():
+    # Call method
+    clause = ContactsRepository._birthdays_filter(date(2025, 2, 21), 365)
+
+    # Assertions
+    assert clause is None
+
+
+@pytest.mark.asyncio
+async def test_bulk_create(contacts_repository, mock_session):
+    # Setup
+    bodies = [
+        ContactCreateModel(
+            first_name="Den",
+            last_name="Boo",
+            email=email,
+            phone="911",
+            birthday="1981-04-15",
+        )
+        for email in ("boo@example.com", "new@example.com")
+    ]
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = ["boo@example.com"]
+    mock_session.execute = AsyncMock(return_value=mock_result)
+
+    # Call method
+    duplicates = await contacts_repository.bulk_create(bodies)
+
+    # Assertions
+    assert duplicates == {"boo@example.com"}
+    rows = mock_session.execute.await_args_list[1].args[1]
+    assert [row["email"] for row in rows] == ["new@example.com"]
+    assert rows[0]["birthday_key"] == 415
     mock_session.commit.assert_awaited_once()
@@ -108,7 +108,7 @@ async def test_create(repository, mock_session):
     assert result.avatar == "avatar.url"
     mock_session.add.assert_called_once()
     mock_session.commit.assert_awaited_once()
-    mock_session.refresh.assert_awaited_once_with(result)
+    mock_session.refresh.assert_not_awaited()
 
 
 @pytest.mark.asyncio
@@ -116,11 +116,23 @@ async def test_update(repository, mock_session):
     # Setup
     user_data = UserUpdate(password="111222")
     existing_user = User(
+        id=1,
         username="denboo",
         password="111",
         email="boo@example.com",
         role=UserRole.USER,
     )
+    updated_user = User(
+        id=1,
+        username="denboo",
+        password="111222",
+        email="boo@example.com",
+        role=UserRole.USER,
+    )
+    mock_result = MagicMock()
+    # Mock UPDATE ... RETURNING
+    mock_result.scalar_one_or_none.return_value = updated_user
+    mock_session.execute = AsyncMock(return_value=mock_result)
 
     # Call method
     result = await repository.update_user(user=existing_user, body=user_data)
@@ -129,8 +141,46 @@ async def test_update(repository, mock_session):
     assert result is not None
     assert result.username == "denboo"
     assert result.password == "111222"
+    mock_session.execute.assert_awaited_once()
+    mock_session.commit.assert_awaited_once()
+    mock_session.refresh.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_update_revoke_tokens(repository, mock_session):
+    # Setup
+    existing_user = User(id=1, username="denboo", token_version=0)
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = User(
+        id=1, username="denboo", token_version=1
+    )
+    mock_session.execute = AsyncMock(return_value=mock_result)
+
+    # Call method
+    result = await repository.update_user(
+        user=existing_user, body=UserUpdate(), revoke_tokens=True
+    )
+
+    # Assertions
+    assert result.token_version == 1
+    statement = mock_session.execute.await_args.args[0]
+    assert "token_version=(users.token_version +" in str(statement)
     mock_session.commit.assert_awaited_once()
-    mock_session.refresh.assert_awaited_once_with(existing_user)
+
+
+@pytest.mark.asyncio
+async def test_get_token_version(repository, mock_session):
+    # Setup
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = 3
+    mock_session.execute = AsyncMock(return_value=mock_result)
+
+    # Call method
+    result = await repository.get_token_version(user_id=1)
+
+    # Assertions
+    assert result == 3
+    mock_session.execute.assert_awaited_once()
 
 
 @pytest.mark.asyncio
@@ -138,11 +188,11 @@ async def test_update_avatar(repository, mock_session):
     # Setup
     email = "boo@example.com"
     avatar = "avatar.url"
-    existing_user = User(username="denboo", email=email, avatar=None)
+    updated_user = User(username="denboo", email=email, avatar=avatar)
 
     mock_result = MagicMock()
-    # Mock calling get_user_by_email
-    mock_result.scalar_one_or_none.return_value = existing_user
+    # Mock UPDATE ... RETURNING
+    mock_result.scalar_one_or_none.return_value = updated_user
     mock_session.execute = AsyncMock(return_value=mock_result)
 
     # Call method
@@ -152,5 +202,23 @@ async def test_update_avatar(repository, mock_session):
     assert result is not None
     assert result.username == "denboo"
     assert result.avatar == avatar
+    mock_session.execute.assert_awaited_once()
+    mock_session.commit.assert_awaited_once()
+    mock_session.refresh.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_verify_email(repository, mock_session):
+    # Setup
+    mock_result = MagicMock()
+    # Mock UPDATE ... RETURNING users.id, users.username
+    mock_result.one_or_none.return_value = None
+    mock_session.execute = AsyncMock(return_value=mock_result)
+
+    # Call method
+    result = await repository.verify_email(email="boo@example.com")
+
+    # Assertions
+    assert result is False
+    mock_session.execute.assert_awaited_once()
     mock_session.commit.assert_awaited_once()
-    mock_session.refresh.assert_awaited_once_with(existing_user)
@@ -0,0 +1,87 @@
+import json
+from datetime import date
+
+from src.database.models import Contact, User
+from src.schemas.contacts import ContactRecord
+from src.schemas.serializers import contact_response, contacts_response, user_response
+
+
+def make_contact(contact_id: int) -> Contact:
+    return Contact(
+        id=contact_id,
+        first_name="Den",
+        last_name="Boo",
+        email="boo@example.com",
+        phone="911",
+        birthday=date(1981, 4, 15),
+        user_id=1,
+    )
+
+
+def make_record(contact_id: int) -> ContactRecord:
+    return ContactRecord(
+        id=contact_id,
+        first_name="Den",
+        last_name="Boo",
+        email="boo@example.com",
+        phone="911",
+        birthday=date(1981, 4, 15),
+    )
+
+
+def test_contacts_response():
+    # Call method
+    response = contacts_response(
+        [make_record(1), make_record(2)], headers={"X-Next-Cursor": "cursor"}
+    )
+    data = json.loads(response.body)
+
+    # Assertions
+    assert response.status_code == 200
+    assert response.media_type == "application/json"
+    assert response.headers["X-Next-Cursor"] == "cursor"
+    assert data[1] == {
+        "id": 2,
+        "first_name": "Den",
+        "last_name": "Boo",
+        "email": "boo@example.com",
+        "phone": "911",
+        "birthday": "1981-04-15",
+    }
+
+
+def test_contact_response_status_code():
+    # Call method
+    response = contact_response(make_contact(1), status_code=201)
+
+    # Assertions
+    assert response.status_code == 201
+    assert json.loads(response.body)["id"] == 1
+
+
+def test_contact_response_record():
+    # Call method
+    response = contact_response(make_record(1))
+
+    # Assertions
+    assert json.loads(response.body) == json.loads(
+        contact_response(make_contact(1)).body
+    )
+
+
+def test_user_response_excludes_password():
+    # Setup
+    user = User(
+        id=1, username="denboo", email="boo@example.com", password="hash", avatar=None
+    )
+
+    # Call method
+    data = json.loads(user_response(user).body)
+
+    # Assertions
+    assert data == {
+        "id": 1,
+        "username": "denboo",
+        "email": "boo@example.com",
+        "avatar": None,
+    }
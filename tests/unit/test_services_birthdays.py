@@ -0,0 +1,94 @@
+import asyncio
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+
+from src.services.birthdays import build_digests, next_birthday
+from src.workers.birthday_digest import run_scheduler, seconds_until
+
+
+def make_row(user_id: int, first_name: str, birthday: date) -> SimpleNamespace:
+    return SimpleNamespace(
+        user_id=user_id,
+        username=f"user{user_id}",
+        email=f"user{user_id}@example.com",
+        first_name=first_name,
+        last_name="Doe",
+        birthday=birthday,
+    )
+
+
+def test_next_birthday():
+    # Assertions
+    assert next_birthday(date(1990, 12, 31), date(2024, 12, 30)) == date(2024, 12, 31)
+    assert next_birthday(date(1990, 1, 2), date(2024, 12, 30)) == date(2025, 1, 2)
+    assert next_birthday(date(1990, 12, 30), date(2024, 12, 30)) == date(2024, 12, 30)
+
+
+def test_next_birthday_leap_day():
+    # Assertions
+    assert next_birthday(date(2000, 2, 29), date(2023, 2, 25)) == date(2023, 2, 28)
+    assert next_birthday(date(2000, 2, 29), date(2024, 2, 25)) == date(2024, 2, 29)
+
+
+def test_build_digests():
+    # Setup
+    rows = [
+        make_row(1, "Jan", date(1990, 1, 2)),
+        make_row(1, "Dec", date(1985, 12, 31)),
+        make_row(2, "Ann", date(2000, 12, 30)),
+    ]
+
+    # Call method
+    digests = build_digests(rows, date(2024, 12, 30))
+
+    # Assertions
+    assert digests == [
+        (
+            "user1@example.com",
+            {
+                "username": "user1",
+                "birthdays": [
+                    {"name": "Dec Doe", "date": "2024-12-31", "days": 1},
+                    {"name": "Jan Doe", "date": "2025-01-02", "days": 3},
+                ],
+            },
+        ),
+        (
+            "user2@example.com",
+            {
+                "username": "user2",
+                "birthdays": [{"name": "Ann Doe", "date": "2024-12-30", "days": 0}],
+            },
+        ),
+    ]
+
+
+def test_seconds_until():
+    # Assertions
+    assert seconds_until(8, datetime(2024, 12, 30, 7, 30)) == 1800
+    assert seconds_until(8, datetime(2024, 12, 30, 8, 0)) == 24 * 3600
+    assert seconds_until(8, datetime(2024, 12, 31, 23, 0)) == 9 * 3600
+
+
+@pytest.mark.asyncio
+async def test_scheduler_retries_failed_batch(monkeypatch):
+    # Setup
+    stop = asyncio.Event()
+    calls = []
+
+    async def queue_digests(session_factory, today):
+        calls.append(today)
+        if len(calls) == 1:
+            raise OSError("Connection refused")
+        stop.set()
+
+    monkeypatch.setattr("src.workers.birthday_digest.queue_digests", queue_digests)
+
+    # Call method
+    await run_scheduler(None, stop, hour=0, retry_base=0.01, retry_max=0.01)
+
+    # Assertions
+    assert len(calls) == 2
+    assert calls[0] == calls[1]
@@ -0,0 +1,434 @@
+import asyncio
+from datetime import date
+
+import pytest
+from fakeredis import FakeAsyncRedis, FakeServer
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import User, UserRole
+from src.repository.contacts import ContactsRepository
+from src.repository.users import UserRepository
+from src.schemas.contacts import ContactRecord, ContactUpdateModel
+from src.schemas.users import UserRecord, UserUpdate
+from src.services.cache import (
+    ContactCache,
+    MemoryCache,
+    RedisCache,
+    TieredCache,
+    UserCache,
+    create_contact_cache,
+)
+from src.services.metrics import metrics
+
+
+@pytest.fixture
+def user():
+    return User(
+        id=1,
+        username="DenBoo",
+        email="boo@example.com",
+        password="hash",
+        avatar=None,
+        confirmed=True,
+        role=UserRole.USER,
+        token_version=0,
+    )
+
+
+@pytest.fixture
+def redis_cache():
+    cache = RedisCache("redis://localhost", prefix="test:", ttl=60)
+    cache.redis = FakeAsyncRedis()
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_evicts_least_recently_used():
+    # Setup
+    cache = MemoryCache(max_size=2)
+    await cache.set("a", b"1")
+    await cache.set("b", b"2")
+    await cache.get("a")
+
+    # Call method
+    await cache.set("c", b"3")
+
+    # Assertions
+    assert await cache.get("a") == b"1"
+    assert await cache.get("b") is None
+    assert await cache.get("c") == b"3"
+    assert len(cache) == 2
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_ttl(monkeypatch):
+    # Setup
+    now = 100.0
+    monkeypatch.setattr("src.services.cache.time.monotonic", lambda: now)
+    cache = MemoryCache(max_size=10, ttl=5)
+    await cache.set("a", b"1")
+
+    # Call method
+    now = 106.0
+
+    # Assertions
+    assert await cache.get("a") is None
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_cache(redis_cache):
+    # Call method
+    await redis_cache.set("a", b"1")
+    await redis_cache.set("b", b"2")
+    await redis_cache.delete("a")
+
+    # Assertions
+    assert await redis_cache.get("a") is None
+    assert await redis_cache.get("b") == b"2"
+    assert 0 < await redis_cache.redis.ttl("test:b") <= 60
+    await redis_cache.clear()
+    assert await redis_cache.get("b") is None
+
+
+def make_tiered_cache(server=None, backend="redis") -> TieredCache:
+    if backend == "memory":
+        return TieredCache(MemoryCache(max_size=10), l1_ttl=30)
+
+    l2 = RedisCache("redis://localhost", prefix="test:", ttl=60)
+    l2.redis = FakeAsyncRedis(server=server)
+    return TieredCache(
+        MemoryCache(max_size=10), l2, l1_ttl=30, channel="invalidate", lock_timeout=1
+    )
+
+
+def make_loader(value: bytes | None, delay: float = 0):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return value
+
+    return load, calls
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_reads_l2_into_l1():
+    # Setup
+    server = FakeServer()
+    worker1, worker2 = make_tiered_cache(server), make_tiered_cache(server)
+    await worker1.set("a", b"1")
+
+    # Call method
+    value = await worker2.get("a")
+
+    # Assertions
+    assert value == b"1"
+    assert await worker2.l1.get("a") == b"1"
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_invalidates_l1_of_other_workers():
+    # Setup
+    server = FakeServer()
+    worker1, worker2 = make_tiered_cache(server), make_tiered_cache(server)
+    await worker2.start()
+    await worker1.set("a", b"1")
+    assert await worker2.get("a") == b"1"
+
+    # Call method
+    await worker1.delete("a")
+    for _ in range(50):
+        if await worker2.l1.get("a") is None:
+            break
+        await asyncio.sleep(0.01)
+
+    # Assertions
+    assert await worker2.l1.get("a") is None
+    assert await worker2.get("a") is None
+    await worker2.stop()
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_delete_survives_redis_errors():
+    # Setup
+    server = FakeServer()
+    cache = make_tiered_cache(server)
+    await cache.set("a", b"1")
+    contacts = ContactCache(cache, 60)
+    server.connected = False
+    metrics.reset()
+
+    # Call method
+    await cache.delete("a")
+    await contacts.bump(1)
+
+    # Assertions
+    assert await cache.l1.get("a") is None
+    assert metrics.snapshot()["counters"]["cache_invalidation_errors_total"] == 4
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+async def test_tiered_cache_coalesces_concurrent_loads(backend):
+    # Setup
+    cache = make_tiered_cache(FakeServer(), backend)
+    load, calls = make_loader(b"value", delay=0.05)
+
+    # Call method
+    values = await asyncio.gather(*(cache.get_or_load("a", load) for _ in range(10)))
+
+    # Assertions
+    assert values == [b"value"] * 10
+    assert len(calls) == 1
+    assert await cache.get("a") == b"value"
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_waits_for_load_of_other_worker():
+    # Setup
+    server = FakeServer()
+    worker1, worker2 = make_tiered_cache(server), make_tiered_cache(server)
+    load1, calls1 = make_loader(b"value", delay=0.1)
+    load2, calls2 = make_loader(b"other")
+
+    # Call method
+    values = await asyncio.gather(
+        worker1.get_or_load("a", load1),
+        worker2.get_or_load("a", load2),
+    )
+
+    # Assertions
+    assert values == [b"value", b"value"]
+    assert len(calls1) == 1
+    assert calls2 == []
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_does_not_cache_none_or_errors():
+    # Setup
+    cache = make_tiered_cache(backend="memory")
+    load, calls = make_loader(None)
+
+    async def fail():
+        raise RuntimeError("db is down")
+
+    # Call method
+    assert await cache.get_or_load("a", load) is None
+    assert await cache.get_or_load("a", load) is None
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load("b", fail)
+
+    # Assertions
+    assert len(calls) == 2
+    assert await cache.get("b") is None
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_skips_value_loaded_before_delete():
+    # Setup
+    cache = make_tiered_cache(backend="memory")
+
+    async def load():
+        await cache.delete("a")
+        return b"stale"
+
+    # Call method
+    value = await cache.get_or_load("a", load)
+
+    # Assertions
+    assert value == b"stale"
+    assert await cache.get("a") is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+async def test_user_cache(user, backend):
+    # Setup
+    metrics.reset()
+    cache = UserCache(make_tiered_cache(FakeServer(), backend), 60, 30)
+    load, calls = make_loader(user)
+
+    # Call method
+    record = await cache.get_by_username("denboo", load)
+
+    # Assertions
+    assert isinstance(record, UserRecord)
+    assert await cache.get_by_username("DENBOO", load) == record
+    assert await cache.get_by_id(1, load) == record
+    assert len(calls) == 1
+    assert record.role == UserRole.USER
+    assert not hasattr(record, "password")
+    assert metrics.snapshot()["counters"]["user_cache_misses_total"] == 1
+    assert metrics.snapshot()["counters"]["user_cache_hits_total"] == 2
+
+    await cache.invalidate(user.id, user.username)
+    assert await cache.get_by_id(1, load) == record
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_user_cache_token_version():
+    # Setup
+    cache = UserCache(make_tiered_cache(backend="memory"), 60, 30)
+    load, calls = make_loader(3)
+
+    # Call method
+    assert await cache.get_token_version(1, load) == 3
+    assert await cache.get_token_version(1, load) == 3
+    await cache.invalidate(1, "denboo")
+    assert await cache.get_token_version(1, load) == 3
+
+    # Assertions
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_user_repository_invalidates_on_update(user):
+    # Setup
+    cache = UserCache(make_tiered_cache(backend="memory"), 60, 30)
+    await cache.get_by_id(user.id, make_loader(user)[0])
+    mock_session = AsyncMock(spec=AsyncSession)
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = user
+    mock_session.execute = AsyncMock(return_value=mock_result)
+    repository = UserRepository(mock_session, cache)
+
+    # Call method
+    await repository.update_user(user, UserUpdate(password="new"))
+
+    # Assertions
+    assert await cache.cache.get(cache.id_key(user.id)) is None
+    assert await cache.cache.get(cache.username_key(user.username)) is None
+
+
+@pytest.mark.asyncio
+async def test_user_repository_invalidates_on_verify_email(user):
+    # Setup
+    cache = UserCache(make_tiered_cache(backend="memory"), 60, 30)
+    await cache.get_by_id(user.id, make_loader(user)[0])
+    mock_session = AsyncMock(spec=AsyncSession)
+    mock_result = MagicMock()
+    mock_result.one_or_none.return_value = MagicMock(id=1, username="DenBoo")
+    mock_session.execute = AsyncMock(return_value=mock_result)
+    repository = UserRepository(mock_session, cache)
+
+    # Call method
+    result = await repository.verify_email("boo@example.com")
+
+    # Assertions
+    assert result is True
+    assert await cache.cache.get(cache.id_key(user.id)) is None
+
+
+@pytest.mark.asyncio
+async def test_user_cache_skips_stale_load_after_invalidate(user):
+    # Setup
+    cache = UserCache(make_tiered_cache(backend="memory"), 60, 30)
+    load, _ = make_loader(user, delay=0.05)
+
+    # Call method
+    task = asyncio.create_task(cache.get_by_username(user.username, load))
+    await asyncio.sleep(0.01)
+    await cache.invalidate(user.id, user.username)
+    await task
+
+    # Assertions
+    assert await cache.cache.get(cache.id_key(user.id)) is None
+    assert await cache.cache.get(cache.username_key(user.username)) is None
+
+
+@pytest.fixture
+def contact():
+    return ContactRecord(1, "Den", "Boo", "boo@example.com", "911", date(1981, 4, 15))
+
+
+@pytest.mark.asyncio
+async def test_contact_cache(contact):
+    # Setup
+    metrics.reset()
+    cache = ContactCache(make_tiered_cache(backend="memory"), 60)
+    load, calls = make_loader([contact])
+
+    # Call method
+    page = await cache.get_page(1, {"limit": 10}, load)
+
+    # Assertions
+    assert page == [contact]
+    assert await cache.get_page(1, {"limit": 10}, load) == [contact]
+    assert len(calls) == 1
+    await cache.get_page(1, {"limit": 20}, load)
+    await cache.get_page(2, {"limit": 10}, load)
+    assert len(calls) == 3
+    assert metrics.snapshot()["counters"]["contact_cache_misses_total"] == 3
+    assert metrics.snapshot()["counters"]["contact_cache_hits_total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_contact_cache_bump_invalidates_other_workers(contact):
+    # Setup
+    server = FakeServer()
+    worker1 = ContactCache(make_tiered_cache(server), 60)
+    worker2 = ContactCache(make_tiered_cache(server), 60)
+    await worker2.cache.start()
+    load, calls = make_loader(contact)
+    await worker1.get_contact(1, 1, load)
+    await worker2.get_contact(1, 1, load)
+    other_user = await worker2.get_generation(2)
+
+    # Call method
+    await worker1.bump(1)
+    await asyncio.sleep(0.1)
+
+    # Assertions
+    assert await worker2.get_contact(1, 1, load) == contact
+    assert len(calls) == 2
+    assert await worker2.get_generation(2) == other_user
+    await worker2.cache.stop()
+
+
+@pytest.mark.asyncio
+async def test_create_contact_cache_needs_shared_backend(contact):
+    # Setup
+    memory = create_contact_cache(make_tiered_cache(backend="memory"))
+    redis = create_contact_cache(make_tiered_cache())
+    load, calls = make_loader(contact)
+    metrics.reset()
+
+    # Call method
+    await memory.get_contact(1, 1, load)
+    await memory.bump(1)
+    await memory.get_contact(1, 1, load)
+
+    # Assertions
+    assert not memory.enabled
+    assert redis.enabled
+    assert len(calls) == 2
+    assert "contact_cache_invalidations_total" not in metrics.snapshot()["counters"]
+
+
+@pytest.mark.asyncio
+async def test_contacts_repository_invalidates_on_update(contact):
+    # Setup
+    cache = ContactCache(make_tiered_cache(backend="memory"), 60)
+    generation = await cache.get_generation(1)
+    mock_session = AsyncMock(spec=AsyncSession)
+    mock_result = MagicMock()
+    mock_result.one_or_none.return_value = (
+        1,
+        "Den",
+        "Boo",
+        "boo@example.com",
+        "911",
+        date(1981, 4, 15),
+    )
+    mock_session.execute = AsyncMock(return_value=mock_result)
+    repository = ContactsRepository(mock_session, User(id=1), cache)
+
+    # Call method
+    await repository.update(1, ContactUpdateModel(phone="112"))
+
+    # Assertions
+    assert await cache.get_generation(1) != generation
@@ -1,5 +1,6 @@
 import pytest
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, Mock
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import User
@@ -8,7 +9,12 @@ from src.services.contacts import ContactsService
 from src.repository.contacts import ContactsRepository
 
 from tests.conftest import test_user
-from src.utils import HTTPNotFoundException, HTTPConflictRequestException
+from src.utils import (
+    HTTPNotFoundException,
+    HTTPConflictRequestException,
+    HTTPBadRequestException,
+    encode_cursor,
+)
 
 
 @pytest.fixture
@@ -62,7 +68,6 @@ async def contact_service(mock_session, mock_user, contacts_repository):
 async def test_create_success(contact_service, contacts_repository):
     # Setup
     contacts_repository.create = AsyncMock()
-    contacts_repository.get_contact_by_email = AsyncMock(return_value=None)
     contact_data = ContactCreateModel(
         first_name="John",
         last_name="Doe",
@@ -81,8 +86,9 @@ async def test_create_success(contact_service, contacts_repository):
 @pytest.mark.asyncio
 async def test_create_fail(contact_service, mock_user, contacts_repository):
     # Setup
-    contacts_repository.create = AsyncMock()
-    contacts_repository.get_contact_by_email = AsyncMock(return_value=mock_user)
+    contacts_repository.create = AsyncMock(
+        side_effect=IntegrityError("INSERT", {}, None)
+    )
     contact_data = ContactCreateModel(
         first_name="John",
         last_name="Doe",
@@ -97,7 +103,7 @@ async def test_create_fail(contact_service, mock_user, contacts_repository):
 
     # Assertions
     assert ex_nfo.value.status_code == 409
-    contacts_repository.create.assert_not_awaited()
+    contacts_repository.create.assert_awaited_once_with(contact_data)
 
 
 @pytest.mark.asyncio
@@ -115,7 +121,50 @@ async def test_get_all(contact_service, contacts_repository):
     await contact_service.get_all(**args)
 
     # Assertions
-    contacts_repository.get_all.assert_awaited_once_with(**args)
+    contacts_repository.get_all.assert_awaited_once_with(**args, after_id=None)
+
+
+@pytest.mark.asyncio
+async def test_get_all_with_cursor(contact_service, contacts_repository):
+    # Setup
+    contacts_repository.get_all = AsyncMock()
+
+    # Call method
+    await contact_service.get_all(limit=10, cursor=encode_cursor({"id": 42}))
+
+    # Assertions
+    contacts_repository.get_all.assert_awaited_once_with(
+        search=None, birthdays_within=None, offset=None, limit=10, after_id=42
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_all_with_invalid_cursor(contact_service, contacts_repository):
+    # Setup
+    contacts_repository.get_all = AsyncMock()
+
+    # Call method
+    with pytest.raises(HTTPBadRequestException) as ex_nfo:
+        await contact_service.get_all(limit=10, cursor="not a cursor")
+
+    # Assertions
+    assert ex_nfo.value.status_code == 400
+    contacts_repository.get_all.assert_not_awaited()
+
+
+def test_get_next_cursor(contact_service):
+    # Setup
+    contacts = [Mock(id=3), Mock(id=7)]
+
+    # Call method
+    full_page_cursor = contact_service.get_next_cursor(contacts, limit=2)
+    last_page_cursor = contact_service.get_next_cursor(contacts, limit=5)
+    search_cursor = contact_service.get_next_cursor(contacts, limit=2, search="Den")
+
+    # Assertions
+    assert full_page_cursor == encode_cursor({"id": 7})
+    assert last_page_cursor is None
+    assert search_cursor is None
 
 
 @pytest.mark.asyncio
@@ -167,23 +216,21 @@ async def test_delete_by_id_success(contact_service, contacts_repository):
         "phone": "911",
         "birthday": "1990-01-01",
     }
-    contacts_repository.delete = AsyncMock()
-    contacts_repository.get_contact_by_id = AsyncMock(return_value=contact_data)
+    contacts_repository.delete = AsyncMock(return_value=contact_data)
 
     # Call method
-    await contact_service.delete_by_id(contact_id=contact_id)
+    contact = await contact_service.delete_by_id(contact_id=contact_id)
 
     # Assertions
-    contacts_repository.get_contact_by_id.assert_awaited_once_with(contact_id)
     contacts_repository.delete.assert_awaited_once_with(contact_id)
+    assert contact == contact_data
 
 
 @pytest.mark.asyncio
 async def test_delete_by_id_fail(contact_service, contacts_repository):
     # Setup
     contact_id = 1
-    contacts_repository.delete = AsyncMock()
-    contacts_repository.get_contact_by_id = AsyncMock(return_value=None)
+    contacts_repository.delete = AsyncMock(return_value=None)
 
     # Call method
     with pytest.raises(HTTPNotFoundException) as ex_nfo:
@@ -191,16 +238,15 @@ async def test_delete_by_id_fail(contact_service, contacts_repository):
 
     # Assertions
     assert ex_nfo.value.status_code == 404
-    contacts_repository.get_contact_by_id.assert_awaited_once_with(contact_id)
-    contacts_repository.delete.assert_not_awaited()
+    contacts_repository.delete.assert_awaited_once_with(contact_id)
 
 
 @pytest.mark.asyncio
 async def test_update_by_id_success(contact_service, contacts_repository):
     # Setup
     contact_id = 1
-    existing_contact = {
-        "first_name": "John",
+    updated_contact = {
+        "first_name": "New Fisrt name",
         "last_name": "Doe",
         "email": "john.doe@example.com",
         "phone": "911",
@@ -209,15 +255,16 @@ async def test_update_by_id_success(contact_service, contacts_repository):
     contact_data = {
         "first_name": "New Fisrt name",
     }
-    contacts_repository.update = AsyncMock()
-    contacts_repository.get_contact_by_id = AsyncMock(return_value=existing_contact)
+    contacts_repository.update = AsyncMock(return_value=updated_contact)
 
     # Call method
-    await contact_service.update_by_id(contact_id=contact_id, body=contact_data)
+    contact = await contact_service.update_by_id(
+        contact_id=contact_id, body=contact_data
+    )
 
     # Assertions
-    contacts_repository.get_contact_by_id.assert_awaited_once_with(contact_id)
     contacts_repository.update.assert_awaited_once_with(contact_id, contact_data)
+    assert contact == updated_contact
 
 
 @pytest.mark.asyncio
@@ -227,8 +274,7 @@ async def test_update_by_id_fail(contact_service, contacts_repository):
     contact_data = {
         "first_name": "New Fisrt name",
     }
-    contacts_repository.update = AsyncMock()
-    contacts_repository.get_contact_by_id = AsyncMock(return_value=None)
+    contacts_repository.update = AsyncMock(return_value=None)
 
     # Call method
     with pytest.raises(HTTPNotFoundException) as ex_nfo:
@@ -236,5 +282,41 @@ async def test_update_by_id_fail(contact_service, contacts_repository):
 
     # Assertions
     assert ex_nfo.value.status_code == 404
-    contacts_repository.get_contact_by_id.assert_awaited_once_with(contact_id)
-    contacts_repository.update.assert_not_awaited()
+    contacts_repository.update.assert_awaited_once_with(contact_id, contact_data)
+
+
+async def records(*items):
+    for item in items:
+        yield item
+
+
+@pytest.mark.asyncio
+async def test_import_contacts(monkeypatch, contact_service, contacts_repository):
+    # Setup
+    monkeypatch.setattr("src.services.contacts.settings.CONTACTS_IMPORT_BATCH_SIZE", 3)
+    contacts_repository.bulk_create = AsyncMock(return_value={"taken@example.com"})
+    contact = {
+        "first_name": "John",
+        "last_name": "Doe",
+        "phone": "911",
+        "birthday": "1990-01-01",
+    }
+
+    # Call method
+    report = await contact_service.import_contacts(
+        records(
+            (1, {**contact, "email": "one@example.com"}),
+            (2, {**contact, "email": "two@example.com"}),
+            (3, {**contact, "email": "ONE@example.com"}),
+            (4, {**contact, "email": "taken@example.com"}),
+            (5, {**contact, "email": "bad@example.com", "birthday": "1990-13-01"}),
+            (6, {**contact, "email": "not an email"}),
+            (7, "Invalid JSON."),
+        )
+    )
+
+    # Assertions
+    contacts_repository.bulk_create.assert_awaited_once()
+    assert report["imported"] == 2
+    assert report["failed"] == 5
+    assert [error["row"] for error in report["errors"]] == [3, 4, 5, 6, 7]
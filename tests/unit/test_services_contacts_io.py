@@ -0,0 +1,170 @@
+import json
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from src.services.contacts_io import iter_lines, read_records, write_records
+from src.utils import (
+    HTTPBadRequestException,
+    HTTPUnsupportedMediaTypeException,
+    decode_cursor,
+)
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_across_chunks():
+    # Call method
+    lines = await collect(
+        iter_lines(stream(b"first\r\nsec", "ond\nth€".encode(), b"ird"))
+    )
+
+    # Assertions
+    assert lines == ["first", "second", "th€ird"]
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_max_length():
+    # Call method
+    lines = await collect(
+        iter_lines(stream(b"12", b"34\r\n12", b"345", b"\n"), max_length=5)
+    )
+
+    # Assertions
+    assert lines == ["1234", "12345"]
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_too_long():
+    # Setup
+    chunks = stream(b"first\n", *[b"x" * 4] * 1000)
+    lines = iter_lines(chunks, max_length=10)
+
+    # Call method
+    with pytest.raises(HTTPBadRequestException) as ex_nfo:
+        await collect(lines)
+
+    # Assertions
+    assert ex_nfo.value.status_code == 400
+    assert ex_nfo.value.detail == "Line 2 is longer than 10 characters."
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_invalid_utf8():
+    # Call method
+    with pytest.raises(HTTPBadRequestException) as ex_nfo:
+        await collect(iter_lines(stream(b"\xff\xfe\n")))
+
+    # Assertions
+    assert ex_nfo.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_read_csv_records():
+    # Setup
+    body = (
+        b"first_name,last_name,email,phone,birthday\n"
+        b'Den,"Boo, Jr",boo@example.com,911,1981-04-15\n'
+        b"\n"
+        b"Only,two\n"
+    )
+
+    # Call method
+    records = await collect(read_records(stream(body), "text/csv; charset=utf-8"))
+
+    # Assertions
+    assert records[0] == (
+        1,
+        {
+            "first_name": "Den",
+            "last_name": "Boo, Jr",
+            "email": "boo@example.com",
+            "phone": "911",
+            "birthday": "1981-04-15",
+        },
+    )
+    assert records[1] == (2, "Expected 5 values, got 2.")
+
+
+@pytest.mark.asyncio
+async def test_read_ndjson_records():
+    # Setup
+    body = b'{"first_name": "Den"}\n[1, 2]\n{broken\n'
+
+    # Call method
+    records = await collect(read_records(stream(body), "application/x-ndjson"))
+
+    # Assertions
+    assert records == [
+        (1, {"first_name": "Den"}),
+        (2, "Expected a JSON object."),
+        (3, "Invalid JSON."),
+    ]
+
+
+def test_read_records_unsupported_content_type():
+    # Call method
+    with pytest.raises(HTTPUnsupportedMediaTypeException) as ex_nfo:
+        read_records(stream(b""), "application/json")
+
+    # Assertions
+    assert ex_nfo.value.status_code == 415
+
+
+async def contacts(count: int):
+    for contact_id in range(1, count + 1):
+        yield SimpleNamespace(
+            id=contact_id,
+            first_name="Den",
+            last_name="Boo; Jr, II",
+            email="boo@example.com",
+            phone="911",
+            birthday=date(1981, 4, 15),
+        )
+
+
+@pytest.mark.asyncio
+async def test_write_csv_records_in_chunks():
+    # Call method
+    chunks = await collect(write_records(contacts(3), "csv", chunk_size=2))
+
+    # Assertions
+    assert len(chunks) == 2
+    assert chunks[0].startswith(
+        "id,first_name,last_name,email,phone,birthday,cursor\r\n"
+    )
+    assert '1,Den,"Boo; Jr, II",boo@example.com,911,1981-04-15,' in chunks[0]
+
+
+@pytest.mark.asyncio
+async def test_write_records_with_resume_cursor():
+    # Call method
+    ndjson = await collect(write_records(contacts(2), "ndjson"))
+    vcard = await collect(write_records(contacts(1), "vcf"))
+
+    # Assertions
+    records = [json.loads(line) for line in ndjson[0].splitlines()]
+    assert [decode_cursor(record["cursor"]) for record in records] == [
+        {"id": 1},
+        {"id": 2},
+    ]
+    assert f"X-CURSOR:{records[0]['cursor']}\r\n" in vcard[0]
+
+
+@pytest.mark.asyncio
+async def test_write_vcard_records_escapes_values():
+    # Call method
+    chunks = await collect(write_records(contacts(1), "vcf"))
+
+    # Assertions
+    assert "N:Boo\\; Jr\\, II;Den;;;\r\n" in chunks[0]
+    assert chunks[0].endswith("END:VCARD\r\n")
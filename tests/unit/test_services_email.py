@@ -1,34 +1,128 @@
 import pytest
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
+from jose import jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.services.email import send_email, send_reset_email
+from src.commands.benchmark_email_templates import (
+    render_precompiled,
+    render_uncached,
+)
+from src.conf.config import settings
+from src.database.models import EmailOutbox
+from src.services.email import (
+    RESET_PASSWORD_EMAIL,
+    VERIFICATION_EMAIL,
+    EmailOutboxService,
+    get_email_template,
+    precompile_templates,
+    render_email,
+)
+
+
+def test_render_verification_email():
+    # Call method
+    message = render_email(
+        VERIFICATION_EMAIL,
+        "email@example.com",
+        {"username": "<doon>", "host": "https://example.com/"},
+    )
+
+    # Assertions
+    html = message.get_content()
+    token = html.split("api/auth/verify_email/")[1].split('"')[0]
+    claims = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+    assert message["Subject"] == "Verify your email"
+    assert message["To"] == "email@example.com"
+    assert claims["sub"] == "email@example.com"
+    assert "&lt;doon&gt;" in html
+
+
+def test_render_reset_email():
+    # Call method
+    message = render_email(
+        RESET_PASSWORD_EMAIL, "email@example.com", {"host": "https://example.com/"}
+    )
+
+    # Assertions
+    assert message["Subject"] == "Reset Password request"
+    assert "https://example.com/" in message.get_content()
 
 
 @pytest.mark.asyncio
-async def test_send_email(monkeypatch):
+async def test_add_verification_email_is_not_committed():
     # Setup
-    mock_send_message = AsyncMock()
-    monkeypatch.setattr("src.services.email.FastMail.send_message", mock_send_message)
+    mock_session = AsyncMock(spec=AsyncSession)
+    mock_session.add = MagicMock()
 
     # Call method
-    await send_email(
-        email="email@example.com", username="doon", host="https:/example.com"
+    EmailOutboxService(mock_session).add_verification_email(
+        "email@example.com", "doon", "https://example.com/"
     )
 
     # Assertions
-    mock_send_message.assert_awaited_once()
+    email = mock_session.add.call_args.args[0]
+    assert isinstance(email, EmailOutbox)
+    assert email.kind == VERIFICATION_EMAIL
+    assert email.payload == {"username": "doon", "host": "https://example.com/"}
+    mock_session.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_add_reset_email():
+    # Setup
+    mock_session = AsyncMock(spec=AsyncSession)
+    mock_session.add = MagicMock()
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = None
+    mock_session.execute = AsyncMock(return_value=mock_result)
+
+    # Call method
+    queued = await EmailOutboxService(mock_session).add_reset_email(
+        "email@example.com", "https://example.com/"
+    )
+
+    # Assertions
+    assert queued is True
+    assert mock_session.add.call_args.args[0].kind == RESET_PASSWORD_EMAIL
+    mock_session.commit.assert_awaited_once()
+
+
+def test_precompiled_templates_are_reused(monkeypatch):
+    # Setup
+    precompile_templates()
+    template = get_email_template(VERIFICATION_EMAIL)
+    mock_get_template = MagicMock()
+    monkeypatch.setattr("src.services.email.templates.get_template", mock_get_template)
+
+    # Call method
+    render_email(VERIFICATION_EMAIL, "email@example.com", {"username": "doon"})
+
+    # Assertions
+    assert get_email_template(VERIFICATION_EMAIL) is template
+    mock_get_template.assert_not_called()
+
+
+def test_benchmark_email_templates():
+    # Assertions
+    assert render_uncached(RESET_PASSWORD_EMAIL, 2) > 0
+    assert render_precompiled(RESET_PASSWORD_EMAIL, 2) > 0
 
 
 @pytest.mark.asyncio
-async def test_send_reset_email(monkeypatch):
+async def test_add_reset_email_coalesced():
     # Setup
-    mock_send_message = AsyncMock()
-    monkeypatch.setattr("src.services.email.FastMail.send_message", mock_send_message)
+    mock_session = AsyncMock(spec=AsyncSession)
+    mock_session.add = MagicMock()
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = 1
+    mock_session.execute = AsyncMock(return_value=mock_result)
 
     # Call method
-    await send_reset_email(
-        email="email@example.com", token="token", host="https:/example.com"
+    queued = await EmailOutboxService(mock_session).add_reset_email(
+        "email@example.com", "https://example.com/"
     )
 
     # Assertions
-    mock_send_message.assert_awaited_once()
+    assert queued is False
+    mock_session.add.assert_not_called()
+    mock_session.commit.assert_not_awaited()
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+
+import pytest
+from passlib.hash import bcrypt
+
+from src.services.hashing import PasswordHasher
+from src.services.metrics import metrics
+from src.utils import HTTPServiceUnavailableException
+
+
+@pytest.fixture
+def password_hasher():
+    hasher = PasswordHasher(workers=1, max_waiting=1, queue_timeout=0.2)
+    yield hasher
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify(password_hasher):
+    # Call method
+    hashed = await password_hasher.hash("12345678")
+
+    # Assertions
+    assert hashed != "12345678"
+    assert await password_hasher.verify("12345678", hashed) is True
+    assert await password_hasher.verify("87654321", hashed) is False
+
+
+@pytest.mark.asyncio
+async def test_run_does_not_block_event_loop(password_hasher):
+    # Setup
+    release = threading.Event()
+    task = asyncio.create_task(password_hasher.run(release.wait, 5))
+
+    # Call method
+    await asyncio.sleep(0.01)
+    release.set()
+
+    # Assertions
+    assert await task is True
+
+
+@pytest.mark.asyncio
+async def test_run_queue_timeout(password_hasher):
+    # Setup
+    metrics.reset()
+    release = threading.Event()
+    busy = asyncio.create_task(password_hasher.run(release.wait, 5))
+    await asyncio.sleep(0.01)
+
+    # Call method
+    with pytest.raises(HTTPServiceUnavailableException) as exc_info:
+        await password_hasher.run(lambda: None)
+    release.set()
+    await busy
+
+    # Assertions
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers == {"Retry-After": "1"}
+    assert metrics.snapshot()["counters"]["password_hash_timeouts_total"] == 1
+    assert metrics.snapshot()["gauges"]["password_hash_in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_run_rejects_when_queue_is_full(password_hasher):
+    # Setup
+    metrics.reset()
+    release = threading.Event()
+    busy = asyncio.create_task(password_hasher.run(release.wait, 5))
+    await asyncio.sleep(0.01)
+    waiting = asyncio.create_task(password_hasher.run(lambda: "done"))
+    await asyncio.sleep(0.01)
+
+    # Call method
+    with pytest.raises(HTTPServiceUnavailableException):
+        await password_hasher.run(lambda: None)
+    release.set()
+
+    # Assertions
+    assert await busy is True
+    assert await waiting == "done"
+    assert metrics.snapshot()["counters"]["password_hash_rejected_total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_verify_and_update_rehashes_bcrypt(password_hasher):
+    # Setup
+    hashed = bcrypt.hash("12345678")
+
+    # Call method
+    verified, new_hash = await password_hasher.verify_and_update("12345678", hashed)
+
+    # Assertions
+    assert verified is True
+    assert new_hash.startswith("$argon2id$")
+    assert password_hasher.hasher.verify_and_update("12345678", new_hash) == (
+        True,
+        None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_verify_and_update_current_hash(password_hasher):
+    # Setup
+    hashed = await password_hasher.hash("12345678")
+
+    # Call method
+    verified, new_hash = await password_hasher.verify_and_update("12345678", hashed)
+
+    # Assertions
+    assert hashed.startswith("$argon2id$")
+    assert verified is True
+    assert new_hash is None
+
+
+@pytest.mark.asyncio
+async def test_verify_and_update_wrong_password(password_hasher):
+    # Call method
+    verified, new_hash = await password_hasher.verify_and_update(
+        "87654321", bcrypt.hash("12345678")
+    )
+
+    # Assertions
+    assert verified is False
+    assert new_hash is None
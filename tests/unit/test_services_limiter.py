@@ -0,0 +1,33 @@
+import time
+
+from jose import jwt
+from starlette.requests import Request
+
+from src.conf.config import settings
+from src.services.limiter import get_user_or_remote_address
+
+
+def make_request(authorization: str | None = None) -> Request:
+    headers = [(b"authorization", authorization.encode())] if authorization else []
+    return Request({"type": "http", "headers": headers, "client": ("10.0.0.1", 1234)})
+
+
+def test_rate_limit_key_of_token_subject():
+    # Setup
+    token = jwt.encode(
+        {"sub": "deadpool", "exp": int(time.time()) + 60},
+        settings.JWT_SECRET,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+
+    # Call method
+    key = get_user_or_remote_address(make_request(f"Bearer {token}"))
+
+    # Assertions
+    assert key == "user:deadpool"
+
+
+def test_rate_limit_key_of_client_address():
+    # Assertions
+    assert get_user_or_remote_address(make_request()) == "ip:10.0.0.1"
+    assert get_user_or_remote_address(make_request("Bearer invalid")) == "ip:10.0.0.1"
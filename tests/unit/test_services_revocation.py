@@ -0,0 +1,140 @@
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.services.revocation import BloomFilter, TokenRevocationList
+
+
+@pytest.fixture
+def repository(monkeypatch):
+    repository = MagicMock()
+    repository.get_revoked_since = AsyncMock(return_value=[])
+    repository.delete_expired = AsyncMock(return_value=0)
+    repository.is_revoked = AsyncMock(return_value=True)
+    repository.add = AsyncMock()
+    monkeypatch.setattr(
+        "src.services.revocation.RevokedTokenRepository", lambda db: repository
+    )
+    return repository
+
+
+def test_bloom_filter():
+    # Setup
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+
+    # Call method
+    for number in range(1000):
+        bloom.add(f"revoked{number}")
+
+    # Assertions
+    assert all(f"revoked{number}" in bloom for number in range(1000))
+    false_positives = sum(f"valid{number}" in bloom for number in range(10000))
+    assert false_positives < 300
+    assert bloom.count == 1000
+
+
+@pytest.mark.asyncio
+async def test_revocation_list_skips_lookup_of_not_revoked_token(repository):
+    # Setup
+    revocation_list = TokenRevocationList(1000, 0.001, 60, 3600)
+    repository.get_revoked_since.return_value = ["revoked"]
+
+    # Call method
+    not_revoked = await revocation_list.is_revoked("valid", MagicMock())
+    revoked = await revocation_list.is_revoked("revoked", MagicMock())
+
+    # Assertions
+    assert not_revoked is False
+    assert revoked is True
+    repository.is_revoked.assert_awaited_once_with("revoked")
+    repository.get_revoked_since.assert_awaited_once()
+    assert repository.get_revoked_since.await_args.args[0] == datetime.min
+
+
+@pytest.mark.asyncio
+async def test_revocation_list_refreshes_incrementally(repository):
+    # Setup
+    revocation_list = TokenRevocationList(1000, 0.001, 0, 3600, overlap=30)
+    await revocation_list.is_revoked("other", MagicMock())
+    synced_at = revocation_list._synced_at
+    repository.get_revoked_since.return_value = ["revoked"]
+
+    # Call method
+    revoked = await revocation_list.is_revoked("revoked", MagicMock())
+
+    # Assertions
+    assert revoked is True
+    since = repository.get_revoked_since.await_args.args[0]
+    assert since == synced_at - timedelta(seconds=30)
+    repository.delete_expired.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_revoke_adds_token_to_filter(repository):
+    # Setup
+    revocation_list = TokenRevocationList(1000, 0.001, 60, 3600)
+
+    # Call method
+    await revocation_list.revoke("revoked", 1, 1893456000, MagicMock())
+
+    # Assertions
+    assert "revoked" in revocation_list.bloom
+    args = repository.add.await_args.args
+    assert args[0:2] == ("revoked", 1)
+    assert args[3] == datetime(2030, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_revocation_list_waits_for_first_rebuild(repository):
+    # Setup
+    revocation_list = TokenRevocationList(1000, 0.001, 60, 3600)
+
+    async def get_revoked_since(since, now):
+        await asyncio.sleep(0.01)
+        return ["revoked"]
+
+    repository.get_revoked_since.side_effect = get_revoked_since
+
+    # Call method
+    results = await asyncio.gather(
+        *(revocation_list.is_revoked("revoked", MagicMock()) for _ in range(3))
+    )
+
+    # Assertions
+    assert results == [True, True, True]
+    assert repository.get_revoked_since.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_revocation_list_retries_failed_refresh(repository):
+    # Setup
+    revocation_list = TokenRevocationList(1000, 0.001, 60, 3600)
+    repository.get_revoked_since.side_effect = [OSError("lost"), ["revoked"]]
+    with pytest.raises(OSError):
+        await revocation_list.is_revoked("revoked", MagicMock())
+
+    # Call method
+    revoked = await revocation_list.is_revoked("revoked", MagicMock())
+
+    # Assertions
+    assert revoked is True
+    assert repository.get_revoked_since.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_revocation_list_retries_failed_incremental_refresh(repository):
+    # Setup
+    revocation_list = TokenRevocationList(1000, 0.001, 60, 3600)
+    await revocation_list.is_revoked("other", MagicMock())
+    revocation_list._next_refresh = 0.0
+    repository.get_revoked_since.side_effect = [OSError("lost"), ["revoked"]]
+    with pytest.raises(OSError):
+        await revocation_list.is_revoked("revoked", MagicMock())
+
+    # Call method
+    revoked = await revocation_list.is_revoked("revoked", MagicMock())
+
+    # Assertions
+    assert revoked is True
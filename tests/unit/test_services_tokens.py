@@ -0,0 +1,90 @@
+import time
+from unittest.mock import patch
+
+import pytest
+from jose import JWTError, jwt
+
+from src.commands.benchmark_jwt_decode import benchmark
+from src.conf.config import settings
+from src.services.metrics import metrics
+from src.services.tokens import TokenDecodeCache
+
+
+def make_token(**claims) -> str:
+    return jwt.encode(claims, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+
+
+def test_decode_cache_reuses_verified_claims():
+    # Setup
+    metrics.reset()
+    cache = TokenDecodeCache(max_size=10, leeway=5, max_ttl=300)
+    token = make_token(sub="deadpool", exp=int(time.time()) + 60)
+
+    # Call method
+    with patch("src.services.tokens.jwt.decode", wraps=jwt.decode) as decode:
+        first = cache.decode(token)
+        second = cache.decode(token)
+
+    # Assertions
+    assert first == second
+    assert first["sub"] == "deadpool"
+    assert decode.call_count == 1
+    assert metrics.snapshot()["counters"]["jwt_decode_cache_hits_total"] == 1
+    second["sub"] = "changed"
+    assert cache.decode(token)["sub"] == "deadpool"
+
+
+def test_decode_cache_expires_before_exp(monkeypatch):
+    # Setup
+    now = time.time()
+    cache = TokenDecodeCache(max_size=10, leeway=5, max_ttl=300)
+    token = make_token(sub="deadpool", exp=int(now) + 60)
+    cache.decode(token)
+
+    # Call method
+    monkeypatch.setattr(time, "time", lambda: now + 56)
+
+    # Assertions
+    with patch("src.services.tokens.jwt.decode", wraps=jwt.decode) as decode:
+        cache.decode(token)
+    assert decode.call_count == 1
+
+
+def test_decode_cache_skips_invalid_and_almost_expired_tokens():
+    # Setup
+    cache = TokenDecodeCache(max_size=10, leeway=5, max_ttl=300)
+    expired = make_token(sub="deadpool", exp=int(time.time()) - 1)
+    expiring = make_token(sub="deadpool", exp=int(time.time()) + 2)
+
+    # Call method
+    with pytest.raises(JWTError):
+        cache.decode(expired)
+    with pytest.raises(JWTError):
+        cache.decode(expired + "x")
+    cache.decode(expiring)
+
+    # Assertions
+    assert len(cache) == 0
+
+
+def test_decode_cache_evicts_least_recently_used():
+    # Setup
+    cache = TokenDecodeCache(max_size=2, leeway=5, max_ttl=300)
+    tokens = [make_token(sub=str(number)) for number in range(3)]
+
+    # Call method
+    for token in tokens:
+        cache.decode(token)
+
+    # Assertions
+    assert len(cache) == 2
+    assert TokenDecodeCache._key(tokens[0]) not in cache._items
+
+
+def test_benchmark():
+    # Call method
+    uncached, cached = benchmark(iterations=10)
+
+    # Assertions
+    assert uncached > 0
+    assert cached > 0
@@ -1,7 +1,8 @@
 import pytest
 from unittest.mock import AsyncMock, Mock
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.utils import HTTPNotFoundException
+from src.utils import HTTPNotFoundException, HTTPConflictRequestException
 
 from src.database.models import UserRole, User
 from src.schemas.users import UserCreate
@@ -60,6 +61,39 @@ async def test_create_success(monkeypatch, user_service, user_repository):
     user_repository.create_user.assert_awaited_once_with(body, avatar_url)
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "existing_user, detail",
+    [
+        ({"id": 1}, "A user already exists with the same email."),
+        (None, "A user already exists with the same username."),
+    ],
+)
+async def test_create_conflict(
+    monkeypatch, user_service, user_repository, existing_user, detail
+):
+    # Setup
+    monkeypatch.setattr("src.services.users.Gravatar.get_image", Mock())
+    user_repository.create_user = AsyncMock(
+        side_effect=IntegrityError("INSERT", {}, None)
+    )
+    user_repository.get_user_by_email = AsyncMock(return_value=existing_user)
+    body = UserCreate(
+        username="john",
+        email="john.doe@example.com",
+        password="password",
+        role=UserRole.USER,
+    )
+
+    # Call method
+    with pytest.raises(HTTPConflictRequestException) as ex_nfo:
+        await user_service.create_user(body=body)
+
+    # Assertions
+    assert ex_nfo.value.status_code == 409
+    assert ex_nfo.value.detail == detail
+
+
 @pytest.mark.asyncio
 async def test_get_user_by_id_success(user_service, user_repository):
     # Setup